@@ -9,6 +9,8 @@ import re
 from hyperhelp.common import log, help_package_prompt
 from hyperhelp.common import current_help_package, current_help_file
 from hyperhelp.core import help_index_list, load_help_index, reload_help_file
+from hyperhelp.core import tokenize_help
+from hyperhelp.markup import TOKEN_SCOPES
 from hyperhelp.view import find_help_view
 
 from .common import format_template, is_authoring_source
@@ -50,7 +52,7 @@ def _global_package_list(filter_with_help=True):
             pkg_set.add(res.split("/")[1])
 
     if filter_with_help:
-        pkg_set -= set([pkg.package for pkg in help_index_list().values()])
+        pkg_set -= set(help_index_list())
 
     if "Default" in pkg_set:
         yield "Default"
@@ -453,6 +455,45 @@ class HyperhelpAuthorReloadIndexCommand(sublime_plugin.TextCommand):
             return filename
 
 
+class HyperhelpAuthorCheckMarkupCommand(sublime_plugin.TextCommand):
+    """
+    Check that the markup found by the help tokenizer in the current help file
+    agrees with what the help syntax finds, by comparing the tokens of every
+    kind with the regions that the syntax gives the same scope. Differences
+    are logged to the console.
+    """
+    def run(self, edit):
+        view = self.view
+        kinds, starts, ends = tokenize_help(view.substr(sublime.Region(0, view.size())))
+
+        problems = 0
+        for scope in TOKEN_SCOPES:
+            # A selector also matches the scopes nested under it.
+            wanted = {kind for kind, name in enumerate(TOKEN_SCOPES)
+                      if name == scope or name.startswith(scope + ".")}
+            tokens = {(starts[index], ends[index])
+                      for index, kind in enumerate(kinds) if kind in wanted}
+            syntax = {(region.a, region.b)
+                      for region in view.find_by_selector(scope)}
+
+            for source, regions in (("syntax", syntax - tokens),
+                                    ("tokenizer", tokens - syntax)):
+                for start, end in sorted(regions):
+                    row, col = view.rowcol(start)
+                    log("%s @ %d:%d: only the %s found %r", scope, row + 1,
+                        col + 1, source, view.substr(sublime.Region(start, end)))
+                    problems += 1
+
+        if problems:
+            log("%d differences between the tokenizer and the syntax; see the console",
+                problems, status=True)
+        else:
+            log("The tokenizer and the syntax agree", status=True)
+
+    def is_enabled(self):
+        return self.view.match_selector(0, "text.hyperhelp.help")
+
+
 class HyperhelpAuthorLint(sublime_plugin.WindowCommand):
     def run(self):
         target = find_lint_target(self.window.active_view())
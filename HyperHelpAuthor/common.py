@@ -3,7 +3,7 @@ import sublime
 import os
 import textwrap
 
-from hyperhelp.common import log, hh_syntax
+from hyperhelp.common import log, hh_syntax, load_resource
 
 
 ###----------------------------------------------------------------------------
@@ -64,21 +64,43 @@ def format_template(template, *args):
     return textwrap.dedent(template % args).strip()
 
 
+def open_packed_resource(local_path, content, window=None):
+    """
+    Open a new view with the provided content of a file from a packed package,
+    set up so that saving it creates a loose copy at the given local path,
+    which overrides the packed version. The folder for the copy is created
+    when the view is saved, so nothing is left behind if it never is.
+    """
+    window = window if window is not None else sublime.active_window()
+
+    view = window.new_file()
+    view.retarget(local_path)
+    view.settings().set("_hh_auth_dir", True)
+    view.run_command("append", {"characters": content})
+
+    return view
+
+
 def open_local_help(pkg_info, help_file, window=None):
     """
-    Attempt to open the provided help file locally for editing.
+    Attempt to open the provided help file locally for editing. A help file
+    from a packed package is opened as a new file that overrides it when it
+    is saved.
     """
     window = window if window is not None else sublime.active_window()
     local_path = local_help_filename(pkg_info, help_file)
 
     if not os.path.exists(local_path):
-        return log(format_template(
-            """
-            Specified help file does not exist; cannot open.
-
-            Note: HyperHelpAuthor can not currently open help
-            files from packed packages for editing.
-            """), dialog=True)
+        content = load_resource("Packages/%s/%s" % (pkg_info.doc_root,
+                                                    help_file))
+        if content is None:
+            return log("Specified help file does not exist; cannot open.",
+                       dialog=True)
+
+        view = open_packed_resource(local_path, content, window)
+        view.settings().set("_hh_auth", True)
+        apply_authoring_settings(view)
+        return
 
     view = window.open_file(local_path)
     view.settings().set("_hh_auth", True)
@@ -88,7 +110,9 @@ def open_local_help(pkg_info, help_file, window=None):
 
 def open_help_index(pkg_info, window=None):
     """
-    Attempt to open the provided help index file localy for editing.
+    Attempt to open the provided help index file localy for editing. An index
+    from a packed package is opened as a new file that overrides it when it is
+    saved.
     """
     window = window if window is not None else sublime.active_window()
 
@@ -97,13 +121,14 @@ def open_help_index(pkg_info, window=None):
                               pkg_info.index_file[len("Packages/"):])
 
     if not os.path.exists(local_path):
-        return log(format_template(
-            """
-            Specified help index does not exist; cannot open.
-
-            Note: HyperHelpAuthor can not currently open help
-            indexes from packed packages for editing.
-            """), dialog=True)
+        content = load_resource(pkg_info.index_file)
+        if content is None:
+            return log("Specified help index does not exist; cannot open.",
+                       dialog=True)
+
+        view = open_packed_resource(local_path, content, window)
+        view.assign_syntax("Packages/JavaScript/JSON.sublime-syntax")
+        return
 
     window.open_file(local_path)
 
@@ -1,6 +1,8 @@
 import sublime
 import sublime_plugin
 
+import os
+
 from .common import hha_setting, is_authoring_source, apply_authoring_settings
 
 
@@ -18,6 +20,17 @@ def _apply_author_settings(view):
         apply_authoring_settings(view)
 
 
+def _create_save_folder(view):
+    """
+    If this view has the setting that indicates that it is a copy of a file
+    from a packed package, remove the setting and create the folder that the
+    copy is saved into, which may not exist yet.
+    """
+    if view.settings().get("_hh_auth_dir", None) is not None:
+        view.settings().erase("_hh_auth_dir")
+        os.makedirs(os.path.dirname(view.file_name()), exist_ok=True)
+
+
 ###----------------------------------------------------------------------------
 
 
@@ -27,6 +40,7 @@ class HyperhelpAuthorEventListener(sublime_plugin.EventListener):
         If the file about to be saved is a help file, try to update the date
         in the header.
         """
+        _create_save_folder(view)
         _apply_author_settings(view)
 
         if hha_setting("update_header_on_save") and is_authoring_source(view):
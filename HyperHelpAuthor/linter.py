@@ -6,6 +6,8 @@ from collections import OrderedDict, namedtuple
 
 from hyperhelp.common import log, hh_syntax
 from hyperhelp.core import help_index_list, lookup_help_topic
+from hyperhelp.core import resolve_help_link, tokenize_help
+from hyperhelp.markup import TOKEN_LINK, TOKEN_ANCHOR, TOKEN_HIDDEN_ANCHOR
 
 
 ###----------------------------------------------------------------------------
@@ -252,17 +254,22 @@ class MissingLinkAnchorLinter(LinterBase):
     def lint(self, view, file_name):
         topics = self.pkg_info.help_topics
 
-        regions = view.find_by_selector("meta.link, meta.anchor")
-        for pos in regions:
-            link = view.substr(pos)
-            if lookup_help_topic(self.pkg_info, link) is not None:
-                continue
-
-            stub = "link references unknown anchor '%s'"
-            if view.match_selector(pos.begin(), "meta.anchor"):
+        text = view.substr(sublime.Region(0, view.size()))
+        tokens = tokenize_help(text)
+        for kind, start, end in zip(*tokens):
+            link = text[start:end]
+            if kind in (TOKEN_ANCHOR, TOKEN_HIDDEN_ANCHOR):
                 stub = "anchor '%s' is not in the help index"
+                if lookup_help_topic(self.pkg_info, link) is not None:
+                    continue
+            elif kind == TOKEN_LINK:
+                stub = "link references unknown anchor '%s'"
+                if resolve_help_link(self.pkg_info.package, link) is not None:
+                    continue
+            else:
+                continue
 
-            self.add(view, "warning", file_name, pos.begin(),
+            self.add(view, "warning", file_name, start,
                      stub % link.replace("\t", " "))
 
 
@@ -0,0 +1,103 @@
+"""
+Benchmark completing topic prefixes while a topic is typed into the topic
+prompt, against filtering the full list of topics the way a quick panel has
+to be given all of them.
+
+Each simulated keystroke extends the prefix of a topic by one character and
+asks for the matching topics, as the prompt does.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_complete.py --files 1000 --topics 100
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from corpus import add_help_package
+from hyperhelp import help_index
+from hyperhelp.core import complete_help_topic
+
+
+###----------------------------------------------------------------------------
+
+
+def _keystrokes(topics):
+    """
+    Return the list of prefixes typed while entering each of the given topics.
+    """
+    return [topic[:end] for topic in topics for end in range(1, len(topic) + 1)]
+
+
+def _linear_completions(pkg_info, prefix, limit):
+    prefix = prefix.casefold().replace(" ", "\t")
+    names = [name for name in sorted(pkg_info.help_lookup)
+             if name.startswith(prefix)]
+
+    return names[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=12)
+    parser.add_argument("--typed", type=int, default=5,
+                        help="number of topics typed")
+    args = parser.parse_args()
+
+    sublime_stub.settings["hyperhelp_index_cache"] = False
+    index_res = add_help_package(sublime_stub.resources, "Bench",
+                                 args.files, args.topics)
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        pkg_info = help_index._load_help_index(index_res)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    step = max(1, len(pkg_info.help_topics) // args.typed)
+    typed = sorted(pkg_info.help_topics)[::step][:args.typed]
+    keystrokes = _keystrokes(typed)
+
+    start = time.perf_counter()
+    complete_help_topic(pkg_info, "", args.limit)
+    build = time.perf_counter() - start
+
+    worst = total = 0.0
+    for prefix in keystrokes:
+        start = time.perf_counter()
+        matches = complete_help_topic(pkg_info, prefix, args.limit)
+        elapsed = time.perf_counter() - start
+        worst = max(worst, elapsed)
+        total += elapsed
+
+        expected = _linear_completions(pkg_info, prefix, args.limit)
+        if [name for name, topic in matches] != expected:
+            raise SystemExit("Completions differ for prefix '%s'" % prefix)
+
+    linear_keys = keystrokes[:20]
+    start = time.perf_counter()
+    for prefix in linear_keys:
+        _linear_completions(pkg_info, prefix, args.limit)
+    linear = (time.perf_counter() - start) / len(linear_keys)
+
+    print("%d topics and aliases, %d keystrokes" % (
+        len(pkg_info.help_lookup), len(keystrokes)))
+    print("  first use:      %8.1fms" % (build * 1000))
+    print("  linear filter:  %8.3fms per keystroke" % (linear * 1000))
+    print("  worst:          %8.3fms per keystroke" % (worst * 1000))
+    print("  average:        %8.3fms per keystroke" % (
+        total / len(keystrokes) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark loading a help index, one phase at a time, reporting the time and
+the peak memory of every phase and optionally checking them against a
+baseline or fixed thresholds.
+
+The phases are the ones that a load goes through: decoding the JSON, checking
+it against the schema, importing the topics, importing the externals, building
+the table of contents and compiling the lookup table, followed by compiling
+the table of contents for display. Full loads with the index cache turned off
+and with a warm cache are timed as a whole.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_index.py --files 200 --topics 50 --toc-depth 3
+
+Results can be written as JSON with --json and a previous result passed back
+in with --baseline; the run fails if any phase got slower than the baseline by
+more than the tolerance. --threshold phase=ms gives a fixed limit instead.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from corpus import add_help_package
+from hyperhelp import help_index
+from hyperhelp.index_validator import decode_index, check_index
+
+
+###----------------------------------------------------------------------------
+
+
+_package = "Bench"
+_caption_tpl = "Topic {topic} in help source {source}"
+
+
+def _phases(content):
+    """
+    Return the list of (name, function) pairs that make up the phases of
+    loading the given index content. Each function takes the state built by
+    the phases before it and adds its own results to it.
+    """
+    def decode(state):
+        state["raw"] = decode_index(content, _package)
+
+    def validate(state):
+        check_index(state["raw"], _package, content)
+
+    def topics(state):
+        state["topics"], state["aliases"] = dict(), dict()
+        help_index._import_topics(_package, state["topics"], state["aliases"],
+                                  state["raw"].get("help_files", {}),
+                                  _caption_tpl)
+
+    def externals(state):
+        state["package_files"], state["urls"] = list(), list()
+        help_index._import_externals(_package, state["raw"].get("externals"),
+                                     dict(), state["topics"], state["aliases"],
+                                     state["package_files"], state["urls"],
+                                     _caption_tpl)
+
+    def toc(state):
+        state["toc"] = help_index._get_toc_metadata(
+            state["raw"].get("help_contents"), state["topics"],
+            state["aliases"], _package)
+
+    def lookup(state):
+        help_index._compile_lookup(state["topics"], state["aliases"],
+                                   state["package_files"], state["urls"])
+
+    return [("decode", decode), ("validate", validate), ("topics", topics),
+            ("externals", externals), ("toc", toc), ("lookup", lookup)]
+
+
+def _load(index_res):
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        return help_index._load_help_index(index_res)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def _measure(index_res, content, repeat):
+    """
+    Run every phase the given number of times, returning a dictionary that
+    gives the best time (in ms) and the peak memory (in KiB) of each one.
+    """
+    phases = _phases(content)
+    whole = [
+        ("toc compile", lambda state: help_index._compile_toc(state["data"])),
+        ("full load", lambda state: _load(index_res)),
+        ("cached load", lambda state: _load(index_res))
+    ]
+
+    times = {name: float("inf") for name, func in phases + whole}
+    memory = dict()
+
+    # Prime the cache so that every cached load is a hit.
+    sublime_stub.settings["hyperhelp_index_cache"] = True
+    _load(index_res)
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        for run in range(repeat + 1):
+            # The first run is the one that measures memory; tracing slows
+            # everything down, so it does not count towards the times.
+            traced = run == 0
+            if traced:
+                tracemalloc.start()
+
+            state = dict()
+            for name, func in phases:
+                if traced:
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+
+                start = time.perf_counter()
+                func(state)
+                elapsed = time.perf_counter() - start
+
+                if traced:
+                    memory[name] = tracemalloc.get_traced_memory()[1] - base
+                else:
+                    times[name] = min(times[name], elapsed)
+
+            state["data"] = _load(index_res)
+            for name, func in whole:
+                # A full load also has to fetch and decode the index again.
+                sublime_stub.settings["hyperhelp_index_cache"] = (
+                    name == "cached load")
+                sublime_stub.settings["hyperhelp_resource_cache_size"] = (
+                    4096 if name == "cached load" else 0)
+                if traced:
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+
+                start = time.perf_counter()
+                func(state)
+                elapsed = time.perf_counter() - start
+
+                if traced:
+                    memory[name] = tracemalloc.get_traced_memory()[1] - base
+                else:
+                    times[name] = min(times[name], elapsed)
+
+            if traced:
+                tracemalloc.stop()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return {name: {"ms": round(times[name] * 1000, 3),
+                   "peak_kib": round(memory[name] / 1024, 1)}
+            for name, func in phases + whole}
+
+
+def _regressions(phases, baseline, tolerance, thresholds):
+    """
+    Return a list of messages for every phase that is slower than allowed by
+    the baseline results (if any) or the fixed thresholds.
+    """
+    failures = list()
+    for name, result in phases.items():
+        if baseline is not None and name in baseline:
+            limit = baseline[name]["ms"] * (1.0 + tolerance)
+            if result["ms"] > limit:
+                failures.append("%s: %.1fms is more than %.1fms (baseline %.1fms)" % (
+                    name, result["ms"], limit, baseline[name]["ms"]))
+
+        if name in thresholds and result["ms"] > thresholds[name]:
+            failures.append("%s: %.1fms is more than the threshold of %.1fms" % (
+                name, result["ms"], thresholds[name]))
+
+    return failures
+
+
+def _threshold(value):
+    name, sep, limit = value.rpartition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError("expected phase=ms, got '%s'" % value)
+
+    return name, float(limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=50,
+                        help="topics per help file")
+    parser.add_argument("--aliases", type=float, default=1.0,
+                        help="average number of aliases per topic")
+    parser.add_argument("--toc-depth", type=int, default=1,
+                        help="depth of the table of contents; 0 for none")
+    parser.add_argument("--externals", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", metavar="FILE",
+                        help="write the results as JSON; - for stdout")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="JSON results of an earlier run to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown relative to the baseline")
+    parser.add_argument("--threshold", type=_threshold, action="append",
+                        default=[], metavar="PHASE=MS",
+                        help="fail if a phase takes longer than this")
+    args = parser.parse_args()
+
+    corpus = {"files": args.files, "topics": args.topics,
+              "aliases": args.aliases, "toc_depth": args.toc_depth,
+              "externals": args.externals}
+
+    index_res = add_help_package(sublime_stub.resources, _package,
+                                 args.files, args.topics,
+                                 aliases=args.aliases,
+                                 toc_depth=args.toc_depth,
+                                 externals=args.externals)
+    content = sublime_stub.load_resource(index_res)
+
+    phases = _measure(index_res, content, max(1, args.repeat))
+    results = {"corpus": corpus, "bytes": len(content), "phases": phases}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["phases"]
+
+    failures = _regressions(phases, baseline, args.tolerance,
+                            dict(args.threshold))
+    results["failures"] = failures
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        if args.json:
+            with open(args.json, "w") as handle:
+                json.dump(results, handle, indent=4)
+
+        print("%d files, %d topics each, %.1f aliases per topic, toc depth %d, "
+              "%d externals (%d bytes)" % (args.files, args.topics,
+              args.aliases, args.toc_depth, args.externals, len(content)))
+        for name, result in phases.items():
+            print("  %-14s %9.2fms %10.1fKiB" % (
+                name + ":", result["ms"], result["peak_kib"]))
+
+        for failure in failures:
+            print("REGRESSION: %s" % failure)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark rendering a help file for display, for a generated help file with a
+large number of anchors and links.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_render.py --sections 5000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from hyperhelp.help import _render_help_file
+
+
+###----------------------------------------------------------------------------
+
+
+def make_help_text(sections):
+    """
+    Create the text of a help file with the given number of sections, each of
+    which has a hidden anchor, an anchor, links and some other markup.
+    """
+    lines = ['%hyperhelp title="Generated Help" date="2018-01-01"', ""]
+    for num in range(sections):
+        lines.extend([
+            "*|section_%d|*" % num,
+            "-" * 20,
+            "",
+            "This is section %d; see |section_%d| and |other.txt|, or press"
+            % (num, (num + 1) % sections),
+            "<ctrl+s> to run `some_command(%d)` from *anchor_%d*." % (num, num),
+            ""
+        ])
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sections", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_help_text(args.sections)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        rendered = _render_help_file("generated.txt", text, "%x")
+        best = min(best, time.perf_counter() - start)
+
+    print("%d characters, %d anchors, %d links" % (
+        len(text), len(rendered.anchors), len(rendered.links)))
+    print("  render:         %8.1fms" % (best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark the scan that loads the help index of every package, comparing the
+sequential load against loading with a pool of worker threads.
+
+An index that has to be fetched through the API makes a round trip through
+the plugin host, which is where the worker threads gain their time; the
+--latency argument controls the simulated cost of each round trip. Use a
+latency of 0 for indexes that are read straight from disk. Decoding, schema
+validation and topic import are pure Python, so they do not get any faster
+with more threads.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_scan.py --packages 60 --workers 8
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from corpus import add_help_package
+from hyperhelp import help_index
+
+
+###----------------------------------------------------------------------------
+
+
+def _time_scan(workers, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = help_index._scan_help_packages(workers=workers)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--packages", type=int, default=60)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=2.0,
+                        help="simulated plugin host round trip, in ms")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Time the actual load and not the persistent index cache, or the cache
+    # of loaded resources that would make every run after the first one skip
+    # the round trip to fetch the index.
+    sublime_stub.settings["hyperhelp_index_cache"] = False
+    sublime_stub.settings["hyperhelp_resource_cache_size"] = 0
+    sublime_stub.ipc_latency = args.latency / 1000.0
+
+    for num in range(args.packages):
+        add_help_package(sublime_stub.resources, "Package%03d" % num,
+                         args.files, args.topics)
+
+    # Silence the load logging for the duration of the timing.
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        seq_time, seq_result = _time_scan(1, args.repeat)
+        par_time, par_result = _time_scan(args.workers, args.repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    if seq_result != par_result:
+        raise SystemExit("Parallel scan result differs from sequential scan")
+
+    print("%d indexes, %d files x %d topics, %.1fms simulated round trip" % (
+        args.packages, args.files, args.topics, args.latency))
+    print("  sequential:   %8.1fms" % (seq_time * 1000))
+    print("  %2d workers:   %8.1fms" % (args.workers, par_time * 1000))
+    print("  speedup:      %8.2fx" % (seq_time / par_time))
+
+
+if __name__ == "__main__":
+    main()
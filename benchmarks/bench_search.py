@@ -0,0 +1,84 @@
+"""
+Benchmark the fuzzy topic search across all help packages, timing how long it
+takes to index the topics of every package and to run a set of queries.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_search.py --packages 30 --files 100 --topics 100
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from corpus import add_help_package
+from hyperhelp import help_index
+from hyperhelp.search import TopicSearchIndex
+
+
+###----------------------------------------------------------------------------
+
+
+_queries = [
+    "package007 topic 3.4",
+    "caption for package001",
+    "alias 12.3",
+    "pakage002 tpic 5",
+    "help file 3",
+    "no such topic anywhere"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--packages", type=int, default=30)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    sublime_stub.settings["hyperhelp_index_cache"] = False
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        help_list = [help_index._load_help_index(
+                        add_help_package(sublime_stub.resources,
+                                         "Package%03d" % num,
+                                         args.files, args.topics))
+                     for num in range(args.packages)]
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    index = TopicSearchIndex()
+    start = time.perf_counter()
+    for pkg_info in help_list:
+        index.update(pkg_info)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.update(help_list[0])
+    replace = time.perf_counter() - start
+
+    print("%d topics in %d packages" % (len(index), args.packages))
+    print("  index all:      %8.1fms" % (build * 1000))
+    print("  replace one:    %8.1fms" % (replace * 1000))
+
+    for query in _queries:
+        start = time.perf_counter()
+        results = index.search(query, args.limit)
+        elapsed = time.perf_counter() - start
+
+        best = results[0][1].replace("\t", " ") if results else "-"
+        print("  %-24s %8.1fms  %3d results, best: %s" % (
+            "'%s'" % query, elapsed * 1000, len(results), best))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark tokenizing help text without the syntax, over the help files that
+ship with the repository repeated up to a given size.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_tokenize.py --size 10
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from hyperhelp.markup import _tokenize_help, TOKEN_SCOPES
+
+
+###----------------------------------------------------------------------------
+
+
+def make_help_text(size):
+    """
+    Return help text of at least the given size (in characters), made up of
+    the bodies of the help files in the repository.
+    """
+    bodies = []
+    for name in sorted(glob.glob(os.path.join(root, "*", "help", "*.txt"))):
+        with open(name, encoding="utf-8") as handle:
+            bodies.append(handle.read().partition("\n")[2])
+
+    body = "\n".join(bodies)
+    return '%hyperhelp title="Benchmark" date="2018-01-01"\n' + body * (
+        size // len(body) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=float, default=10,
+                        help="size of the help text in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_help_text(int(args.size * 1024 * 1024))
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        tokens = _tokenize_help(text)
+        best = min(best, time.perf_counter() - start)
+
+    print("%.1fMB of help text, %d tokens (%d bytes of token table)" % (
+        len(text) / (1024 * 1024), len(tokens.kinds),
+        sum(len(part) * part.itemsize for part in tokens)))
+    for kind, scope in enumerate(TOKEN_SCOPES):
+        print("  %-20s %8d" % (scope, tokens.kinds.count(kind)))
+    print("  tokenize:       %8.1fms" % (best * 1000))
+
+
+if __name__ == "__main__":
+    main()
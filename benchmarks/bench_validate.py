@@ -0,0 +1,106 @@
+"""
+Benchmark validating a help index with the compiled index schema against
+validating it with the interpreting validictory validator.
+
+Besides timing, this checks that both validators report exactly the same
+error for a set of broken indexes.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_validate.py --files 200 --topics 50
+"""
+import os
+import sys
+import copy
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sublime_stub
+sublime_stub.install()
+
+from corpus import make_help_index
+from hyperhelp.validictory import validate
+from hyperhelp import index_validator
+
+
+###----------------------------------------------------------------------------
+
+
+def _breakages():
+    """
+    Yield a series of (description, function) tuples, where each function
+    breaks a help index in some way.
+    """
+    def first_file(index):
+        return index["help_files"][sorted(index["help_files"])[0]]
+
+    yield "missing topic", lambda i: first_file(i)[1].pop("topic")
+    yield "bad caption", lambda i: first_file(i)[1].update(caption=12)
+    yield "unknown topic key", lambda i: first_file(i)[1].update(bogus=True)
+    yield "bad alias", lambda i: first_file(i)[1]["aliases"].append(None)
+    yield "blank title", lambda i: first_file(i).__setitem__(0, "")
+    yield "empty file entry", lambda i: first_file(i).clear()
+    yield "unknown key", lambda i: i.update(bogus="value")
+    yield "bad toc entry", lambda i: i["help_contents"].append(12)
+    yield "bad toc child", lambda i: i["help_contents"].append(
+        {"topic": "x", "children": [{"caption": "no topic"}]})
+
+
+def _outcome(func, index):
+    try:
+        func(index)
+        return None
+    except Exception as error:
+        return (type(error).__name__, str(error))
+
+
+def _time(func, index, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(index)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schema = index_validator._index_schema
+    compiled = index_validator._compiled_index_schema
+    if not compiled.compiled:
+        raise SystemExit("The index schema could not be compiled")
+
+    interpreted = lambda index: validate(index, schema)
+
+    index = make_help_index("Bench", args.files, args.topics)
+    for description, breakage in _breakages():
+        broken = copy.deepcopy(index)
+        breakage(broken)
+
+        expected = _outcome(interpreted, broken)
+        actual = _outcome(compiled.validate, broken)
+        if expected is None or expected != actual:
+            raise SystemExit("Error mismatch for '%s':\n  interpreted: %s\n  compiled:    %s" % (
+                description, expected, actual))
+
+    slow = _time(interpreted, index, args.repeat)
+    fast = _time(compiled.validate, index, args.repeat)
+
+    print("%d files x %d topics" % (args.files, args.topics))
+    print("  interpreted:  %8.1fms" % (slow * 1000))
+    print("  compiled:     %8.1fms" % (fast * 1000))
+    print("  speedup:      %8.2fx" % (slow / fast))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Generation of synthetic help packages for the benchmarks.
+
+The shape of a generated help index is controlled by the number of help files,
+the number of topics in each file, the average number of aliases per topic,
+the depth of the table of contents and the number of externals. Generation is
+deterministic, so the same arguments always produce the same index.
+"""
+import json
+
+
+###----------------------------------------------------------------------------
+
+
+def _aliases(file_num, topic_num, density):
+    """
+    Return the aliases for a topic, given the average number of aliases that a
+    topic should have. A fractional density is spread evenly over the topics.
+    """
+    index = file_num * 7919 + topic_num
+    count = int(density)
+    if (index * 0.618033988749895) % 1.0 < density - count:
+        count += 1
+
+    return ["alias %d.%d%s" % (file_num, topic_num, "" if num == 0 else
+                                "." + str(num))
+            for num in range(count)]
+
+
+def _toc_level(names, depth):
+    """
+    Arrange the list of topic names into a table of contents that is at most
+    the given number of levels deep; each level groups the topics below it
+    under the first topic in the group.
+    """
+    if depth <= 1 or len(names) <= 2:
+        return list(names)
+
+    # Split into groups so that every level has roughly the same fan out.
+    fanout = max(2, int(round(len(names) ** (1.0 / depth))))
+    size = (len(names) + fanout - 1) // fanout
+
+    result = list()
+    for start in range(0, len(names), size):
+        group = names[start:start + size]
+        if len(group) == 1:
+            result.append(group[0])
+        else:
+            result.append({
+                "topic": group[0],
+                "children": _toc_level(group[1:], depth - 1)
+            })
+
+    return result
+
+
+def make_help_index(package, files=5, topics=20, aliases=1.0, toc_depth=1,
+                    externals=0):
+    """
+    Create and return the data for a help index for the given package with
+    the given number of help files, each containing the given number of
+    topics.
+
+    aliases is the average number of aliases per topic, toc_depth is the
+    depth of the table of contents (1 lists only the help files, 0 leaves the
+    table of contents out) and externals is the number of external help
+    sources, half of which are URLs and the other half package files.
+    """
+    help_files = {}
+    for file_num in range(files):
+        name = "file%d.txt" % file_num
+        entries = ["Help file %d for %s" % (file_num, package)]
+
+        for topic_num in range(topics):
+            topic = "%s topic %d.%d" % (package, file_num, topic_num)
+            entries.append({
+                "topic": topic,
+                "caption": "Caption for %s" % topic,
+                "aliases": _aliases(file_num, topic_num, aliases)
+            })
+
+        help_files[name] = entries
+
+    index = {
+        "description": "Synthetic help for %s" % package,
+        "doc_root": "help/",
+        "help_files": help_files
+    }
+
+    if toc_depth == 1:
+        index["help_contents"] = sorted(help_files)
+    elif toc_depth > 1:
+        # Each help file is a top level entry; the topics in it make up the
+        # rest of the levels. Names are case folded, since table of contents
+        # entries that are plain strings are looked up as is.
+        index["help_contents"] = [{
+            "topic": name,
+            "children": _toc_level(
+                [entry["topic"].casefold() for entry in help_files[name][1:]],
+                toc_depth - 1)
+        } for name in sorted(help_files)]
+
+    if externals:
+        index["externals"] = {}
+        for ext_num in range(externals):
+            if ext_num % 2:
+                source = "https://example.com/%s/%d.html" % (package, ext_num)
+            else:
+                source = "Packages/%s/src/module%d.py" % (package, ext_num)
+
+            index["externals"][source] = [
+                "External %d for %s" % (ext_num, package),
+                {"topic": "%s external %d" % (package, ext_num),
+                 "aliases": ["ext alias %d" % ext_num]}
+            ]
+
+    return index
+
+
+def add_help_package(resources, package, files=5, topics=20, **kwargs):
+    """
+    Add a synthetic help package to the given resource dictionary. Returns the
+    resource name of the index. Any extra arguments are passed on to
+    make_help_index().
+    """
+    index_res = "Packages/%s/help/hyperhelp.json" % package
+    index = make_help_index(package, files, topics, **kwargs)
+    resources[index_res] = json.dumps(index, indent=4).encode("utf-8")
+
+    return index_res
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,148 @@
+"""
+A minimal stand-in for the Sublime Text plugin API, good enough to drive the
+hyperhelp index loading code outside of the editor.
+
+Resources live in an in memory dictionary keyed by resource name. Calls that
+would cross the plugin host boundary in the real editor can be given an
+artificial latency so that the benchmarks see a cost similar to the one the
+plugin host imposes.
+"""
+import sys
+import json
+import time
+import types
+import fnmatch
+import tempfile
+
+
+###----------------------------------------------------------------------------
+
+
+# Resource name to binary content for all known resources.
+resources = {}
+
+# Simulated per call latency (in seconds) of calls that cross the plugin host
+# boundary in the real editor.
+ipc_latency = 0.0
+
+# The settings returned from load_settings(), regardless of settings file.
+settings = {}
+
+_cache_dir = tempfile.mkdtemp(prefix="hyperhelp-bench-")
+
+
+###----------------------------------------------------------------------------
+
+
+def _ipc():
+    if ipc_latency:
+        time.sleep(ipc_latency)
+
+
+class Settings():
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def has(self, key):
+        return key in self.values
+
+    def erase(self, key):
+        self.values.pop(key, None)
+
+
+def find_resources(pattern):
+    _ipc()
+    return [res for res in sorted(resources)
+            if fnmatch.fnmatch(res.split("/")[-1], pattern)]
+
+
+def load_binary_resource(name):
+    _ipc()
+    try:
+        return resources[name]
+    except KeyError:
+        raise IOError("resource not found")
+
+
+def load_resource(name):
+    return load_binary_resource(name).decode("utf-8")
+
+
+def decode_value(text):
+    _ipc()
+    return json.loads(text)
+
+
+def encode_value(value, pretty=False):
+    return json.dumps(value, indent=4 if pretty else None)
+
+
+def load_settings(name):
+    return Settings(settings)
+
+
+def cache_path():
+    return _cache_dir
+
+
+def packages_path():
+    return "/nonexistent/Packages"
+
+
+def installed_packages_path():
+    return "/nonexistent/Installed Packages"
+
+
+def executable_path():
+    return "/nonexistent/sublime_text"
+
+
+def status_message(message):
+    pass
+
+
+def message_dialog(message):
+    pass
+
+
+def set_timeout(callback, delay=0):
+    callback()
+
+
+def set_timeout_async(callback, delay=0):
+    callback()
+
+
+def active_window():
+    return None
+
+
+def windows():
+    return []
+
+
+###----------------------------------------------------------------------------
+
+
+def install():
+    """
+    Install this module as the sublime module (along with an empty version of
+    sublime_plugin) so that hyperhelp can be imported.
+    """
+    sys.modules["sublime"] = sys.modules[__name__]
+
+    plugin = types.ModuleType("sublime_plugin")
+    for name in ("ApplicationCommand", "WindowCommand", "TextCommand",
+                 "EventListener", "ViewEventListener"):
+        setattr(plugin, name, type(name, (object,), {}))
+
+    sys.modules["sublime_plugin"] = plugin
+
+
+###----------------------------------------------------------------------------
@@ -2,12 +2,58 @@ import sublime
 import sublime_plugin
 
 import os
+import time
+from html import escape
 
 from .common import log, current_help_package, help_package_prompt
 from .view import find_help_view, focus_on
-from .core import help_index_list
+from .core import help_index_list, help_toc_index
 from .core import show_help_topic, navigate_help_history
-from .help import HistoryData
+from .core import lookup_help_topic, complete_help_topic, search_help_topics
+from .core import search_help_text, show_help_line, help_link_at
+from .core import next_help_anchor, recent_help_files
+from .help import _view_history, _help_date_format
+
+
+###----------------------------------------------------------------------------
+
+
+# The maximum number of matching topics shown while entering a topic.
+_completion_limit = 12
+
+# The maximum number of results shown for a search of all help topics.
+_search_limit = 100
+
+# The maximum number of help files shown in the list of recently updated help.
+_recent_limit = 100
+
+_completion_popup = """
+<body id="hyperhelp-topic-completions">
+    <style>
+        body {
+            font-family: system;
+            margin: 0.5rem 1rem;
+        }
+        p {
+            font-size: 1.05rem;
+            margin: 0;
+        }
+        .caption {
+            color: color(var(--foreground) alpha(0.6));
+        }
+     </style>
+     %s
+</body>
+"""
+
+_completion_row = """
+<p>%s <span class="caption">%s</span></p>
+"""
+
+_completion_missing = """
+<p>No topics match: %s</p>
+"""
+
 
 ###----------------------------------------------------------------------------
 
@@ -16,17 +62,69 @@ class HyperhelpTopicCommand(sublime_plugin.ApplicationCommand):
     """
     Display the provided help topic inside the given package. If package is
     None, infer it from the currently active help view.
+
+    When prompt is True, the topic is instead entered in an input panel that
+    shows the matching topics as you type.
     """
-    def run(self, package=None, topic="index.txt"):
+    def run(self, package=None, topic="index.txt", prompt=False):
         package = package or current_help_package()
         topic = topic or "index.txt"
 
+        if prompt:
+            if package is None:
+                return help_package_prompt(help_index_list(),
+                    on_select=lambda pkg: self.run(pkg, prompt=True))
+
+            return self.prompt_topic(package)
+
         if package is None:
             return log("Cannot display topic '%s'; cannot determine package",
                 topic, status=True)
 
         show_help_topic(package, topic, history=True)
 
+    def prompt_topic(self, package):
+        pkg_info = help_index_list().get(package, None)
+        if pkg_info is None:
+            return log("Cannot prompt for topic; unknown package '%s'",
+                       package, status=True)
+
+        # The panel is kept so that completions can be shown in it; Sublime
+        # only calls on_change once the panel exists.
+        self.panel = sublime.active_window().show_input_panel(
+            "Help topic in %s:" % package, "",
+            on_done=lambda text: self.select(pkg_info, text),
+            on_change=lambda text: self.complete(pkg_info, self.panel, text),
+            on_cancel=None)
+
+    def complete(self, pkg_info, panel, text):
+        if not text:
+            return panel.hide_popup()
+
+        matches = complete_help_topic(pkg_info, text, _completion_limit)
+        if matches:
+            body = "".join(_completion_row % (
+                escape(name.replace("\t", " ")), escape(topic["caption"]))
+                for name, topic in matches)
+        else:
+            body = _completion_missing % escape(text)
+
+        content = _completion_popup % body
+        if panel.is_popup_visible():
+            panel.update_popup(content)
+        else:
+            panel.show_popup(content, location=-1, max_width=1024)
+
+    def select(self, pkg_info, text):
+        # Anything that isn't a topic as typed is taken to be the start of
+        # the first topic that matches it.
+        if text and lookup_help_topic(pkg_info, text) is None:
+            matches = complete_help_topic(pkg_info, text, 1)
+            if matches:
+                text = matches[0][0]
+
+        show_help_topic(pkg_info.package, text or "index.txt", history=True)
+
 
 class HyperhelpContentsCommand(sublime_plugin.ApplicationCommand):
     """
@@ -45,7 +143,7 @@ class HyperhelpContentsCommand(sublime_plugin.ApplicationCommand):
             return log("Cannot display table of contents; unknown package '%s",
                        package, status=True)
 
-        self.show_toc(pkg_info, pkg_info.help_toc, [])
+        self.show_toc(pkg_info, help_toc_index(pkg_info), 0)
 
     def is_enabled(self, package=None, prompt=False):
         if prompt == False:
@@ -55,39 +153,29 @@ class HyperhelpContentsCommand(sublime_plugin.ApplicationCommand):
 
         return True
 
-    def show_toc(self, pkg_info, items, stack):
-        captions = [[item["caption"], item["topic"].replace("\t", " ") +
-            (" ({} topics)".format(len(item["children"])) if "children" in item else "")]
-            for item in items]
-
-        if not captions and not stack:
+    def show_toc(self, pkg_info, toc, node):
+        if not toc.child_count[node] and node == 0:
             return log("No help topics defined for package '%s'",
                        pkg_info.package, status=True)
 
-        if stack:
-            captions.insert(0, ["..", "Go back"])
-
         sublime.active_window().show_quick_panel(
-            captions,
-            on_select=lambda index: self.select(pkg_info, items, stack, index))
+            toc.rows[node],
+            on_select=lambda index: self.select(pkg_info, toc, node, index))
 
-    def select(self, pkg_info, items, stack, index):
+    def select(self, pkg_info, toc, node, index):
         if index >= 0:
-            # When the stack isn't empty, the first item takes us back.
-            if index == 0 and len(stack) > 0:
-                items = stack.pop()
-                return self.show_toc(pkg_info, items, stack)
+            # When not at the top level, the first item takes us back.
+            if node != 0:
+                if index == 0:
+                    return self.show_toc(pkg_info, toc, toc.parents[node])
 
-            # Compenstate for the "go back" item when the stack's not empty
-            if len(stack) > 0:
                 index -= 1
 
-            entry = items[index]
-            children = entry.get("children", None)
+            child = toc.child_start[node] + index
+            entry = toc.entries[child]
 
-            if children is not None:
-                stack.append(items)
-                return self.show_toc(pkg_info, children, stack)
+            if entry.get("children", None) is not None:
+                return self.show_toc(pkg_info, toc, child)
 
             show_help_topic(pkg_info.package, entry["topic"], history=True)
 
@@ -136,6 +224,107 @@ class HyperhelpIndexCommand(sublime_plugin.ApplicationCommand):
             show_help_topic(pkg_info.package, items[index][1], history=True)
 
 
+class HyperhelpSearchCommand(sublime_plugin.ApplicationCommand):
+    """
+    Search for topics in all packages with help and display the selected one.
+    If no query is given, the user will be prompted to enter one.
+    """
+    def run(self, query=None):
+        if not query:
+            sublime.active_window().show_input_panel(
+                "Search all help:", "",
+                on_done=lambda text: self.run(text) if text else None,
+                on_change=None, on_cancel=None)
+            return
+
+        search_help_topics(query, lambda results: self.show(query, results),
+                           _search_limit)
+
+    def show(self, query, results):
+        if not results:
+            return log("No help topics match '%s'", query, status=True)
+
+        items = [[topic["caption"], "%s: %s" % (package,
+                  topic["topic"].replace("\t", " "))]
+                 for package, name, topic in results]
+
+        sublime.active_window().show_quick_panel(
+            items,
+            on_select=lambda index: self.select(results, index))
+
+    def select(self, results, index):
+        if index >= 0:
+            package, name, topic = results[index]
+            show_help_topic(package, name, history=True)
+
+
+class HyperhelpRecentCommand(sublime_plugin.ApplicationCommand):
+    """
+    Display a list of the most recently updated help files in all packages
+    with help, based on the date in their headers, and display the selected
+    one.
+    """
+    def run(self):
+        recent_help_files(self.show, _recent_limit)
+
+    def show(self, results):
+        if not results:
+            return log("No help files have a date", status=True)
+
+        date_format = _help_date_format(find_help_view())
+        items = [[header.title, "%s: %s (%s)" % (package, header.file,
+                  time.strftime(date_format, time.localtime(header.date)))]
+                 for package, header in results]
+
+        sublime.active_window().show_quick_panel(
+            items,
+            on_select=lambda index: self.select(results, index))
+
+    def select(self, results, index):
+        if index >= 0:
+            package, header = results[index]
+            show_help_topic(package, header.file, history=True)
+
+
+class HyperhelpSearchTextCommand(sublime_plugin.ApplicationCommand):
+    """
+    Search the text of all help files in all packages with help and display
+    the selected match. If no query is given, the user will be prompted to
+    enter one.
+    """
+    def run(self, query=None):
+        if not query:
+            sublime.active_window().show_input_panel(
+                "Search text of all help:", "",
+                on_done=lambda text: self.run(text) if text else None,
+                on_change=None, on_cancel=None)
+            return
+
+        search_help_text(query, lambda results: self.show(query, results),
+                         _search_limit)
+
+    def show(self, query, results):
+        help_list = help_index_list()
+        results = [result for result in results if result[0] in help_list]
+        if not results:
+            return log("No help text matches '%s'", query, status=True)
+
+        items = list()
+        for package, help_file, line in results:
+            title = help_list[package].help_files.get(help_file, help_file)
+            items.append([title, "%s: %s, line %d" % (package, help_file,
+                                                      line + 1)])
+
+        sublime.active_window().show_quick_panel(
+            items,
+            on_select=lambda index: self.select(results, index))
+
+    def select(self, results, index):
+        if index >= 0:
+            package, help_file, line = results[index]
+            show_help_line(package, help_file, line, history=True)
+
+
 class HyperhelpNavigateCommand(sublime_plugin.WindowCommand):
     """
     Perform navigation from within a help file
@@ -156,11 +345,10 @@ class HyperhelpNavigateCommand(sublime_plugin.WindowCommand):
             return False
 
         if nav == "follow_history":
-            settings = help_view.settings()
-            h_pos = settings.get("_hh_hist_pos")
-            h_len = len(settings.get("_hh_hist"))
+            history = _view_history(help_view)
+            h_pos = history.position
 
-            if (prev and h_pos == 0) or (not prev and h_pos == h_len - 1):
+            if (prev and h_pos == 0) or (not prev and h_pos >= len(history) - 1):
                 return False
 
         return True
@@ -176,39 +364,31 @@ class HyperhelpNavigateCommand(sublime_plugin.WindowCommand):
         if help_view is None:
             return template
 
-        settings = help_view.settings()
-        h_pos = settings.get("_hh_hist_pos")
-        h_info = settings.get("_hh_hist")
+        history = _view_history(help_view)
+        h_pos = history.position
 
-        if (prev and h_pos == 0) or (not prev and h_pos == len(h_info) - 1):
+        if (prev and h_pos == 0) or (not prev and h_pos >= len(history) - 1):
             return template
 
-        entry = HistoryData._make(h_info[h_pos + (-1 if prev else 1)])
+        entry = history[h_pos + (-1 if prev else 1)]
         return "%s: %s" % (template, entry.file)
 
     def anchor_nav(self, prev):
         help_view = find_help_view()
-        anchors = help_view.settings().get("_hh_nav")
-        if not anchors:
-            return
-
         point = help_view.sel()[0].begin()
-        fallback = anchors[-1] if prev else anchors[0]
-
-        pick = lambda p: (point < p[1][0]) if not prev else (point > p[1][0])
-        for pos in reversed(anchors) if prev else anchors:
-            if pick(pos):
-                return focus_on(help_view, pos[1])
 
-        focus_on(help_view, fallback[1])
+        anchor = next_help_anchor(help_view, point, prev)
+        if anchor is not None:
+            focus_on(help_view, anchor)
 
     def follow_link(self):
         help_view = find_help_view()
         point = help_view.sel()[0].begin()
-        if help_view.match_selector(point, "text.hyperhelp meta.link"):
-            topic = help_view.substr(help_view.extract_scope(point))
+        link = help_link_at(help_view, point)
+        if link is not None:
+            topic = help_view.substr(link)
 
-            package = help_view.settings().get("_hh_pkg")
+            package = current_help_package(help_view)
             show_help_topic(package, topic, history=True)
 
 
@@ -1,9 +1,8 @@
 import sublime
 
-import os
-import codecs
-
-from .view import find_help_view
+from .view import find_help_view, help_view_state
+from .resource_cache import _resource_cache, _resource_signature
+from .package_archive import _read_package_resources
 
 
 ###----------------------------------------------------------------------------
@@ -23,6 +22,14 @@ def log(message, *args, status=False, dialog=False):
         sublime.message_dialog(message)
 
 
+def hh_setting(key, default=None):
+    """
+    Get a HyperHelp setting. As HyperHelp is a dependency, its settings live in
+    the user preferences rather than in a package specific settings file.
+    """
+    return sublime.load_settings("Preferences.sublime-settings").get(key, default)
+
+
 def hh_syntax(base_file):
     """
     Return the syntax file associated with the given base syntax file name.
@@ -35,30 +42,79 @@ def hh_syntax(base_file):
     log("Unable to locate unique syntax '%s'", base_file)
 
 
-def load_resource(res_name):
+def load_resource(res_name, cached=True):
     """
     Attempt to load and decode the UTF-8 encoded string with normalized line
     endings, returning the string on success or None on error.
 
-    If no resource can be found with the resource specification provided, the
-    call tries to load a file by this name from the packages folder instead.
-    """
-    try:
-        text = sublime.load_binary_resource(res_name).decode("utf-8")
-        return text.replace('\r\n', '\n').replace('\r', '\n')
+    The resource is read straight from disk when possible, either from a loose
+    file in the packages folder or from the sublime-package file of a packed
+    package, with loose files taking precedence as they do in Sublime. Other
+    resources are loaded through the API.
 
-    except OSError:
-        pass
+    Recently loaded resources are cached (up to the size given by the
+    hyperhelp_resource_cache_size setting) for as long as the file they come
+    from does not change; resources that can only be loaded through the API
+    are not cached. Passing cached as False always loads the resource,
+    refreshing the cached copy.
+    """
+    return load_resources([res_name], cached)[res_name]
 
-    except UnicodeError:
-        return log("Unable to decode '%s'; resource is not UTF-8" % res_name)
 
+def load_resources(res_names, cached=True):
+    """
+    Load all of the given resources the same way as load_resource(), returning
+    a dictionary with the string for each of them, or None for those that
+    could not be loaded. Resources that are in the same packed package are
+    read from it together.
+    """
+    budget = hh_setting("hyperhelp_resource_cache_size", 4096) * 1024
+    if budget <= 0:
+        _resource_cache.clear()
+
+    result = dict()
+    signatures = dict()
+    for res_name in res_names:
+        if budget > 0:
+            signatures[res_name] = _resource_signature(res_name)
+            text = (_resource_cache.get(res_name, signatures[res_name])
+                    if cached else None)
+            if text is not None:
+                result[res_name] = text
+                continue
+
+        result[res_name] = None
+
+    missing = [res_name for res_name, text in result.items() if text is None]
+    found = _read_package_resources(missing)
+    for res_name in missing:
+        loaded = _read_resource(res_name, found.get(res_name, None))
+        if loaded is None:
+            _resource_cache.invalidate(res_name)
+            continue
+
+        text, size = loaded
+        if budget > 0:
+            _resource_cache.store(res_name, signatures[res_name], size, text,
+                                  budget)
+        result[res_name] = text
+
+    return result
+
+
+def _read_resource(res_name, data=None):
+    """
+    Decode the given binary content of the resource with the given name for
+    load_resources(), loading it through the API first if no content is
+    given. Returns a tuple of the text and the size in bytes of the resource,
+    or None on error.
+    """
     try:
-        spp = os.path.split(sublime.packages_path())[0]
-        file_name = os.path.join(spp, res_name)
+        if data is None:
+            data = sublime.load_binary_resource(res_name)
 
-        with codecs.open(file_name, 'r', 'utf-8') as file:
-            return file.read().replace('\r\n', '\n').replace('\r', '\n')
+        text = data.decode("utf-8")
+        return (text.replace('\r\n', '\n').replace('\r', '\n'), len(data))
 
     except OSError:
         return log("Unable to load '%s'; resource not found" % res_name)
@@ -73,10 +129,12 @@ def current_help_package(view=None, window=None):
     if help is not visible.
 
     Looks in the help view provided, or the help view in the passed in window,
-    or the help view in the currently active window.
+    or the help view in the currently active window. Views in the help view
+    pool are not showing help, so there is nothing for them.
     """
     view = view or find_help_view(window)
-    return (view.settings().get("_hh_pkg") if view is not None else None)
+    state = help_view_state(view) if view is not None else None
+    return state.package if state is not None and state.pooled is None else None
 
 
 def current_help_file(view=None, window=None):
@@ -85,10 +143,12 @@ def current_help_file(view=None, window=None):
     if help is not visible.
 
     Looks in the help view provided, or the help view in the passed in window,
-    or the help view in the currently active window.
+    or the help view in the currently active window. Views in the help view
+    pool are not showing help, so there is nothing for them.
     """
     view = view or find_help_view(window)
-    return (view.settings().get("_hh_file") if view is not None else None)
+    state = help_view_state(view) if view is not None else None
+    return state.file if state is not None and state.pooled is None else None
 
 
 def help_package_prompt(help_list, on_select, on_cancel=None):
@@ -100,10 +160,9 @@ def help_package_prompt(help_list, on_select, on_cancel=None):
     if not help_list:
         return log("No packages with help are installed", status=True)
 
-    pkg_list = sorted([key for key in help_list])
-    captions = [[help_list[key].package,
-                 help_list[key].description]
-        for key in pkg_list]
+    pkg_list = sorted(help_list.values(), key=lambda pkg_info: pkg_info.package)
+    captions = [[pkg_info.package, pkg_info.description]
+        for pkg_info in pkg_list]
 
     def pick_package(index):
         package = None if index < 0 else captions[index][0]
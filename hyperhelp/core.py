@@ -2,13 +2,20 @@ import sublime
 
 import webbrowser
 
-from .common import log, hh_syntax
+from .common import log, hh_syntax, current_help_package, current_help_file
 from .view import find_help_view, update_help_view, focus_on
 
-from .help_index import _load_help_index, _scan_help_packages
-from .help import _post_process_links, _resource_for_help
+from .help_index import _load_help_index, _reload_help_index
+from .help_index import _discover_help_packages, _help_toc_index
+from .help import _resource_for_help
 from .help import _load_help_file, _display_help_file, _reload_help_file
-from .help import HistoryData, _update_help_history
+from .help import HistoryData, _update_help_history, _help_link_at
+from .help import _find_help_anchor, _next_help_anchor, _view_history
+from .markup import _tokenize_help
+from .search import _topic_completions, _search_topics
+from .search import _search_text, _reindex_help_file
+from .registry import _topic_registry
+from .headers import _recent_help_files
 
 
 ###----------------------------------------------------------------------------
@@ -37,11 +44,14 @@ def help_index_list(reload=False, package=None):
     Obtain or reload the help index information for all packages. This demand
     loads the indexes on first access and can optionally reload all package
     indexes or only a single one, as desired.
+
+    The returned mapping knows all of the packages that have help, but the
+    index for each package is only loaded the first time it's accessed.
     """
     initial_load = False
     if not hasattr(help_index_list, "index"):
         initial_load = True
-        help_index_list.index = _scan_help_packages()
+        help_index_list.index = _discover_help_packages()
 
     if reload and not initial_load:
         help_index_list.index = reload_help_index(help_index_list.index, package)
@@ -58,11 +68,12 @@ def reload_help_index(help_list, package):
     help indexes are reloaded and returned in a new help list.
 
     Attempts to reload a package that is not in the given help list has no
-    effect.
+    effect. Where possible, only the parts of the index that have changed are
+    reloaded.
     """
     if package is None:
         log("Recanning all help index files")
-        return _scan_help_packages()
+        return _discover_help_packages()
 
     pkg_info = help_list.get(package, None)
     if pkg_info is None:
@@ -70,13 +81,22 @@ def reload_help_index(help_list, package):
     else:
         log("Reloading help index for package '%s'", package)
 
-        result = _load_help_index(pkg_info.index_file)
+        result = _reload_help_index(pkg_info)
         if result is not None:
             help_list[result.package] = result
 
     return help_list
 
 
+def help_toc_index(pkg_info):
+    """
+    Get the table of contents for the given help package, compiled into a
+    TocIndex whose nodes are the entries in the table of contents. This is
+    compiled the first time that it's used.
+    """
+    return _help_toc_index(pkg_info)
+
+
 def help_file_resource(pkg_info, help_file):
     """
     Get the resource name that references the help file in the given help
@@ -120,7 +140,63 @@ def reload_help_file(help_list, help_view):
 
     Returns True if the file was reloaded successfully or False if not.
     """
-    return _reload_help_file(help_list, help_view)
+    result = _reload_help_file(help_list, help_view)
+    if result:
+        pkg_info = help_list.get(current_help_package(help_view), None)
+        if pkg_info is not None:
+            _reindex_help_file(pkg_info, current_help_file(help_view))
+
+    return result
+
+
+def tokenize_help(help_text):
+    """
+    Tokenize the given help text the same way that the help syntax does, but
+    without needing a view. Returns HelpTokens, which has parallel arrays that
+    give the kind (one of the TOKEN_* values in the markup module), start and
+    end of every token, in order.
+    """
+    return _tokenize_help(help_text)
+
+
+def help_link_at(help_view, point):
+    """
+    Return the region of the link in the given help view that covers the
+    given point, or None if there isn't one.
+    """
+    return _help_link_at(help_index_list(), help_view, point)
+
+
+def next_help_anchor(help_view, point, prev=False):
+    """
+    Return the [start, end] position of the anchor in the given help view
+    that follows the given point, or that precedes it if prev is True. This
+    wraps around at the end (or start) of the file. Returns None if the help
+    file has no anchors.
+    """
+    return _next_help_anchor(help_index_list(), help_view, point, prev)
+
+
+def resolve_help_topic(pkg_info, topic):
+    """
+    Given a help data tuple or the name of a package, look up the topic and
+    return a tuple of the topic structure and the kind of topic that it is
+    ("file", "pkg_file" or "url").
+
+    This does all manipulations on the incoming topic, such as case folding and
+    space replacement.
+
+    Returns the tuple or None.
+    """
+    if isinstance(pkg_info, str):
+        pkg_info = help_index_list().get(pkg_info, None)
+
+    if pkg_info is not None:
+        topic = pkg_info.help_lookup.get(topic.casefold().replace(" ", "\t"))
+        if topic is not None:
+            return (topic, topic.kind)
+
+    return None
 
 
 def lookup_help_topic(pkg_info, topic):
@@ -133,15 +209,141 @@ def lookup_help_topic(pkg_info, topic):
 
     Returns the topic structure or None.
     """
+    resolved = resolve_help_topic(pkg_info, topic)
+    return resolved[0] if resolved is not None else None
+
+
+def resolve_help_link(package, link):
+    """
+    Given the name of the package that a link appears in and the text of the
+    link, find the topic that the link refers to, which may be in a different
+    package. Returns a tuple of the help data of the package that contains the
+    topic, the topic structure and the kind of topic that it is, or None.
+
+    A link is resolved in its own package first. Failing that, a link of the
+    form "package:topic" refers to the topic in the named package. Any other
+    link refers to the topic in the first package with help that has it, in
+    the order that the packages were found; the help for the packages ahead
+    of that one is loaded as needed to find it.
+    """
+    help_list = help_index_list()
+
+    pkg_info = help_list.get(package, None)
+    if pkg_info is not None:
+        resolved = resolve_help_topic(pkg_info, link)
+        if resolved is not None:
+            return (pkg_info,) + resolved
+
+    # Spaces in links are tabs, but package names use spaces.
+    pkg_name, sep, topic = link.partition(":")
+    target_info = help_list.get(pkg_name.replace("\t", " "), None) if sep else None
+    if target_info is not None:
+        resolved = resolve_help_topic(target_info, topic)
+        return (target_info,) + resolved if resolved is not None else None
+
+    # Loaded packages are checked against the registry; the rest have to be
+    # loaded to know if they have the topic.
+    name = link.casefold().replace(" ", "\t")
+    providers = set(_topic_registry.providers(name))
+    for provider in help_list:
+        if help_list.is_loaded(provider) and provider not in providers:
+            continue
+
+        pkg_info = help_list.get(provider, None)
+        topic = pkg_info.help_lookup.get(name, None) if pkg_info else None
+        if topic is not None:
+            return (pkg_info, topic, topic.kind)
+
+    return None
+
+
+def complete_help_topic(pkg_info, prefix, limit=10):
+    """
+    Given a help data tuple or the name of a package, return a list of at most
+    limit (name, topic) tuples for the topics and aliases whose names start
+    with the provided prefix, in sorted order.
+
+    The prefix is normalized the same as in lookup_help_topic(); the returned
+    names are normalized the same way, so any of them can be looked up.
+    """
     if isinstance(pkg_info, str):
         pkg_info = help_index_list().get(pkg_info, None)
 
     if pkg_info is not None:
-        topic = topic.casefold().replace(" ", "\t")
-        alias = pkg_info.help_aliases.get(topic, None)
-        return pkg_info.help_topics.get(alias or topic, None)
+        return _topic_completions(pkg_info, prefix, limit)
 
-    return None
+    return []
+
+
+def search_help_topics(query, on_done, limit=50):
+    """
+    Do a fuzzy search for the given query over the topics, aliases and topic
+    captions in all help packages. This loads the help for every package.
+
+    on_done is invoked with a list of at most limit (package, name, topic)
+    tuples, with the best match first; name is the normalized topic name and
+    topic is the topic structure. Help that is not loaded and indexed yet is
+    taken care of in the background, so on_done may be invoked after this
+    returns.
+    """
+    _search_topics(help_index_list(), query, limit, on_done)
+
+
+def search_help_text(query, on_done, limit=50):
+    """
+    Do a full text search for the given query over the text of every help file
+    in all help packages. The results are ranked, best match first.
+
+    on_done is invoked with a list of at most limit (package, file, line)
+    tuples, where line is the (0 based) line in the help view on which the
+    match is. The first search builds the full text index in the background,
+    so on_done may be invoked after this returns.
+    """
+    _search_text(help_index_list(), query, limit, on_done)
+
+
+def recent_help_files(on_done, limit=None):
+    """
+    Find the help files in all help packages that have a date in their header.
+    on_done is invoked with a list of at most limit (package, HeaderData)
+    tuples for them, with the most recently updated files first.
+
+    This only needs the header of each help file, which is scanned when its
+    help index is loaded. Help that's not loaded yet is loaded in the
+    background, so on_done may be invoked after this returns.
+    """
+    _recent_help_files(help_index_list(), limit, on_done)
+
+
+def show_help_line(package, help_file, line, history):
+    """
+    Attempt to display the provided help file in the given package with the
+    cursor on the given (0 based) line.
+
+    If history is True, the history for the help view is updated in the same
+    way as for show_help_topic().
+
+    Returns the help view or None on error.
+    """
+    pkg_info = help_index_list().get(package, None)
+    if pkg_info is None:
+        return None
+
+    if history:
+        _update_help_history(find_help_view())
+
+    existing_view = True if find_help_view() is not None else False
+    help_view = display_help_file(pkg_info, help_file)
+    if help_view is None:
+        log("Unable to load help file '%s'", help_file, status=True)
+        return None
+
+    focus_on(help_view, help_view.text_point(line, 0), at_center=True)
+
+    if history and existing_view:
+        _update_help_history(help_view, append=True)
+
+    return help_view
 
 
 def show_help_topic(package, topic, history):
@@ -150,6 +352,9 @@ def show_help_topic(package, topic, history):
     (both strings) as appropriate. This will transparently create a new help
     view, open the underlying package file or open the URL as needed.
 
+    The topic is resolved the same as a link in the package would be, so it
+    can refer to a topic in another package; see resolve_help_link().
+
     If history is True, the history for the help view is updated after a
     successful help navigation to a help file; otherwise the history is left
     untouched. history is implicitly True when this has to create a help view
@@ -158,22 +363,19 @@ def show_help_topic(package, topic, history):
     The return value is None on error or a string that represents the kind of
     topic that was navigated to ("file", "pkg_file" or "url")
     """
-    pkg_info = help_index_list().get(package, None)
-    if pkg_info is None:
-        return None
-
-    topic_data = lookup_help_topic(pkg_info, topic)
-    if topic_data is None:
+    resolved = resolve_help_link(package, topic)
+    if resolved is None:
         log("Unknown help topic '%s'", topic, status=True)
         return None
 
+    pkg_info, topic_data, kind = resolved
     help_file = topic_data["file"]
 
-    if help_file in pkg_info.urls:
+    if kind == "url":
         webbrowser.open_new_tab(help_file)
         return "url"
 
-    if help_file in pkg_info.package_files:
+    if kind == "pkg_file":
         help_file = help_file.replace("Packages/", "${packages}/")
         window = sublime.active_window()
         window.run_command("open_file", {"file": help_file})
@@ -189,19 +391,17 @@ def show_help_topic(package, topic, history):
         log("Unable to load help file '%s'", help_file, status=True)
         return None
 
-    found = False
-    anchors = help_view.settings().get("_hh_nav", [])
-    for anchor in anchors:
-        if topic_data["topic"] == anchor[0].casefold():
-            focus_on(help_view, anchor[1], at_center=True)
-            found = True
+    anchor = _find_help_anchor(help_index_list(), help_view,
+                               topic_data["topic"])
+    if anchor is not None:
+        focus_on(help_view, anchor, at_center=True)
 
     # Update history to track the new file, but only if the help view already
     # existed; otherwise its creation set up the default history already.
     if history and existing_view:
         _update_help_history(help_view, append=True)
 
-    if not found:
+    if anchor is None:
         log("Unable to find topic '%s' in help file '%s'", topic, help_file,
             status=True)
     return "file"
@@ -221,16 +421,16 @@ def navigate_help_history(help_view, prev):
     if help_view is None:
         return False
 
-    hist_pos = help_view.settings().get("_hh_hist_pos")
-    hist_info = help_view.settings().get("_hh_hist")
+    history = _view_history(help_view)
+    hist_pos = history.position
 
-    if (prev and hist_pos == 0) or (not prev and hist_pos == len(hist_info) - 1):
+    if (prev and hist_pos == 0) or (not prev and hist_pos >= len(history) - 1):
         log("Cannot navigate %s through history; already at the end",
             "backwards" if prev else "forwards", status=True)
         return False
 
     hist_pos = (hist_pos - 1) if prev else (hist_pos + 1)
-    entry = HistoryData._make(hist_info[hist_pos])
+    entry = history[hist_pos]
 
     # Update the current history entry's viewport and caret location
     _update_help_history(help_view)
@@ -238,11 +438,13 @@ def navigate_help_history(help_view, prev):
     # Navigate to the destination file in the history; need to manually set
     # the cursor position
     if show_help_topic(entry.package, entry.file, history=False) is not None:
+        # The help view may have been replaced by one from the view pool.
+        help_view = find_help_view() or help_view
         help_view.sel().clear()
         help_view.sel().add(sublime.Region(entry.caret[0], entry.caret[1]))
         help_view.set_viewport_position(entry.viewport, False)
 
-        help_view.settings().set("_hh_hist_pos", hist_pos)
+        _view_history(help_view).position = hist_pos
         return True
 
     return False
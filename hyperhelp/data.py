@@ -1,11 +1,13 @@
 from collections import OrderedDict, namedtuple
+from collections.abc import Mapping, Sequence
 
 
 ###----------------------------------------------------------------------------
 
 
 # A representation of the data that was contained in a hyperhelp help document
-# header. This is used to construct a more human readable header.
+# header. This is used to construct a more human readable header, and is known
+# for every help file in a loaded package through the header table.
 HeaderData = namedtuple("HeaderData", [
     "file", "title", "date"
 ])
@@ -19,11 +21,156 @@ HistoryData = namedtuple("HistoryData", [
 # A representation of all of the help available for a particular package.
 #
 # This tells us all of the information we need about the help for a package at
-# load time so that we don't need to look it up later.
+# load time so that we don't need to look it up later. help_lookup maps every
+# topic and alias name directly to the topic it resolves to. When the index has
+# no table of contents, help_toc is a DefaultToc that lists every topic.
 HelpData = namedtuple("HelpData", [
     "package", "index_file", "description", "doc_root", "help_topics",
-    "help_aliases", "help_files", "package_files", "urls", "help_toc"
+    "help_aliases", "help_files", "package_files", "urls", "help_toc",
+    "help_lookup"
 ])
 
+# The result of rendering a help file for display: the final text of the help
+# view, the list of anchors in it, as [name, [start, end]] pairs, the list of
+# link regions, as [start, end] pairs, and an AnchorIndex for the anchors.
+RenderedHelp = namedtuple("RenderedHelp", [
+    "text", "anchors", "links", "anchor_index"
+])
+
+# An index of the anchors in a rendered help file. positions maps the case
+# folded name of every anchor to the [start, end] of its first occurrence and
+# starts has the start of every anchor in the anchor list, in order.
+AnchorIndex = namedtuple("AnchorIndex", [
+    "positions", "starts"
+])
+
+# The tokens in a help file, as parallel arrays that give the kind of every
+# token (one of the TOKEN_* values in the markup module) and its extent.
+HelpTokens = namedtuple("HelpTokens", [
+    "kinds", "starts", "ends"
+])
+
+# A table of contents compiled into a flat list of nodes, ordered so that the
+# children of every node are next to each other. Node 0 is the root and has no
+# entry. For every node, parents has the index of its parent (-1 for the root),
+# child_start and child_count give the range of its children and rows has the
+# quick panel rows that display its children.
+TocIndex = namedtuple("TocIndex", [
+    "entries", "parents", "child_start", "child_count", "rows"
+])
+
+
+class HelpTopic(Mapping):
+    """
+    A representation of a single topic in a help index, which is a read only
+    mapping with "topic", "caption" and "file" keys. The kind attribute is the
+    kind of link that the topic is ("file", "pkg_file" or "url").
+
+    Large generated indexes have a great many topics, so this is kept small;
+    the file is shared with every other topic in the same help source and a
+    caption that comes from the caption template of the index is only
+    formatted when it's used.
+    """
+    __slots__ = ("topic", "file", "kind", "_caption", "_format")
+
+    _keys = ("topic", "caption", "file")
+
+    def __init__(self, topic, file, caption, caption_format=None):
+        """
+        Create a topic. When caption_format is not None, it's a tuple of the
+        caption template and the package name, and caption is instead the name
+        of the topic to use in the template.
+        """
+        self.topic = topic
+        self.file = file
+        self.kind = "file"
+        self._caption = caption
+        self._format = caption_format
+
+    @property
+    def caption_template(self):
+        """
+        The template that the caption is formatted from, or None if the topic
+        has a caption of its own.
+        """
+        return self._format[0] if self._format is not None else None
+
+    @property
+    def raw_caption(self):
+        """
+        The caption as it's stored; for a caption that comes from the caption
+        template, this is the name of the topic that goes into it.
+        """
+        return self._caption
+
+    @property
+    def caption(self):
+        if self._format is None:
+            return self._caption
+
+        template, package = self._format
+        return template.format(topic=self._caption, source=self.file,
+                               package=package)
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return "HelpTopic(%r)" % dict(self)
+
+    def __reduce__(self):
+        return (HelpTopic, (self.topic, self.file, self._caption, self._format),
+                {"kind": self.kind})
+
+    def __setstate__(self, state):
+        self.kind = state["kind"]
+
+
+class DefaultToc(Sequence):
+    """
+    The table of contents for help whose index doesn't have one, which lists
+    every topic in sorted order. Most of these are never displayed, so the
+    list is only built the first time that an item is used.
+    """
+    __slots__ = ("_topics", "_items")
+
+    def __init__(self, topics):
+        self._topics = topics
+        self._items = None
+
+    def _toc(self):
+        if self._items is None:
+            topics = self._topics
+            self._items = [topics[topic] for topic in sorted(topics)]
+
+        return self._items
+
+    def __getitem__(self, index):
+        return self._toc()[index]
+
+    def __len__(self):
+        return len(self._topics)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, DefaultToc)):
+            return self._toc() == list(other)
+
+        return NotImplemented
+
+    def __repr__(self):
+        return "DefaultToc(%r)" % self._toc()
+
+    def __reduce__(self):
+        return (DefaultToc, (self._topics,))
+
 
 ###----------------------------------------------------------------------------
@@ -1,7 +1,9 @@
 import sublime
 import sublime_plugin
 
-from .core import help_index_list, lookup_help_topic
+from .common import current_help_package, current_help_file
+from .view import drop_help_view_state
+from .core import resolve_help_link, help_link_at
 
 
 ###----------------------------------------------------------------------------
@@ -74,17 +76,24 @@ class HyperhelpEventListener(sublime_plugin.EventListener):
         know if we should try to follow it or not.
         """
         if (view.is_read_only() and command == "drag_select" and
-                args.get("by", None) == "words"):
+                args.get("by", None) == "words" and
+                current_help_package(view) is not None):
             event = args["event"]
             point = view.window_to_text((event["x"], event["y"]))
 
-            if view.match_selector(point, "text.hyperhelp meta.link"):
+            if help_link_at(view, point) is not None:
                 view.window().run_command("hyperhelp_navigate",
                                          {"nav": "follow_link"})
                 return ("noop")
 
         return None
 
+    def on_close(self, view):
+        """
+        Forget the state of help views as they close.
+        """
+        drop_help_view_state(view)
+
     def on_hover(self, view, point, hover_zone):
         """
         If the mouse hovers over a link in a help view, show a popup that
@@ -93,30 +102,30 @@ class HyperhelpEventListener(sublime_plugin.EventListener):
         if hover_zone != sublime.HOVER_TEXT:
             return
 
-        pkg = view.settings().get("_hh_pkg", None)
-        if pkg is None or not view.score_selector(point, "meta.link"):
-            return
-
-        pkg_info = help_index_list().get(pkg, None)
-        if pkg_info is None:
+        pkg = current_help_package(view)
+        link = help_link_at(view, point) if pkg is not None else None
+        if link is None:
             return
 
-        topic = view.substr(view.extract_scope(point))
-        topic_data = lookup_help_topic(pkg_info, topic)
-        if topic_data is None:
+        topic = view.substr(link)
+        resolved = resolve_help_link(pkg, topic)
+        if resolved is None:
             popup = _missing_body % topic
         else:
+            pkg_info, topic_data, kind = resolved
             caption = topic_data["caption"]
             file = topic_data["file"]
 
-            if file in pkg_info.urls:
+            if kind == "url":
                 link_type = "Opens URL: "
-            elif file in pkg_info.package_files:
+            elif kind == "pkg_file":
                 link_type = "Opens File: "
             else:
                 link_type = "Links To: "
-                current_file = view.settings().get("_hh_file", None)
-                if file == current_file:
+                current_file = current_help_file(view)
+                if pkg_info.package != pkg:
+                    file = "%s: %s" % (pkg_info.package, file)
+                elif file == current_file:
                     file = "this file"
 
             popup = _topic_body % (caption, link_type, file)
@@ -0,0 +1,257 @@
+import sublime
+
+from array import array
+import re
+import threading
+import time
+import zlib
+
+from .common import log, load_resource
+from .data import HeaderData
+from .help_index import _add_index_listener
+from .package_archive import _read_package_resources
+
+
+###----------------------------------------------------------------------------
+
+
+_header_prefix_re = re.compile(r'^%hyperhelp(\b|$)')
+_header_keypair_re = re.compile(r'\b([a-z]+)\b="([^"]*)"')
+
+# The number of bytes read from the start of a help file to find its header;
+# a file whose header line is longer than this is loaded in full.
+_header_read_limit = 1024
+
+
+###----------------------------------------------------------------------------
+
+
+class HeaderTable():
+    """
+    The HeaderData of every help file in every package whose headers were
+    scanned, so that they are known without loading the help files.
+
+    For each package this keeps the help data that it was scanned from, a
+    dictionary that maps each help file to its position in the table and
+    parallel lists of the title, date and checksum of the header line of each
+    file. Files without a header have a title of None. The checksum tells if
+    the header line of a file is still the one that was scanned.
+    """
+    def __init__(self):
+        self._packages = dict()
+        self._lock = threading.Lock()
+
+    def help_data(self, package):
+        """
+        Return the help data that the headers of the given package were
+        scanned from, or None if they were not scanned.
+        """
+        with self._lock:
+            entry = self._packages.get(package, None)
+            return entry[0] if entry is not None else None
+
+    def set(self, help_data, headers, checks):
+        """
+        Store the given list of HeaderData (or None for files without a header)
+        for the help files in the given help data, along with the checksum of
+        the header line of each.
+        """
+        files = dict()
+        titles = list()
+        dates = array("d")
+        for pos, (help_file, header) in enumerate(zip(help_data.help_files,
+                                                      headers)):
+            files[help_file] = pos
+            titles.append(header.title if header is not None else None)
+            dates.append(header.date if header is not None else 0.0)
+
+        with self._lock:
+            self._packages[help_data.package] = (help_data, files, titles,
+                                                 dates, array("L", checks))
+
+    def remove(self, package):
+        with self._lock:
+            self._packages.pop(package, None)
+
+    def get(self, package, help_file, check):
+        """
+        Return the HeaderData of the given help file in the given package, or
+        None if it's not known, the file has no header, or the header line no
+        longer has the given checksum.
+        """
+        with self._lock:
+            entry = self._packages.get(package, None)
+            pos = entry[1].get(help_file, None) if entry is not None else None
+            if pos is None or entry[4][pos] != check or entry[2][pos] is None:
+                return None
+
+            return HeaderData(help_file, entry[2][pos], entry[3][pos])
+
+    def update(self, package, header, check):
+        """
+        Replace the HeaderData of one help file in the given package, which
+        has a header line with the given checksum. Nothing happens if the file
+        is not in the table.
+        """
+        with self._lock:
+            entry = self._packages.get(package, None)
+            pos = entry[1].get(header.file, None) if entry is not None else None
+            if pos is not None:
+                entry[2][pos] = header.title
+                entry[3][pos] = header.date
+                entry[4][pos] = check
+
+    def headers(self):
+        """
+        Return a list of (package, HeaderData) tuples for every help file with
+        a header in the table.
+        """
+        result = list()
+        with self._lock:
+            for package, entry in self._packages.items():
+                help_data, files, titles, dates, checks = entry
+                for help_file, pos in files.items():
+                    if titles[pos] is not None:
+                        result.append((package, HeaderData(help_file,
+                                                           titles[pos],
+                                                           dates[pos])))
+
+        return result
+
+
+###----------------------------------------------------------------------------
+
+
+def _parse_header(help_file, header_line):
+    """
+    Given the first line of a help file, check to see if it looks like a help
+    source file, and if so parse the header and return the parsed values back.
+    """
+    if not _header_prefix_re.match(header_line):
+        return None
+
+    title = "No Title Provided"
+    date = 0.0
+
+    for match in re.findall(_header_keypair_re, header_line):
+        if match[0] == "title":
+            title = match[1]
+        elif match[0] == "date":
+            try:
+                date = time.mktime(time.strptime(match[1], "%Y-%m-%d"))
+            except:
+                date = 0.0
+                log("Ignoring invalid file date '%s' in '%s'",
+                    match[1], help_file)
+        else:
+            log("Ignoring unknown header key '%s' in '%s'",
+                match[1], help_file)
+
+    return HeaderData(help_file, title, date)
+
+
+def _header_check(header_line):
+    """
+    Return the checksum of the given header line.
+    """
+    return zlib.crc32(header_line.encode("utf-8"))
+
+
+def _scan_headers(help_data):
+    """
+    Read the header line of every help file in the given help data and store
+    the HeaderData for them in the header table. Only the start of each file
+    is read where possible; files that can only be loaded through the API, or
+    whose first line is not all there in the start of the file, are loaded in
+    full.
+    """
+    res_names = ["Packages/%s/%s" % (help_data.doc_root, help_file)
+                 for help_file in help_data.help_files]
+    found = _read_package_resources(res_names, _header_read_limit)
+
+    headers = list()
+    checks = list()
+    for help_file, res_name in zip(help_data.help_files, res_names):
+        data = found.get(res_name, None)
+        if data is not None and (b"\n" in data or
+                                 len(data) < _header_read_limit):
+            line = data.partition(b"\n")[0].decode("utf-8", "ignore")
+            line = line.rstrip("\r")
+        else:
+            text = load_resource(res_name)
+            line = text.partition("\n")[0] if text is not None else ""
+
+        headers.append(_parse_header(help_file, line))
+        checks.append(_header_check(line))
+
+    _header_table.set(help_data, headers, checks)
+
+
+def _queue_header_scan(package, help_data):
+    """
+    Help index listener that scans the headers of the help files of a package
+    in the background whenever its help data is loaded or replaced, and drops
+    them when it's removed.
+    """
+    if help_data is None:
+        return _header_table.remove(package)
+
+    def scan():
+        if _header_table.help_data(package) is not help_data:
+            _scan_headers(help_data)
+
+    sublime.set_timeout_async(scan, 0)
+
+
+def _help_file_header(package, help_file, header_line):
+    """
+    Return the HeaderData for the given header line of a help file in the
+    given package, or None if it's not a header. The header table is used when
+    it knows this header line; otherwise the line is parsed and the table is
+    updated.
+    """
+    check = _header_check(header_line)
+    header = _header_table.get(package, help_file, check)
+    if header is None:
+        header = _parse_header(help_file, header_line)
+        if header is not None:
+            _header_table.update(package, header, check)
+
+    return header
+
+
+def _recent_help_files(help_list, limit, on_done):
+    """
+    Find the help files in all packages in the given help list that have a
+    date in their header, and call on_done with a list of at most limit
+    (package, HeaderData) tuples for them, most recently updated first.
+
+    Any help that's not loaded yet is loaded and scanned in the background;
+    on_done is called once that finishes.
+    """
+    def find():
+        help_list.load_all()
+        for package, help_data in help_list.items():
+            if _header_table.help_data(package) is not help_data:
+                _scan_headers(help_data)
+
+        headers = [(package, header)
+                   for package, header in _header_table.headers()
+                   if package in help_list and header.date != 0]
+        headers.sort(key=lambda entry: (-entry[1].date, entry[0],
+                                        entry[1].file))
+
+        sublime.set_timeout(lambda: on_done(headers[:limit]), 0)
+
+    sublime.set_timeout_async(find, 0)
+
+
+###----------------------------------------------------------------------------
+
+
+# The headers of the help files of every package that was loaded.
+_header_table = HeaderTable()
+_add_index_listener(_queue_header_scan)
+
+
+###----------------------------------------------------------------------------
@@ -1,20 +1,33 @@
 import sublime
 import sublime_plugin
 
-import re
+from array import array
+from bisect import bisect_left, bisect_right
 import time
 
-from .view import find_help_view, update_help_view
+from .view import find_help_view, update_help_view, find_pooled_help_view
+from .view import pool_help_view, unpool_help_view, adopt_help_view
+from .view import close_help_view, help_view_state, set_help_view_file
 from .common import log, hh_syntax, current_help_file, current_help_package
-from .common import load_resource
-from .data import HeaderData, HistoryData
+from .common import load_resource, load_resources, hh_setting
+from .data import HistoryData, RenderedHelp, AnchorIndex
+from .markup import _tokenize_help
+from .markup import TOKEN_LINK, TOKEN_ANCHOR, TOKEN_HIDDEN_ANCHOR
+from .render_cache import load_rendered_help, store_rendered_help
+from .render_cache import invalidate_rendered_help, _render_fingerprint
+from .render_cache import _render_cache_size
+from .resource_cache import _resource_signature
+from .history import HelpHistory
+from .headers import _header_prefix_re, _parse_header, _help_file_header
 
 
 ###----------------------------------------------------------------------------
 
 
-_header_prefix_re = re.compile(r'^%hyperhelp(\b|$)')
-_header_keypair_re = re.compile(r'\b([a-z]+)\b="([^"]*)"')
+# The generation of the most recent prefetch of linked help files. Displaying
+# a help file starts a new generation, which stops any prefetch that is still
+# working on the files linked from an earlier one.
+_prefetch_generation = 0
 
 
 ###----------------------------------------------------------------------------
@@ -29,14 +42,62 @@ def _resource_for_help(pkg_info, help_file):
     return "Packages/%s/%s" % (pkg_info.doc_root, help_file)
 
 
-def _load_help_file(pkg_info, help_file):
+def _help_date_format(help_view=None):
+    """
+    Get the format of the dates in the headers of help files. This is a
+    setting of the help view, so it can come from the syntax specific
+    settings of help views as well as the user preferences; without a help
+    view, those settings are checked directly.
+    """
+    if help_view is not None:
+        return help_view.settings().get("hyperhelp_date_format", "%x")
+
+    default = hh_setting("hyperhelp_date_format", "%x")
+    return sublime.load_settings("HyperHelp.sublime-settings").get(
+        "hyperhelp_date_format", default)
+
+
+def _load_help_file(pkg_info, help_file, cached=True):
     """
     Load the contents of a help file contained in the provided help package.
-    The help file should be relative to the document root of the package.
+    The help file should be relative to the document root of the package. The
+    resource cache is skipped (and refreshed) when cached is False.
 
     Returns None if the help file cannot be loaded.
     """
-    return load_resource(_resource_for_help(pkg_info, help_file))
+    return load_resource(_resource_for_help(pkg_info, help_file), cached)
+
+
+def _load_help_files(pkg_info, help_files):
+    """
+    Load the contents of all of the given help files contained in the provided
+    help package, returning a dictionary that maps each help file to its
+    contents, or to None if it cannot be loaded.
+    """
+    texts = load_resources([_resource_for_help(pkg_info, help_file)
+                            for help_file in help_files])
+    return {help_file: texts[_resource_for_help(pkg_info, help_file)]
+            for help_file in help_files}
+
+
+def _view_history(view):
+    """
+    Get the HelpHistory of the provided help view, which is created empty if
+    the view has no history yet. The number of entries it can hold follows the
+    hyperhelp_history_limit setting.
+    """
+    limit = hh_setting("hyperhelp_history_limit", 100)
+    state = help_view_state(view)
+    if state is None:
+        return HelpHistory(limit)
+
+    if state.history is None:
+        state.history = HelpHistory(limit)
+
+    history = state.history
+    history.set_limit(limit)
+
+    return history
 
 
 def _update_help_history(view, append=False, selection=None):
@@ -46,7 +107,8 @@ def _update_help_history(view, append=False, selection=None):
     the history list.
 
     When appending a new history entry, any history after the current position
-    in the list is truncated away.
+    in the list is truncated away. When the history is full, the oldest entry
+    is dropped.
 
     The selection used to capture the cursor is the first selection in the
     view unless a selection region is provided.
@@ -55,32 +117,15 @@ def _update_help_history(view, append=False, selection=None):
         return
 
     selection = view.sel()[0] if selection is None else selection
-    settings = view.settings()
-
-    hist_pos = settings.get("_hh_hist_pos", 0)
-    hist_info = settings.get("_hh_hist", [])
-
-    if append:
-        # Truncate all history after this point; new timeline branches out.
-        if hist_pos != len(hist_info) - 1:
-            hist_info = hist_info[:hist_pos + 1]
-
-        # Should probably truncate in the other direction to keep history in
-        # check.
-        hist_pos += 1
-
     history = HistoryData(current_help_package(view),
                           current_help_file(view),
                           view.viewport_position(),
                           (selection.a, selection.b))
 
-    if hist_pos >= len(hist_info):
-        hist_info.append(history)
+    if append:
+        _view_history(view).append(history)
     else:
-        hist_info[hist_pos] = history
-
-    settings.set("_hh_hist_pos", hist_pos)
-    settings.set("_hh_hist", hist_info)
+        _view_history(view).update(history)
 
 
 def _display_help_file(pkg_info, help_file):
@@ -108,24 +153,155 @@ def _display_help_file(pkg_info, help_file):
         if help_file == current_file and pkg_info.package == current_pkg:
             return view
 
-    help_text = _load_help_file(pkg_info, help_file)
-    if help_text is not None:
-        view = update_help_view(help_text, pkg_info.package, help_file,
+    date_format = _help_date_format(view)
+    result = _rendered_help_file(pkg_info, help_file, date_format)
+    if result is not None:
+        fingerprint, rendered = result
+
+        # With a view pool, the help view keeps the file it's showing and a
+        # new help view takes its place, unless the pool has the file already.
+        old_view = None
+        pool_size = hh_setting("hyperhelp_view_pool_size", 0)
+        if pool_size > 0 and view is not None and current_file:
+            pooled = find_pooled_help_view(pkg_info.package, help_file, window)
+            if pooled is not None:
+                if help_view_state(pooled).fingerprint == fingerprint:
+                    unpool_help_view(pooled, view)
+                    pool_help_view(view, pool_size)
+                    return pooled
+
+                close_help_view(pooled)
+
+            pool_help_view(view, pool_size)
+            old_view = view
+
+        view = update_help_view(rendered.text, pkg_info.package, help_file,
                                 hh_syntax("HyperHelp.sublime-syntax"))
+        if old_view is not None:
+            adopt_help_view(view, old_view)
 
         # if there is no history yet, add one selection the start of the file.
-        if not view.settings().has("_hh_hist_pos"):
+        if not _view_history(view):
             _update_help_history(view, selection=sublime.Region(0))
 
-        _post_process_header(view)
-        _post_process_links(view)
-        _post_process_anchors(view)
+        _apply_rendered_help(view, rendered, fingerprint)
 
+        _prefetch_linked_files(pkg_info, help_file, rendered, date_format)
         return view
 
     return log("Unable to find help file '%s'", help_file, status=True)
 
 
+def _rendered_help_file(pkg_info, help_file, date_format):
+    """
+    Get the rendered version of a help file in the provided help package,
+    returning its fingerprint and the RenderedHelp, or None if the file can't
+    be loaded. A file that was rendered before is used as is, as long as
+    nothing that went into rendering it has changed.
+
+    A help file is only loaded to see if it changed when the file that it
+    comes from has no signature.
+    """
+    signature = _resource_signature(_resource_for_help(pkg_info, help_file))
+    help_text = None
+    if signature is None:
+        help_text = _load_help_file(pkg_info, help_file)
+        if help_text is None:
+            return None
+
+    fingerprint = _render_fingerprint(date_format, signature, help_text)
+    rendered = load_rendered_help(pkg_info.package, help_file, fingerprint)
+    if rendered is None:
+        if help_text is None:
+            help_text = _load_help_file(pkg_info, help_file)
+            if help_text is None:
+                return None
+
+        rendered = _render_help_file(help_file, help_text, date_format,
+                                     pkg_info.package)
+        store_rendered_help(pkg_info.package, help_file, fingerprint, rendered)
+
+    return fingerprint, rendered
+
+
+def _view_rendered_help(help_list, help_view):
+    """
+    Get the RenderedHelp for the help file displayed in the given help view,
+    using the provided help list to find the file. A help view that was not
+    rendered into since the plugin was loaded (for example one that was
+    restored with the session) has its help file rendered again.
+
+    Returns None if the view is not a help view or the file can't be loaded.
+    """
+    state = help_view_state(help_view)
+    if state is None:
+        return None
+
+    if state.rendered is None:
+        pkg_info = help_list.get(state.package, None)
+        if pkg_info is None or not state.file:
+            return None
+
+        result = _rendered_help_file(pkg_info, state.file,
+                                     _help_date_format(help_view))
+        if result is None:
+            return None
+
+        state.fingerprint, state.rendered = result
+
+    return state.rendered
+
+
+def _prefetch_targets(pkg_info, help_file, rendered, limit):
+    """
+    Return a list of at most limit help files in the given help package that
+    the links in the rendered help file lead to, with the files that the most
+    links lead to first. Links within the file itself are skipped.
+    """
+    counts = dict()
+    text = rendered.text
+    lookup = pkg_info.help_lookup
+    for start, end in rendered.links:
+        topic = lookup.get(text[start:end].casefold().replace(" ", "\t"))
+        if topic is not None and topic.kind == "file" and topic.file != help_file:
+            counts[topic.file] = counts.get(topic.file, 0) + 1
+
+    # Ties go to the file that is linked to first.
+    order = {file: index for index, file in enumerate(counts)}
+    return sorted(counts, key=lambda file: (-counts[file], order[file]))[:limit]
+
+
+def _prefetch_linked_files(pkg_info, help_file, rendered, date_format):
+    """
+    In the background, load and render the help files that the given rendered
+    help file links to the most, so that following one of its links does not
+    have to wait for that. This stops as soon as another help file is
+    displayed.
+    """
+    global _prefetch_generation
+    _prefetch_generation += 1
+
+    # Prefetching more files than the render cache holds would only push out
+    # the files that were prefetched first (and the one being displayed).
+    limit = min(hh_setting("hyperhelp_prefetch_limit", 3),
+                _render_cache_size() - 1)
+    if limit <= 0:
+        return
+
+    generation = _prefetch_generation
+    targets = _prefetch_targets(pkg_info, help_file, rendered, limit)
+
+    def prefetch():
+        for target in targets:
+            if generation != _prefetch_generation:
+                return
+
+            _rendered_help_file(pkg_info, target, date_format)
+
+    if targets:
+        sublime.set_timeout_async(prefetch, 0)
+
+
 def _reload_help_file(help_list, help_view):
     """
     Reload the help file currently being displayed in the given view to pick
@@ -143,13 +319,14 @@ def _reload_help_file(help_list, help_view):
     pkg_info = help_list.get(package, None)
 
     if pkg_info is not None and file is not None:
-        # Remove the file setting so the view will reload; put it back if the
+        # Remove the file from the view so it will reload; put it back if the
         # reload fails so we can still track what the file used to be.
-        settings = help_view.settings()
-        settings.set("_hh_file", "")
+        set_help_view_file(help_view, package, "")
+        invalidate_rendered_help(package, file)
+        _load_help_file(pkg_info, file, cached=False)
         if _display_help_file(pkg_info, file) is None:
-            settings.set("_hh_file", file)
-            return false
+            set_help_view_file(help_view, package, file)
+            return False
 
         return True
 
@@ -157,126 +334,162 @@ def _reload_help_file(help_list, help_view):
     return False
 
 
-def _parse_header(help_file, header_line):
+def _help_link_at(help_list, help_view, point):
     """
-    Given the first line of a help file, check to see if it looks like a help
-    source file, and if so parse the header and return the parsed values back.
+    Return the region of the link in the given help view that covers the
+    given point, or None if there isn't one. The links are the ones that were
+    found when the help file was rendered.
     """
-    if not _header_prefix_re.match(header_line):
+    rendered = _view_rendered_help(help_list, help_view)
+    if rendered is None:
         return None
 
-    title = "No Title Provided"
-    date = 0.0
-
-    for match in re.findall(_header_keypair_re, header_line):
-        if match[0] == "title":
-            title = match[1]
-        elif match[0] == "date":
-            try:
-                date = time.mktime(time.strptime(match[1], "%Y-%m-%d"))
-            except:
-                date = 0.0
-                log("Ignoring invalid file date '%s' in '%s'",
-                    match[1], help_file)
-        else:
-            log("Ignoring unknown header key '%s' in '%s'",
-                match[1], help_file)
+    # Links never overlap, so only the last one that starts at or before the
+    # point can cover it.
+    pos = bisect_right(rendered.links, [point, float("inf")]) - 1
+    if pos >= 0 and rendered.links[pos][1] >= point:
+        return sublime.Region(*rendered.links[pos])
 
-    return HeaderData(help_file, title, date)
+    return None
 
 
-def _post_process_header(help_view):
+def _format_header(header, date_format):
     """
-    Check if the help file contains a formatted header line. If it does it is
-    replaced with a version that more explicitly describes the help. This
-    includes a link to the top level of the help file itself.
+    Given the HeaderData for a help file, return the expanded version of the
+    header, which more explicitly describes the help. This includes an anchor
+    for the help file itself.
     """
-    help_file = current_help_file(help_view)
-    first_line = help_view.substr(help_view.full_line(0))
-
-    header = _parse_header(help_file, first_line)
-    if header is None:
-        return
-
     _hdr_width = 80
-    _time_fmt = help_view.settings().get("hyperhelp_date_format", "%x")
 
-    file_target = "*%s*" % help_file
+    file_target = "*%s*" % header.file
     title = header.title
     date_str = "Not Available"
 
     if header.date != 0:
-        date_str = time.strftime(_time_fmt, time.localtime(header.date))
+        date_str = time.strftime(date_format, time.localtime(header.date))
 
     # Take into account two extra spaces on either side of the title
     max_title_len = _hdr_width - len(file_target) - len(date_str) - 4
     if len(title) > max_title_len:
         title = title[:max_title_len-1] + '\u2026'
 
-    header_line = "%s  %s  %s\n%s\n" % (
+    return "%s  %s  %s\n%s\n" % (
         file_target,
         "%s" % title.center(max_title_len, " "),
         date_str,
         ("=" * _hdr_width)
     )
 
-    help_view.sel().clear()
-    help_view.sel().add(help_view.full_line(0))
-    help_view.set_read_only(False)
-    help_view.run_command("insert", {"characters": header_line})
-    help_view.set_read_only(True)
 
-
-def _post_process_anchors(help_view):
+def _render_help_file(help_file, help_text, date_format, package=None):
     """
-    Find all of the hidden anchors in the help view and remove the text that
-    marks them as anchors, so they just appear as plain text. The position of
-    these anchors is stored in a setting in the view for later retreival.
+    Render the raw text of the given help file for display, returning a
+    RenderedHelp. This is done in a single pass over the text. When the
+    package is given, the header comes from the header table if it knows it.
+
+    A header line is replaced with its expanded version and the markers are
+    removed from hidden anchors so that they appear as plain text. The anchor
+    list has the name and position of every anchor in the rendered text, in
+    order; the link list has the position of every link.
     """
-    help_view.set_read_only(False)
+    first_line, sep, body = help_text.partition("\n")
+    header = (_help_file_header(package, help_file, first_line)
+              if package is not None else _parse_header(help_file, first_line))
+    text = help_text if header is None else _format_header(header, date_format) + body
+
+    tokens = _tokenize_help(text)
+    kinds, starts, ends = tokens
 
-    regions = help_view.find_by_selector("meta.anchor.hidden")
+    # Text is copied over up to each hidden anchor, which is copied without
+    # its markers; shift is how far back that has moved everything after it.
+    parts = []
     anchors = []
-    adj = 4 * (len(regions) - 1)
-    for pos in reversed(regions):
-        # Adjust the positions of all anchors relative to their position in
-        # the document, since they all move backwards as we process them. Those
-        # closer to the bottom of the document move more.
-        anchor = help_view.substr(pos)
-        adjusted_pos = sublime.Region(pos.a - adj - 2, pos.b - adj - 2)
-        anchors.append([anchor, adjusted_pos])
-        adj -= 4
-
-        # Remove the marker
-        help_view.sel().clear()
-        help_view.sel().add(sublime.Region(pos.a - 2, pos.b + 2))
-        help_view.run_command("insert", {"characters": anchor})
-
-    # Leave the buffer at the top of the file when we're done, by default.
-    help_view.run_command("move_to", {"to": "bof"})
+    links = []
+    last = 0
+    shift = 0
+    for index, kind in enumerate(kinds):
+        if kind == TOKEN_LINK:
+            links.append([starts[index] + shift, ends[index] + shift])
+
+        elif kind == TOKEN_ANCHOR:
+            start, end = starts[index], ends[index]
+            anchors.append([text[start:end], [start + shift, end + shift]])
+
+        elif kind == TOKEN_HIDDEN_ANCHOR:
+            start, end = starts[index], ends[index]
+            parts.append(text[last:start - 2])
+            parts.append(text[start:end])
+            anchors.append([parts[-1], [start + shift - 2, end + shift - 2]])
+            last = end + 2
+            shift -= 4
+
+    parts.append(text[last:])
+    return RenderedHelp("".join(parts), anchors, links,
+                        _build_anchor_index(anchors))
+
+
+def _build_anchor_index(anchors):
+    """
+    Create and return the AnchorIndex for the given list of anchors, which is
+    in the form used in RenderedHelp.
+    """
+    positions = dict()
+    for name, position in reversed(anchors):
+        positions[name.casefold()] = position
 
-    # The full nav list is the list of hidden anchors plus the list of regular
-    # anchors, sorted by position in the buffer. We need to convert regions to
-    # arrays of points because regions are not iterable and can't be stored in
-    # settings.
-    regions = help_view.find_by_selector("meta.anchor")
-    nav_list = ([[a[0], [a[1].a, a[1].b]] for a in reversed(anchors)] +
-                [[help_view.substr(r), [r.a, r.b]] for r in regions])
+    return AnchorIndex(positions, array("i", [pos[0] for name, pos in anchors]))
 
-    help_view.settings().set("_hh_nav", sorted(nav_list,
-                                               key=lambda item: item[1][0]))
 
-    help_view.set_read_only(True)
+def _find_help_anchor(help_list, help_view, anchor):
+    """
+    Return the [start, end] position of the first anchor in the given help
+    view with the given (case folded) name, or None if there isn't one.
+    """
+    rendered = _view_rendered_help(help_list, help_view)
+    if rendered is None:
+        return None
 
+    return rendered.anchor_index.positions.get(anchor, None)
 
-def _post_process_links(help_view):
+
+def _next_help_anchor(help_list, help_view, point, prev):
     """
-    Find all of the links in the provided help view and underline them.
+    Return the [start, end] position of the anchor in the given help view
+    that comes after (or before, if prev is True) the given point, wrapping
+    around at the end (or start) of the file. Returns None if the file has no
+    anchors.
     """
-    regions = help_view.find_by_selector("meta.link")
-    help_view.add_regions("_hh_links", regions, "storage",
+    rendered = _view_rendered_help(help_list, help_view)
+    if rendered is None or not rendered.anchors:
+        return None
+
+    anchors, index = rendered.anchors, rendered.anchor_index
+
+    if prev:
+        pos = bisect_left(index.starts, point) - 1
+        return anchors[pos][1]
+
+    pos = bisect_right(index.starts, point)
+    return anchors[pos if pos < len(anchors) else 0][1]
+
+
+def _apply_rendered_help(help_view, rendered, fingerprint):
+    """
+    Set up the anchors and links of a rendered help file in the provided help
+    view, which already contains the rendered text. The rendered help and its
+    fingerprint are kept in the state of the view for later retrieval and the
+    links are underlined.
+    """
+    help_view.add_regions("_hh_links",
+        [sublime.Region(a, b) for a, b in rendered.links], "storage",
         flags=sublime.DRAW_SOLID_UNDERLINE | sublime.PERSISTENT |
               sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE)
+    state = help_view_state(help_view)
+    state.rendered = rendered
+    state.fingerprint = fingerprint
+
+    # Leave the buffer at the top of the file by default.
+    help_view.run_command("move_to", {"to": "bof"})
 
 
 ###----------------------------------------------------------------------------
@@ -3,14 +3,22 @@ import sublime_plugin
 
 # Inside packages, paths are always posix regardless of the platform in use.
 import posixpath as path
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+import threading
 import os
 import re
 import codecs
+import hashlib
+import json
 
-from .common import log, load_resource
-from .data import HelpData
-from .index_validator import validate_index
+from .common import log, load_resource, hh_setting
+from .data import HelpData, HelpTopic, DefaultToc, TocIndex
+from .index_validator import validate_index, decode_index, check_index
+from .index_cache import index_fingerprint
+from .index_cache import load_cached_index, store_cached_index
 
 
 ###----------------------------------------------------------------------------
@@ -18,12 +26,44 @@ from .index_validator import validate_index
 
 _url_prefix_re = re.compile(r'^https?://')
 
+# Everything that's needed to be able to incrementally reload a help index,
+# retained for each index that is loaded. Parts of the index are only kept as
+# fingerprints, which are enough to tell which parts changed.
+#
+# fingerprint is that of the whole index and keys that of its description,
+# doc_root and default_caption. files maps each help file to the fingerprint of
+# its help_files entry and the names of the topics and of the aliases that it
+# added, in the order they were added; it's None when two help files define the
+# same name, since then the outcome depends on import order. externals is the
+# fingerprint of the externals, ext_aliases and ext_topics are the aliases and
+# topics that they added and toc_items has the fingerprint of each top level
+# table of contents entry, its expanded version (or None if it was skipped)
+# and the names that it references.
+_IndexState = namedtuple("_IndexState", [
+    "help_data", "fingerprint", "keys", "files", "externals", "ext_aliases",
+    "ext_topics", "toc_items"
+])
+
+# The state of every help index that was loaded, keyed by the index resource.
+_index_states = dict()
+
+# The default caption template, for indexes that don't provide one.
+_default_caption = "Topic {topic} in help source {source}"
+
+# The compiled table of contents for every package whose table of contents has
+# been used, as a tuple of the help data it was compiled from and the TocIndex.
+_toc_indexes = dict()
+
+# Functions to call whenever the help data for a package in a help index list
+# is loaded, replaced or removed; see _add_index_listener().
+_index_listeners = list()
+
 
 ###----------------------------------------------------------------------------
 
 
 def _import_topics(package, topics, aliases, help_topic_dict, caption_tpl,
-                   external=False):
+                   external=False, added=None, inserted=None):
     """
     Parse out a dictionary of help topics from the help index and store all
     topics into the topic dictionary passed in. During the parsing, the
@@ -31,9 +71,15 @@ def _import_topics(package, topics, aliases, help_topic_dict, caption_tpl,
 
     When def_captions is True, topics that don't have a caption use the document
     title as the caption by default.
+
+    When added is a set, the name of every topic and alias that is inserted
+    into the topic and alias dictionaries is added to it. When inserted is a
+    dictionary, it's given a tuple for every help source that has the names
+    of the topics and the names of the aliases that were inserted for it, in
+    the order that they were inserted.
     """
-    def _make_caption(topic, source):
-        return caption_tpl.format(topic=topic, source=source, package=package)
+    # Captions that come from the template are only formatted when used.
+    caption_format = (caption_tpl, package)
 
     for help_source in help_topic_dict:
         topic_list = help_topic_dict[help_source]
@@ -47,14 +93,19 @@ def _import_topics(package, topics, aliases, help_topic_dict, caption_tpl,
                 continue
 
         default_caption = topic_list[0] if external else None
+        new_topics = list()
+        new_aliases = list()
 
         # Skip the first entry since it's the title of the help source
         for topic_entry in topic_list[1:]:
             name = topic_entry.get("topic")
             caption = topic_entry.get("caption", None)
             alias_list = topic_entry.get("aliases", [])
+            topic_format = None
             if caption is None:
-                caption = default_caption or _make_caption(name, help_source)
+                caption = default_caption
+                if not caption:
+                    caption, topic_format = name, caption_format
 
             # Turn spaces in the topic name into tabs so they match what's in
             # the buffer at run time. Saves forcing tabs in the index file.
@@ -67,11 +118,11 @@ def _import_topics(package, topics, aliases, help_topic_dict, caption_tpl,
                 log("Topic %s is already an alias in %s:%s",
                     name, package, help_source)
             else:
-                topics[name] = {
-                    "topic": name,
-                    "caption": caption,
-                    "file": help_source
-                }
+                topics[name] = HelpTopic(name, help_source, caption,
+                                         topic_format)
+                new_topics.append(name)
+                if added is not None:
+                    added.add(name)
 
             for new_name in [name.replace(" ", "\t") for name in alias_list]:
                 if new_name in topics:
@@ -82,26 +133,36 @@ def _import_topics(package, topics, aliases, help_topic_dict, caption_tpl,
                         new_name, package, help_source)
                 else:
                     aliases[new_name] = name
+                    new_aliases.append(new_name)
+                    if added is not None:
+                        added.add(new_name)
 
         # All help sources should be in the topic list so you can jump to a
         # file by name. The help file name is the default.
         name = help_source.casefold()
         if name not in topics:
-            topics[name] = {
-                "topic": name,
-                "caption": topic_list[0],
-                "file": help_source
-            }
+            topics[name] = HelpTopic(name, help_source, topic_list[0])
+            new_topics.append(name)
+            if added is not None:
+                added.add(name)
+
+        if inserted is not None:
+            inserted[help_source] = (tuple(new_topics), tuple(new_aliases))
 
     return topics
 
 
-def _merge_externals(package, externals, topics, package_files, urls):
+def _merge_externals(package, externals, topics, package_files, urls,
+                     added=None):
     """
     Merge the externals into the topic list provided. This ensures that there
     are no duplicate topics during the merge (discarding the external) while
     also splitting the externals into package file specifications and urls.
+
+    When added is a set, the name of every external topic that is merged is
+    added to it.
     """
+    known_files = set(package_files).union(urls)
     for topic, entry in externals.items():
         if topic in topics:
             log("Discarding duplicate external topic '%s' in %s:%s",
@@ -109,11 +170,72 @@ def _merge_externals(package, externals, topics, package_files, urls):
             continue
 
         file = entry["file"]
-        file_list = urls if _url_prefix_re.match(file) else package_files
-        if file not in file_list:
+        if file not in known_files:
+            known_files.add(file)
+            file_list = urls if _url_prefix_re.match(file) else package_files
             file_list.append(file)
 
         topics[topic] = entry
+        if added is not None:
+            added.add(topic)
+
+
+def _topic_kind(file, package_files, urls):
+    """
+    Return the kind of link that a topic which references the given file is;
+    this is "url", "pkg_file" or "file".
+    """
+    if file in urls:
+        return "url"
+
+    if file in package_files:
+        return "pkg_file"
+
+    return "file"
+
+
+def _compile_lookup_entry(lookup, name, topics, aliases, package_files, urls):
+    """
+    Update the entry for the given topic or alias name in a compiled lookup
+    table to match the current topic and alias information.
+    """
+    target = aliases.get(name, None) or name
+    topic = topics.get(target, None)
+
+    if topic is None:
+        lookup.pop(name, None)
+    else:
+        kind = _topic_kind(topic.file, package_files, urls)
+        if topic.kind != kind:
+            topic.kind = kind
+        lookup[name] = topic
+
+
+def _compile_lookup(topics, aliases, package_files, urls):
+    """
+    Create the compiled topic lookup table for a help index. This maps every
+    topic and alias directly to the topic that it resolves to, so that looking
+    up a topic is a single probe. The kind of link that each topic is gets
+    recorded in the topic.
+    """
+    package_files = set(package_files)
+    urls = set(urls)
+
+    # Topics can be shared with older help data, where they have the same
+    # kind; they're only written to when they're new.
+    lookup = dict()
+    for name, topic in topics.items():
+        kind = _topic_kind(topic.file, package_files, urls)
+        if topic.kind != kind:
+            topic.kind = kind
+        lookup[name] = topic
+
+    # Aliases take precedence over a topic of the same name, and an alias to a
+    # topic that does not exist resolves to nothing.
+    for name in aliases:
+        _compile_lookup_entry(lookup, name, topics, aliases, package_files, urls)
+
+    return lookup
 
 
 def _get_file_metadata(help_topic_dict):
@@ -130,14 +252,20 @@ def _get_file_metadata(help_topic_dict):
     return retVal
 
 
-def _get_toc_metadata(help_toc_list, topics, aliases, package):
+def _get_toc_metadata(help_toc_list, topics, aliases, package, toc_items=None):
     """
     Given the table of contents key from the help index and the complete list of
-    known topics, return back a table of contents. This will extrapolate a list
-    even if the incoming list is empty or non-existant.
+    known topics, return back a table of contents. If the incoming list is
+    empty or non-existant, the result is a DefaultToc, which lists every topic.
+
+    When toc_items is a list, an entry is appended to it for each top level
+    item in the table of contents, giving the expanded item (or None if it was
+    skipped) and the set of topic and alias names that it references.
     """
     if not help_toc_list:
-        return [topics.get(topic) for topic in sorted(topics.keys())]
+        return DefaultToc(topics)
+
+    refs = set()
 
     def lookup_topic_entry(entry):
         """
@@ -147,12 +275,15 @@ def _get_toc_metadata(help_toc_list, topics, aliases, package):
             # A string looks up a topic directly; this goes through the alias
             # list if it has to.
             topic = entry.replace(" ", "\t")
+            refs.add(topic)
             topic = aliases.get(topic, topic)
+            refs.add(topic)
             return topic, topics.get(topic, None)
 
         # Use the caption for the topic being referenced if not overridden.
         topic = entry["topic"].replace(" ", "\t").casefold()
         alias = aliases.get(topic, None)
+        refs.update((topic, alias or topic))
         base_obj = topics.get(alias or topic, None)
         if base_obj is None:
             return topic, None
@@ -183,7 +314,74 @@ def _get_toc_metadata(help_toc_list, topics, aliases, package):
 
         return retVal
 
-    return expand_topic_list(help_toc_list)
+    if toc_items is None:
+        return expand_topic_list(help_toc_list)
+
+    retVal = list()
+    for item in help_toc_list:
+        refs = set()
+        expanded = expand_topic_list([item])
+        info = expanded[0] if expanded else None
+
+        toc_items.append((info, refs))
+        retVal.extend(expanded)
+
+    return retVal
+
+
+def _compile_toc(pkg_info):
+    """
+    Compile the table of contents of the given help data into a TocIndex.
+    """
+    toc = pkg_info.help_toc
+    entries = [None]
+    parents = array("i", [-1])
+    child_start = array("i")
+    child_count = array("i")
+    rows = list()
+    children = [toc]
+
+    # Nodes are added a level at a time, so the children of each node are
+    # added together and come after all of the nodes at the level before.
+    node = 0
+    while node < len(entries):
+        items = children[node] or []
+        child_start.append(len(entries))
+        child_count.append(len(items))
+
+        node_rows = [] if node == 0 else [["..", "Go back"]]
+        for item in items:
+            entries.append(item)
+            parents.append(node)
+            children.append(item.get("children", None))
+
+            node_rows.append([item["caption"], item["topic"].replace("\t", " ") +
+                (" ({} topics)".format(len(item["children"])) if "children" in item else "")])
+
+        rows.append(node_rows)
+        node += 1
+
+    return TocIndex(entries, parents, child_start, child_count, rows)
+
+
+def _help_toc_index(pkg_info):
+    """
+    Get the compiled table of contents for the given help data, compiling it
+    the first time it's needed.
+    """
+    cached = _toc_indexes.get(pkg_info.package, None)
+    if cached is None or cached[0] is not pkg_info:
+        cached = (pkg_info, _compile_toc(pkg_info))
+        _toc_indexes[pkg_info.package] = cached
+
+    return cached[1]
+
+
+def _index_package(index_res):
+    """
+    Get the name of the package that contains the given index resource.
+    """
+    return path.split(index_res)[0].split("/")[1]
 
 
 def _load_help_index(index_res):
@@ -195,24 +393,50 @@ def _load_help_index(index_res):
     if not index_res.casefold().startswith("packages/"):
         return log("Index source is not in a package: %s", index_res)
 
-    package = path.split(index_res)[0].split("/")[1]
+    package = _index_package(index_res)
     content = load_resource(index_res)
 
     if content is None:
         return log("Unable to load index information for '%s'", package)
 
+    # If this index was loaded before and has not changed since, the result of
+    # the previous load can be used directly; the cache also has what's needed
+    # to incrementally reload it.
+    fingerprint = index_fingerprint(content)
+    state = load_cached_index(index_res, fingerprint)
+    if state is not None:
+        _index_states[index_res] = state
+        return state.help_data
+
     raw_dict = validate_index(content, package)
     if raw_dict is None:
         return None
 
+    return _build_help_data(index_res, package, raw_dict, fingerprint)
+
+
+def _build_help_data(index_res, package, raw_dict, fingerprint):
+    """
+    Given a validated raw help index for a package, create and return the
+    HelpData that represents it. The state needed to incrementally reload the
+    index later is also retained.
+    """
+    # Importing the index changes some of its entries, so the fingerprints of
+    # its parts are taken first.
+    keys = _index_keys_fingerprint(raw_dict)
+    file_prints = {source: _entry_fingerprint(entries)
+                   for source, entries in raw_dict.get("help_files", {}).items()}
+    ext_print = _entry_fingerprint(raw_dict.get("externals", None))
+    toc_prints = [_entry_fingerprint(item)
+                  for item in raw_dict.get("help_contents", None) or ()]
+
     # Top level index keys
     description = raw_dict.pop("description", "Help for %s" % package)
     doc_root = raw_dict.pop("doc_root", None)
     help_files = raw_dict.pop("help_files", dict())
     help_toc = raw_dict.pop("help_contents", None)
     externals = raw_dict.pop("externals", None)
-    caption_tpl = raw_dict.pop("default_caption",
-                                    "Topic {topic} in help source {source}")
+    caption_tpl = raw_dict.pop("default_caption", _default_caption)
 
     # Warn if the dictionary has too many keys
     for key in raw_dict.keys():
@@ -228,37 +452,480 @@ def _load_help_index(index_res):
     # Gather the unique list of topics.
     topic_list = dict()
     alias_list = dict()
-    _import_topics(package, topic_list, alias_list, help_files, caption_tpl)
+    inserted = dict()
+    _import_topics(package, topic_list, alias_list, help_files, caption_tpl,
+                   inserted=inserted)
 
     externals_list = dict()
     package_files = list()
     urls = list()
-    if externals is not None:
-        _import_topics(package, externals_list, alias_list, externals, caption_tpl, external=True)
-        _merge_externals(package, externals_list, topic_list, package_files, urls)
+    ext_aliases, ext_topics = _import_externals(package, externals,
+                                                externals_list, topic_list,
+                                                alias_list, package_files,
+                                                urls, caption_tpl)
+
+    toc_items = list()
+    help_toc = _get_toc_metadata(help_toc, topic_list, alias_list, package,
+                                 toc_items)
 
     # Everything has succeeded.
-    return HelpData(package, index_res, description, doc_root,
+    help_data = HelpData(package, index_res, description, doc_root,
         topic_list, alias_list,
         _get_file_metadata(help_files), package_files, urls,
-        _get_toc_metadata(help_toc, topic_list, alias_list, package))
+        help_toc,
+        _compile_lookup(topic_list, alias_list, package_files, urls))
+
+    claims = {source: _help_source_claims(source, entries)
+              for source, entries in help_files.items()}
+    files = None
+    if _claims_clean(claims):
+        files = {source: (file_prints[source],) + inserted[source]
+                 for source in help_files}
+
+    state = _IndexState(help_data, fingerprint, keys, files, ext_print,
+                        ext_aliases, ext_topics,
+                        [(key,) + item for key, item in zip(toc_prints, toc_items)])
+
+    _index_states[index_res] = state
+    store_cached_index(index_res, fingerprint, state)
+    return help_data
+
+
+def _import_externals(package, externals, externals_list, topics, aliases,
+                      package_files, urls, caption_tpl):
+    """
+    Import the externals from a help index (if any) and merge them into the
+    topic list. Returns a tuple of the set of aliases and the set of topics
+    that were added by the externals.
+    """
+    added = set()
+    ext_topics = set()
+    if externals is not None:
+        _import_topics(package, externals_list, aliases, externals, caption_tpl,
+                       external=True, added=added)
+        _merge_externals(package, externals_list, topics, package_files, urls,
+                         added=ext_topics)
+
+    # Aliases and external topics never share a name, so whatever was added
+    # that's not an external topic is an alias.
+    return added.difference(externals_list), ext_topics
+
+
+def _help_source_claims(help_source, topic_list):
+    """
+    Return the set of all of the topic and alias names that the given entry
+    in the help_files key of a help index would like to define.
+    """
+    claims = {help_source.casefold()}
+    for topic_entry in topic_list[1:]:
+        claims.add(topic_entry["topic"].replace(" ", "\t").casefold())
+        claims.update(name.replace(" ", "\t")
+                      for name in topic_entry.get("aliases", []))
+
+    return claims
 
 
-def _scan_help_packages(help_list=None):
+def _claims_clean(claims):
+    """
+    Given a dictionary of help source claims, return True if no two help
+    sources claim the same name. When this is the case the order that the help
+    sources are imported in does not change the imported result.
+    """
+    seen = set()
+    for names in claims.values():
+        if not seen.isdisjoint(names):
+            return False
+        seen.update(names)
+
+    return True
+
+
+def _entry_fingerprint(entry):
+    """
+    Return the fingerprint of a part of a decoded help index, which tells if
+    that part has changed without having to keep a copy of it.
+    """
+    text = json.dumps(entry, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def _index_keys_fingerprint(raw_dict):
+    """
+    Return the fingerprint of the top level keys of a decoded help index that
+    affect every topic in it.
+    """
+    return _entry_fingerprint([raw_dict.get(key) for key in
+                               ("description", "doc_root", "default_caption")])
+
+
+def _reload_help_index(pkg_info):
+    """
+    Reload the help index for the provided help data, returning back the new
+    HelpData or None on failure.
+
+    When possible, this only imports the parts of the index that changed since
+    it was last loaded, reusing the topics and aliases of the rest; the result
+    is always identical to what loading the index from scratch would give,
+    down to the order of every table.
+    """
+    index_res = pkg_info.index_file
+    state = _index_states.get(index_res, None)
+    if state is None or state.help_data is not pkg_info:
+        return _load_help_index(index_res)
+
+    package = pkg_info.package
+    content = load_resource(index_res, cached=False)
+    if content is None:
+        return log("Unable to load index information for '%s'", package)
+
+    fingerprint = index_fingerprint(content)
+    if fingerprint == state.fingerprint:
+        return pkg_info
+
+    raw_dict = decode_index(content, package)
+    if raw_dict is None:
+        return None
+
+    # Anything other than the topic sections changing alters every topic, so
+    # only a full import will do.
+    if state.files is None or _index_keys_fingerprint(raw_dict) != state.keys:
+        return _full_reload(index_res, package, raw_dict, content, fingerprint)
+
+    new_files = raw_dict.get("help_files", dict())
+    file_prints = {src: _entry_fingerprint(new_files[src]) for src in new_files}
+    changed = [src for src in new_files
+                   if src not in state.files or
+                      state.files[src][0] != file_prints[src]]
+    removed = [src for src in state.files if src not in new_files]
+
+    externals = raw_dict.get("externals", None)
+    ext_print = _entry_fingerprint(externals)
+    help_toc = raw_dict.get("help_contents", None)
+    toc_prints = [_entry_fingerprint(item) for item in help_toc or ()]
+
+    # Only the changed parts of the index need to be validated.
+    partial = {key: value for key, value in raw_dict.items()
+                   if key not in ("help_files", "externals", "help_contents")}
+    partial["help_files"] = {src: new_files[src] for src in changed}
+    if ext_print != state.externals and externals is not None:
+        partial["externals"] = externals
+    if (toc_prints != [item[0] for item in state.toc_items] and
+            "help_contents" in raw_dict):
+        partial["help_contents"] = help_toc
+
+    if check_index(partial, package, content) is None:
+        return None
+
+    # If the changed help files define any name that another file also does,
+    # the result depends on import order; do a full import instead.
+    new_claims = {src: _help_source_claims(src, new_files[src]) for src in changed}
+    claims = {src: set(entry[1]).union(entry[2])
+                  for src, entry in state.files.items()
+                  if src in new_files and src not in new_claims}
+    claims.update(new_claims)
+
+    if not _claims_clean(claims):
+        return _full_reload(index_res, package, raw_dict, content, fingerprint)
+
+    log("Incrementally reloading help index for package '%s'", package)
+
+    # Every name that might now have a different topic or alias entry.
+    changed_names = set(state.ext_aliases).union(state.ext_topics)
+    for src in changed + removed:
+        if src in state.files:
+            changed_names.update(state.files[src][1], state.files[src][2])
+        changed_names.update(new_claims.get(src, ()))
+
+    # The tables are built up again help file by help file, in the same order
+    # as a full import, with the topics and aliases of the unchanged help files
+    # taken from the old help data. That is never modified, since other code
+    # may still be using it.
+    caption_tpl = raw_dict.get("default_caption", _default_caption)
+    topics = dict()
+    aliases = dict()
+    inserted = dict()
+    for src in new_files:
+        if src in new_claims:
+            _import_topics(package, topics, aliases, {src: new_files[src]},
+                           caption_tpl, inserted=inserted)
+            continue
+
+        src_print, src_topics, src_aliases = state.files[src]
+        for name in src_topics:
+            topics[name] = pkg_info.help_topics[name]
+        for name in src_aliases:
+            aliases[name] = pkg_info.help_aliases[name]
+        inserted[src] = (src_topics, src_aliases)
+
+    externals_list = dict()
+    package_files = list()
+    urls = list()
+    ext_aliases, ext_topics = _import_externals(package, externals,
+                                                externals_list, topics,
+                                                aliases, package_files,
+                                                urls, caption_tpl)
+    changed_names.update(ext_aliases, ext_topics)
+
+    # If the set of package files or urls changed, the link kind of any topic
+    # can change, including the ones that the old help data shares, so only a
+    # full import will do.
+    if (set(package_files) != set(pkg_info.package_files) or
+            set(urls) != set(pkg_info.urls)):
+        return _full_reload(index_res, package, raw_dict, content, fingerprint)
+
+    # Top level table of contents entries can be reused as long as they have
+    # not changed and don't reference any name that might have changed.
+    old_items = dict()
+    for key, info, refs in state.toc_items:
+        old_items.setdefault(key, (info, refs))
+
+    toc_items = list()
+    toc = list()
+    for key, item in zip(toc_prints, help_toc or ()):
+        info, refs = old_items.get(key, (None, None))
+        if refs is None or not refs.isdisjoint(changed_names):
+            new_items = list()
+            _get_toc_metadata([item], topics, aliases, package, new_items)
+            info, refs = new_items[0]
+
+        toc_items.append((key, info, refs))
+        if info is not None:
+            toc.append(info)
+
+    help_data = pkg_info._replace(
+        help_topics=topics,
+        help_aliases=aliases,
+        help_files=_get_file_metadata(new_files),
+        package_files=package_files,
+        urls=urls,
+        help_toc=toc if help_toc else DefaultToc(topics),
+        help_lookup=_compile_lookup(topics, aliases, package_files, urls))
+
+    files = {src: (file_prints[src],) + inserted[src] for src in new_files}
+    state = _IndexState(help_data, fingerprint, state.keys, files, ext_print,
+                        ext_aliases, ext_topics, toc_items)
+
+    _index_states[index_res] = state
+    store_cached_index(index_res, fingerprint, state)
+    return help_data
+
+
+def _full_reload(index_res, package, raw_dict, content, fingerprint):
+    """
+    Complete a reload of a help index that can't be done incrementally, given
+    the decoded (but not yet validated) index and its raw content.
+    """
+    if check_index(raw_dict, package, content) is None:
+        return None
+
+    return _build_help_data(index_res, package, raw_dict, fingerprint)
+
+
+def _load_help_indexes(index_list, workers):
+    """
+    Load all of the help index resources in the provided list, returning back
+    a list of the results in the same order as the input list. Entries in the
+    result list are None for indexes that failed to load.
+
+    When workers is larger than 1, the indexes are loaded in a pool of at most
+    that many threads; the results are still returned in input order.
+    """
+    workers = min(workers, len(index_list))
+    if workers <= 1:
+        return [_load_help_index(index_file) for index_file in index_list]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_load_help_index, index_list))
+
+
+def _index_workers(workers=None):
+    """
+    Get the number of worker threads to use when loading several help indexes
+    at once; this is the setting value unless a value is provided.
+    """
+    if workers is None:
+        workers = hh_setting("hyperhelp_index_workers", 1)
+
+    return workers
+
+
+def _scan_help_packages(help_list=None, workers=None):
     """
     Scan for packages with a help index and load them. If a help list is
     provided, only the help for packages not already in the list will be
     loaded.
+
+    The indexes are loaded using the given number of worker threads, which
+    defaults to the hyperhelp_index_workers setting. Results are merged in
+    resource order, so when a package has more than one index, the first one
+    that loads is always the one that is used.
     """
     help_list = dict() if help_list is None else help_list
+    workers = _index_workers(workers)
+
+    index_list = []
     for index_file in sublime.find_resources("hyperhelp.json"):
-        pkg_name = path.split(index_file)[0].split("/")[1]
+        pkg_name = _index_package(index_file)
         if pkg_name not in help_list:
-            result = _load_help_index(index_file)
-            if result is not None:
-                help_list[result.package] = result
+            index_list.append(index_file)
+
+    for result in _load_help_indexes(index_list, workers):
+        if result is not None and result.package not in help_list:
+            help_list[result.package] = result
 
     return help_list
 
 
+def _add_index_listener(listener):
+    """
+    Register a function to be called as listener(package, help_data) whenever
+    the help data for a package in a help index list is loaded or replaced.
+    When a package is removed from a list, help_data is None.
+
+    This allows for state derived from the help data of all packages to be
+    kept up to date without having to load or examine every package.
+    """
+    if listener not in _index_listeners:
+        _index_listeners.append(listener)
+
+
+def _notify_index_listeners(package, help_data):
+    """
+    Tell all registered listeners about a change to the help data for the
+    given package.
+    """
+    for listener in _index_listeners:
+        try:
+            listener(package, help_data)
+        except Exception as error:
+            log("Error in help index listener: %s", error)
+
+
+def _discover_help_packages():
+    """
+    Scan for packages with a help index and return a HelpIndexList that will
+    load them. No indexes are loaded until they are accessed.
+    """
+    return HelpIndexList(sublime.find_resources("hyperhelp.json"))
+
+
+###----------------------------------------------------------------------------
+
+
+class HelpIndexList(MutableMapping):
+    """
+    A mapping of package names to the HelpData for the help in that package.
+
+    The list of packages with help is known up front, but the index for a
+    package is only loaded the first time that its HelpData is accessed. As a
+    result, testing for a package, counting packages or iterating over the
+    package names never loads an index.
+
+    When a package has more than one help index, the first one in resource
+    order that loads is used. Packages whose index can't be loaded are removed
+    from the mapping once the load is attempted.
+    """
+    def __init__(self, index_files=()):
+        self._sources = OrderedDict()
+        self._loaded = dict()
+        self._lock = threading.RLock()
+
+        for index_file in index_files:
+            pkg_name = _index_package(index_file)
+            self._sources.setdefault(pkg_name, []).append(index_file)
+
+    def __contains__(self, package):
+        return package in self._sources
+
+    def __len__(self):
+        return len(self._sources)
+
+    def __iter__(self):
+        return iter(list(self._sources))
+
+    def __getitem__(self, package):
+        with self._lock:
+            help_data = self._loaded.get(package, None)
+            if help_data is not None:
+                return help_data
+
+            if package not in self._sources:
+                raise KeyError(package)
+
+            help_data = self._load(self._sources[package])
+            return self._store(package, help_data)
+
+    def __setitem__(self, package, help_data):
+        with self._lock:
+            self._sources.setdefault(package, [help_data.index_file])
+            self._loaded[package] = help_data
+            _notify_index_listeners(package, help_data)
+
+    def __delitem__(self, package):
+        with self._lock:
+            del self._sources[package]
+            self._loaded.pop(package, None)
+            _notify_index_listeners(package, None)
+
+    def values(self):
+        self.load_all()
+        return [self._loaded[package] for package in self._sources]
+
+    def items(self):
+        self.load_all()
+        return [(package, self._loaded[package]) for package in self._sources]
+
+    def is_loaded(self, package):
+        """
+        Check to see if the index for the given package has been loaded yet.
+        """
+        return package in self._loaded
+
+    def load_all(self, workers=None):
+        """
+        Load the help index for every package that has not been loaded yet,
+        using the provided number of worker threads (or the setting if no
+        value is given).
+        """
+        with self._lock:
+            pending = [pkg for pkg in self._sources if pkg not in self._loaded]
+            results = _load_help_indexes([self._sources[pkg][0] for pkg in pending],
+                                         _index_workers(workers))
+
+            for package, help_data in zip(pending, results):
+                if help_data is None:
+                    help_data = self._load(self._sources[package][1:])
+
+                try:
+                    self._store(package, help_data)
+                except KeyError:
+                    pass
+
+    def _load(self, index_files):
+        """
+        Load the first loadable index from the list of index files given,
+        returning None if none of them can be loaded.
+        """
+        for index_file in index_files:
+            help_data = _load_help_index(index_file)
+            if help_data is not None:
+                return help_data
+
+        return None
+
+    def _store(self, package, help_data):
+        """
+        Store the result of loading the index for a package. A package that
+        could not be loaded is removed and KeyError is raised.
+        """
+        if help_data is None:
+            del self._sources[package]
+            _notify_index_listeners(package, None)
+            raise KeyError(package)
+
+        self._loaded[package] = help_data
+        _notify_index_listeners(package, help_data)
+        return help_data
+
+
 ###----------------------------------------------------------------------------
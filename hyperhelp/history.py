@@ -0,0 +1,92 @@
+from collections import deque
+
+from .data import HistoryData
+
+
+###----------------------------------------------------------------------------
+
+
+# Package and help file names are stored in history entries as indexes into
+# this list; _name_ids maps each name back to its index.
+_names = list()
+_name_ids = dict()
+
+
+###----------------------------------------------------------------------------
+
+
+def _name_id(name):
+    """
+    Get the id that stands for the given package or help file name in history
+    entries, allocating a new one if needed.
+    """
+    name_id = _name_ids.get(name, None)
+    if name_id is None:
+        name_id = _name_ids[name] = len(_names)
+        _names.append(name)
+
+    return name_id
+
+
+class HelpHistory():
+    """
+    The navigation history of a help view, as a list of HistoryData entries
+    and the position of the current entry in it.
+
+    At most limit entries are kept; when the history is full, adding a new
+    entry drops the oldest one. Entries are stored as tuples that use ids for
+    the package and file names, since those are repeated often.
+    """
+    def __init__(self, limit):
+        self._entries = deque(maxlen=max(limit, 1))
+        self.position = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        package, file, viewport, caret = self._entries[index]
+        return HistoryData(_names[package], _names[file], viewport, caret)
+
+    def set_limit(self, limit):
+        """
+        Change the number of entries kept, dropping the oldest entries if there
+        are now too many.
+        """
+        limit = max(limit, 1)
+        if limit != self._entries.maxlen:
+            dropped = max(len(self._entries) - limit, 0)
+            self._entries = deque(self._entries, maxlen=limit)
+            self.position = max(self.position - dropped, 0)
+
+    def update(self, history):
+        """
+        Replace the current entry with the given HistoryData, adding it if the
+        history is empty.
+        """
+        entry = (_name_id(history.package), _name_id(history.file),
+                 tuple(history.viewport), tuple(history.caret))
+
+        if self.position < len(self._entries):
+            self._entries[self.position] = entry
+        else:
+            self._entries.append(entry)
+            self.position = len(self._entries) - 1
+
+    def append(self, history):
+        """
+        Add the given HistoryData as a new entry after the current one, which
+        becomes the current entry. All entries after the current position are
+        truncated away first, since the new timeline branches out from here.
+        """
+        while len(self._entries) > self.position + 1:
+            self._entries.pop()
+
+        self.position = len(self._entries)
+        self.update(history)
+
+        # When full, the new entry pushes out the oldest one.
+        self.position = len(self._entries) - 1
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,103 @@
+import sublime
+
+import os
+import hashlib
+import pickle
+
+from .common import log, hh_setting
+
+
+###----------------------------------------------------------------------------
+
+
+# The version of the cached index data. This needs to be bumped whenever the
+# structure of HelpData or of the reload state (or anything stored inside of
+# them) changes, so that a cache entry written by an older version is never
+# handed back.
+_cache_version = 5
+
+
+###----------------------------------------------------------------------------
+
+
+def _cache_enabled():
+    """
+    Determine if the persistent help index cache is turned on.
+    """
+    return hh_setting("hyperhelp_index_cache", True)
+
+
+def _cache_file(index_res):
+    """
+    Get the name of the file in the cache folder that holds the cached version
+    of the provided index resource.
+    """
+    name = hashlib.sha1(index_res.encode("utf-8")).hexdigest()
+    return os.path.join(sublime.cache_path(), "hyperhelp", "index",
+                        name + ".cache")
+
+
+def index_fingerprint(content):
+    """
+    Return the fingerprint for the raw text of a help index. Cache entries are
+    only used when the fingerprint of the index they were created from matches
+    that of the current index.
+    """
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def load_cached_index(index_res, fingerprint):
+    """
+    Attempt to load the state that was stored for the given index resource
+    from the cache; this has the fully built HelpData along with what's needed
+    to incrementally reload it. Returns None if there is no cache entry or the
+    entry is stale.
+    """
+    if not _cache_enabled():
+        return None
+
+    try:
+        with open(_cache_file(index_res), "rb") as handle:
+            version, res, entry_fingerprint, state = pickle.load(handle)
+
+    except OSError:
+        return None
+
+    except Exception as error:
+        return log("Discarding corrupt index cache for '%s': %s",
+                   index_res, error)
+
+    if (version != _cache_version or res != index_res or
+            entry_fingerprint != fingerprint):
+        return None
+
+    return state
+
+
+def store_cached_index(index_res, fingerprint, state):
+    """
+    Store the state of the given index resource, which has its fully built
+    HelpData, into the cache so that future loads of an unchanged index can
+    skip loading it.
+    """
+    if not _cache_enabled():
+        return
+
+    cache_file = _cache_file(index_res)
+    temp_file = cache_file + ".tmp"
+
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(temp_file, "wb") as handle:
+            pickle.dump((_cache_version, index_res, fingerprint, state),
+                        handle, pickle.HIGHEST_PROTOCOL)
+
+        # Swap the new entry in all at once so a reader never sees a partial
+        # cache file.
+        os.replace(temp_file, cache_file)
+
+    except Exception as error:
+        log("Unable to cache help index '%s': %s", index_res, error)
+
+
+###----------------------------------------------------------------------------
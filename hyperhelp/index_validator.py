@@ -1,14 +1,19 @@
-import sublime
+import re
 
-from .validictory import validate
+from .validictory import compile_schema
 from .validictory import SchemaError, ValidationError
 
 from .common import log
+from .json_decoder import JSONError, decode_json
+from .json_decoder import value_positions, path_position
 
 
 ###----------------------------------------------------------------------------
 
 
+# Match the components of the path to a value in a validation error.
+_error_path_re = re.compile(r'\.([^.\[]+)|\[(\d+)\]')
+
 # The schema to validate that a help file entry in the "help_files" key of the
 # help index is properly formattted.
 _help_file_schema = {
@@ -120,46 +125,123 @@ _index_schema = {
     "additionalProperties": False
 }
 
+# The index schema compiled once up front, so that it doesn't need to be
+# interpreted every time an index is validated.
+_compiled_index_schema = compile_schema(_index_schema)
+
 
 ###----------------------------------------------------------------------------
 
 
-def validate_index(content, package):
+def _validate_fail(package, message, *args):
     """
-    Given a raw JSON string that represents a help index for a package, perform
-    validation on it to ensure that it's valid JSON and also that it conforms
-    to the appropriate index file help schema.
+    Log a failure to validate the index for the given package.
+    """
+    log("Error validating index for '%s': %s", package, message % args)
 
-    Return a decoded dict object on success or None on failure.
+
+def _caption_error(template):
+    """
+    Check that the given caption template can be used to format a caption,
+    returning a description of the problem if it can't, or None if it can.
+    Captions are only formatted when they're displayed, so a problem would
+    not otherwise be seen until then.
+    """
+    try:
+        template.format(topic="", source="", package="")
+    except KeyError as error:
+        return "unknown field %s in '%s'" % (error, template)
+    except (IndexError, ValueError) as error:
+        return "%s in '%s'" % (error, template)
+
+    return None
+
+
+def _error_location(content, error):
+    """
+    Given the raw JSON of an index and a validation error raised while
+    validating it, return a string that says where in the index the error is.
+    """
+    path = getattr(error, "path", "") or ""
+    parts = [key if key else int(index)
+             for key, index in _error_path_re.findall(path)]
+
+    try:
+        return "line %d, column %d" % path_position(value_positions(content),
+                                                     parts)
+    except Exception:
+        return "unknown location"
+
+
+def decode_index(content, package):
     """
-    def validate_fail(message, *args):
-        log("Error validating index for '%s': %s", package, message % args)
+    Given a raw JSON string that represents a help index for a package, decode
+    it and return the decoded dict object on success or None on failure. The
+    result has not been validated against the help schema.
 
+    The index is decoded locally rather than by Sublime, which saves a trip
+    through the plugin host and allows this to be used outside of Sublime.
+    """
     try:
         log("Loading help index for package '%s'", package)
-        raw_dict = sublime.decode_value(content)
-    except:
-        return validate_fail("Invalid JSON detected; unable to decode")
+        return decode_json(content)
+    except JSONError as error:
+        return _validate_fail(package, "Invalid JSON detected; unable to decode: %s",
+                              error)
+
+
+def check_index(raw_dict, package, content=None):
+    """
+    Given a decoded help index for a package, validate that it conforms to the
+    appropriate index file help schema. When the raw JSON for the index is
+    provided, validation errors say where in the index the problem is.
 
+    Return the dict object on success or None on failure.
+    """
     try:
-        validate(raw_dict, _index_schema)
+        _compiled_index_schema.validate(raw_dict)
+
+        template = raw_dict.get("default_caption", None)
+        error = _caption_error(template) if template is not None else None
+        if error is not None:
+            return _validate_fail(package, "in default_caption: %s", error)
+
         return raw_dict
 
     # The schema provided is itself broken.
     except SchemaError as error:
-        return validate_fail("Invalid schema detected: %s", error)
+        return _validate_fail(package, "Invalid schema detected: %s", error)
 
     # One of the fields failed to validate. This generates extremely messy
     # output, but this can be fixed later.
     except ValidationError as error:
-        return validate_fail("in %s: %s", error.fieldname, error)
+        if content is not None:
+            return _validate_fail(package, "in %s (%s): %s", error.fieldname,
+                                  _error_location(content, error), error)
+
+        return _validate_fail(package, "in %s: %s", error.fieldname, error)
 
     # Seems like validictory has a bug in which if you tell it to verify an
     # array has contents but the array is empty, it blows up. This can happen
     # if the array that provides the contents of a help file is empty, for
     # example.
     except Exception as error:
-        return validate_fail("%s", error)
+        return _validate_fail(package, "%s", error)
+
+
+def validate_index(content, package):
+    """
+    Given a raw JSON string that represents a help index for a package, perform
+    validation on it to ensure that it's valid JSON and also that it conforms
+    to the appropriate index file help schema.
+
+    Return a decoded dict object on success or None on failure.
+    """
+    raw_dict = decode_index(content, package)
+    if raw_dict is None:
+        return None
+
+    return check_index(raw_dict, package, content)
 
 
 ###----------------------------------------------------------------------------
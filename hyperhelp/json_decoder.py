@@ -0,0 +1,162 @@
+import json
+import re
+from bisect import bisect_right
+
+
+###----------------------------------------------------------------------------
+
+
+# Match the parts of a JSON document that need special handling to support the
+# extensions that Sublime allows in its JSON files. Everything that isn't a
+# comment or a trailing comma (including whole strings, so that comment markers
+# and commas inside of them are left alone) is matched in long runs to keep the
+# number of matches small. The comments that are skipped while looking for a
+# trailing comma can't stop part way through.
+_comment = r'//[^\n]*(?:\n|\Z)|/\*(?:[^*]|\*(?!/))*\*/'
+_trailing = r'(?=(?:\s|%s)*[\]}])' % _comment
+
+_extension_re = re.compile(r'''
+    (?P<text>(?:[^"/,]+|"[^"\\]*(?:\\.[^"\\]*)*"|/(?![/*])|,(?!%s))+)
+  | (?P<comment>%s)
+  | (?P<comma>,)
+''' % (_trailing, _comment), re.VERBOSE | re.DOTALL)
+
+# Match the tokens in JSON text that has had the extensions stripped from it.
+_token_re = re.compile(r'''
+    (?P<string>"[^"\\]*(?:\\.[^"\\]*)*")
+  | (?P<open>[\[{])
+  | (?P<close>[\]}])
+  | (?P<colon>:)
+  | (?P<comma>,)
+  | (?P<scalar>[^\s\[\]{}:,"]+)
+''', re.VERBOSE | re.DOTALL)
+
+_newline_re = re.compile(r'[^\n]')
+
+
+###----------------------------------------------------------------------------
+
+
+class JSONError(ValueError):
+    """
+    Raised when JSON text can't be decoded; the line and column (both 1 based)
+    of the problem are available as attributes.
+    """
+    def __init__(self, message, line, column):
+        super().__init__("%s (line %d, column %d)" % (message, line, column))
+        self.line = line
+        self.column = column
+
+
+def _strip_extension(match):
+    if match.lastgroup == "text":
+        return match.group(0)
+
+    # Comments and commas are blanked out instead of removed so that the
+    # positions of everything else in the document stay the same.
+    return _newline_re.sub(" ", match.group(0))
+
+
+def strip_extensions(text):
+    """
+    Given JSON text that may contain the extensions that Sublime allows (line
+    and block comments and trailing commas), return a version of the text that
+    is standard JSON. Every character keeps its original line and column.
+    """
+    return _extension_re.sub(_strip_extension, text)
+
+
+def decode_json(text):
+    """
+    Decode the provided JSON text, which may use the extensions that Sublime
+    allows in its JSON files, and return the decoded value. JSONError is
+    raised if the text is not valid.
+    """
+    # Most large documents are generated and so are plain JSON, which can be
+    # decoded without first having to look for the extensions.
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        pass
+
+    try:
+        return json.loads(strip_extensions(text), strict=False)
+    except ValueError as error:
+        raise JSONError(getattr(error, "msg", str(error)),
+                        getattr(error, "lineno", 1),
+                        getattr(error, "colno", 1))
+
+
+def value_positions(text):
+    """
+    Given JSON text that may contain the extensions that Sublime allows, return
+    a dictionary that maps the path to every value in the document to the
+    (line, column) location where that value starts, both 1 based.
+
+    A path is a tuple of the object keys and array indexes that lead to the
+    value; the path of the top level value is the empty tuple. The text is
+    assumed to be valid; this is much slower than decoding, so it's meant to
+    be used only to report the location of problems.
+    """
+    text = strip_extensions(text)
+    line_starts = [0] + [m.end() for m in re.finditer(r'\n', text)]
+
+    def location(offset):
+        line = bisect_right(line_starts, offset) - 1
+        return (line + 1, offset - line_starts[line] + 1)
+
+    positions = dict()
+
+    # Each stack entry is [path, next_index] for arrays and [path, key] for
+    # objects, where key is the key whose value is expected next.
+    stack = []
+    path = ()
+    expect_key = False
+
+    for token in _token_re.finditer(text):
+        kind = token.lastgroup
+        if kind in ("colon", "comma"):
+            if kind == "comma" and stack and isinstance(stack[-1][1], int):
+                stack[-1][1] += 1
+            expect_key = (kind == "comma" and stack and
+                          not isinstance(stack[-1][1], int))
+            continue
+
+        if kind == "close":
+            stack.pop()
+            expect_key = False
+            continue
+
+        if expect_key:
+            stack[-1][1] = json.loads(token.group(0), strict=False)
+            expect_key = False
+            continue
+
+        if stack:
+            path = stack[-1][0] + (stack[-1][1],)
+        positions[path] = location(token.start())
+
+        if kind == "open":
+            if token.group(0) == "[":
+                stack.append([path, 0])
+            else:
+                stack.append([path, None])
+                expect_key = True
+
+    return positions
+
+
+def path_position(positions, path):
+    """
+    Given the result of value_positions() and a path, return the location of
+    the value at that path. If there is no such value, the location of the
+    closest parent value that exists is returned instead.
+    """
+    path = tuple(path)
+    while path not in positions and path:
+        path = path[:-1]
+
+    return positions.get(path, (1, 1))
+
+
+###----------------------------------------------------------------------------
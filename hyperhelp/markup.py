@@ -0,0 +1,165 @@
+from array import array
+import re
+
+from .data import HelpTokens
+
+
+###----------------------------------------------------------------------------
+
+
+# The kinds of tokens in a token table. Every kind is the part of a help file
+# that the help syntax gives the associated meta scope in TOKEN_SCOPES.
+TOKEN_DIRECTIVE = 0
+TOKEN_KEY = 1
+TOKEN_VALUE = 2
+TOKEN_TITLE = 3
+TOKEN_DATE = 4
+TOKEN_KEYBIND = 5
+TOKEN_CODE = 6
+TOKEN_LINK = 7
+TOKEN_ANCHOR = 8
+TOKEN_HIDDEN_ANCHOR = 9
+TOKEN_SEPARATOR = 10
+
+TOKEN_SCOPES = (
+    "meta.directive", "meta.key", "meta.value", "meta.title", "meta.date",
+    "meta.keybind", "meta.code", "meta.link", "meta.anchor",
+    "meta.anchor.hidden", "meta.separator"
+)
+
+# The rules below follow HyperHelp.sublime-syntax. The syntax matches one line
+# at a time, so nothing here is allowed to match across a line break; that's
+# why every negated character class also excludes the newline.
+_author_header_re = re.compile(r'%(hyperhelp)')
+_header_keypair_re = re.compile(r'\b([a-z]+)(=)(")([^"\n]*)(")')
+_expanded_header_re = re.compile(
+    r'\*([^*|\t \n][^*| \n]*)\*[^\S\n]+(.*)[^\S\n]{2,}(.*)')
+
+# The markup in the body of a help file; the alternatives are in the same order
+# as the rules in the syntax, which is what decides between two rules that
+# match at the same position. The lookahead skips quickly over text that can't
+# start any of them.
+_body_token_re = re.compile(r"""
+    (?=[<`|*+=\-\t]|^[ ])
+    (?:
+      (?P<keybind><[^>\n ]*>\t?>?)
+    | (?P<code>`[^`\n]*`)
+    | (?P<block>^[ \t]*```[ \t]*$)
+    | (?P<link>\|(?P<link_name>[^|\t* \n][^|* \n]*)\|)
+    | (?P<anchor>\*(?P<anchor_name>[^*|\t \n][^*| \n]*)\*)
+    | (?P<hidden>\*\|(?P<hidden_name>[^*|\t \n][^*| \n]*)\|\*)
+    | (?P<sep>\+?(?P<sep_char>[=-])(?P=sep_char){3,}[+|]?|\|\t|\t\|)
+    )
+    """, re.MULTILINE | re.VERBOSE)
+
+# The line that ends a code block.
+_code_block_re = re.compile(r'^[ \t]*```[ \t]*$', re.MULTILINE)
+
+# For each alternative in the body regex, the token kind and the group that
+# gives the extent of the token.
+_body_groups = {
+    _body_token_re.groupindex[name]: (kind, _body_token_re.groupindex[group])
+    for name, kind, group in (
+        ("keybind", TOKEN_KEYBIND, "keybind"),
+        ("code", TOKEN_CODE, "code"),
+        ("link", TOKEN_LINK, "link_name"),
+        ("anchor", TOKEN_ANCHOR, "anchor_name"),
+        ("hidden", TOKEN_HIDDEN_ANCHOR, "hidden_name"),
+        ("sep", TOKEN_SEPARATOR, "sep"))
+}
+_block_group = _body_token_re.groupindex["block"]
+
+
+###----------------------------------------------------------------------------
+
+
+def _tokenize_header(text, kinds, starts, ends):
+    """
+    Tokenize the header line at the start of the given help text, which is
+    either an author header or an expanded header. Returns the position that
+    the body of the help starts at.
+    """
+    match = _author_header_re.match(text)
+    if match is not None:
+        end = text.find("\n")
+        end = len(text) if end < 0 else end
+
+        kinds.append(TOKEN_DIRECTIVE)
+        starts.append(match.start(1))
+        ends.append(match.end(1))
+        for pair in _header_keypair_re.finditer(text, match.end(), end):
+            kinds.extend((TOKEN_KEY, TOKEN_VALUE))
+            starts.extend((pair.start(1), pair.start(4)))
+            ends.extend((pair.end(1), pair.end(4)))
+
+        return end
+
+    match = _expanded_header_re.match(text)
+    if match is not None:
+        kinds.extend((TOKEN_ANCHOR, TOKEN_TITLE, TOKEN_DATE))
+        starts.extend((match.start(1), match.start(2), match.start(3)))
+        ends.extend((match.end(1), match.end(2), match.end(3)))
+
+        return match.end()
+
+    return 0
+
+
+def _tokenize_help(text):
+    """
+    Tokenize the given help text the way that the help syntax would, returning
+    HelpTokens with the kind and extent of every token, in order.
+
+    The extent of a link or anchor is just its name, without the characters
+    around it; a code block covers both of its fences and the lines between
+    them, including the line break that ends the closing fence.
+    """
+    kinds = array("B")
+    starts = array("i")
+    ends = array("i")
+
+    pos = _tokenize_header(text, kinds, starts, ends)
+    groups = _body_groups
+    for match in _body_token_re.finditer(text, pos):
+        if match.start() < pos:
+            continue
+
+        index = match.lastindex
+        if index == _block_group:
+            # Nothing inside of a code block is markup; it runs to the end of
+            # the line that closes it, or to the end of the text.
+            body = text.find("\n", match.end())
+            body = len(text) if body < 0 else body + 1
+
+            end = _code_block_re.search(text, body)
+            pos = len(text) if end is None else end.end()
+
+            kinds.append(TOKEN_CODE)
+            starts.append(match.start())
+            ends.append(min(pos + 1, len(text)))
+            continue
+
+        kind, group = groups[index]
+        kinds.append(kind)
+        starts.append(match.start(group))
+        ends.append(match.end(group))
+
+    return HelpTokens(kinds, starts, ends)
+
+
+def _token_regions(tokens, *token_kinds):
+    """
+    Return a list of the (start, end) extents of all of the tokens of the
+    given kinds in a token table, in order.
+    """
+    if len(token_kinds) == 1:
+        kind = token_kinds[0]
+        return [(tokens.starts[index], tokens.ends[index])
+                for index, value in enumerate(tokens.kinds) if value == kind]
+
+    token_kinds = set(token_kinds)
+    return [(tokens.starts[index], tokens.ends[index])
+            for index, value in enumerate(tokens.kinds) if value in token_kinds]
+
+
+###----------------------------------------------------------------------------
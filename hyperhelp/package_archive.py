@@ -0,0 +1,291 @@
+import sublime
+
+from contextlib import contextmanager
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+
+###----------------------------------------------------------------------------
+
+
+# The layout of the records of a zip file that are needed to find and read the
+# members of a sublime-package file.
+_end_record = struct.Struct("<4s4H2LH")
+_central_record = struct.Struct("<4s6H3L5H2L")
+_local_record = struct.Struct("<4s5H3L2H")
+
+_end_signature = b"PK\x05\x06"
+_central_signature = b"PK\x01\x02"
+_local_signature = b"PK\x03\x04"
+
+# The end record is at the end of the file, possibly followed by a comment of
+# up to this many bytes.
+_max_comment = 0xFFFF
+
+_stored = 0
+_deflated = 8
+
+# When only the start of a compressed member is wanted, it's decompressed in
+# pieces of this many bytes until there is enough.
+_chunk_size = 1024
+
+
+###----------------------------------------------------------------------------
+
+
+class PackageArchive():
+    """
+    The members of a sublime-package file, indexed from its central directory
+    so that any of them can be read directly, without going through the API.
+
+    The central directory is only read once; the archive is mapped into memory
+    while members are being read from it, which can be done for many members
+    at once. The file is not kept open in between, so that it can still be
+    replaced when the package is upgraded.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.signature = _file_signature(path)
+        self.members = dict()
+
+        with self._mapped() as data:
+            self._index(data)
+
+    def __contains__(self, member):
+        return member in self.members
+
+    def read(self, member, limit=None):
+        """
+        Return the contents of the given member of the archive, or None if
+        there is no such member or it can't be read. With a limit, at most
+        that many bytes from the start of the member are returned.
+        """
+        return self.read_many([member], limit).get(member, None)
+
+    def read_many(self, members, limit=None):
+        """
+        Return a dictionary with the contents of all of the given members of
+        the archive; members that don't exist or can't be read are left out.
+        The members are read in the order they appear in the archive. With a
+        limit, at most that many bytes from the start of each member are read.
+        """
+        wanted = [m for m in members if m in self.members]
+        wanted.sort(key=lambda m: self.members[m][3])
+
+        result = dict()
+        if wanted:
+            with self._mapped() as data:
+                for member in wanted:
+                    content = self._extract(data, limit, *self.members[member])
+                    if content is not None:
+                        result[member] = content
+
+        return result
+
+    @contextmanager
+    def _mapped(self):
+        with open(self.path, "rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield data
+            finally:
+                data.close()
+
+    def _index(self, data):
+        """
+        Read the central directory of the archive to find the position and
+        size of every file in it.
+        """
+        end = data.rfind(_end_signature,
+                         max(len(data) - _end_record.size - _max_comment, 0))
+        if end < 0:
+            raise ValueError("not a zip file")
+
+        (sig, disk, cd_disk, disk_count, count,
+         cd_size, cd_offset, comment_len) = _end_record.unpack_from(data, end)
+
+        pos = cd_offset
+        for entry in range(count):
+            (sig, made_by, needed, flags, method, mod_time, mod_date, crc,
+             csize, usize, name_len, extra_len, comment_len, disk_start,
+             int_attr, ext_attr, offset) = _central_record.unpack_from(data, pos)
+            if sig != _central_signature:
+                raise ValueError("bad central directory")
+
+            name = data[pos + _central_record.size:
+                        pos + _central_record.size + name_len]
+            name = name.decode("utf-8" if flags & 0x800 else "cp437")
+            pos += _central_record.size + name_len + extra_len + comment_len
+
+            # Directories, encrypted members and members that need zip64
+            # extensions are left for the API to deal with.
+            if (name.endswith("/") or flags & 0x1 or
+                    0xFFFFFFFF in (csize, usize, offset)):
+                continue
+
+            self.members[name.replace("\\", "/")] = (method, csize, usize, offset)
+
+    def _extract(self, data, limit, method, csize, usize, offset):
+        """
+        Return the contents of the member with the given details, as taken
+        from the central directory, or None if it can't be read. Only as much
+        of the member as is needed for the first limit bytes is read.
+        """
+        (sig, needed, flags, method_, mod_time, mod_date, crc, csize_, usize_,
+         name_len, extra_len) = _local_record.unpack_from(data, offset)
+        if sig != _local_signature:
+            return None
+
+        start = offset + _local_record.size + name_len + extra_len
+        end = start + csize
+
+        if method == _stored:
+            return data[start:end if limit is None else min(end, start + limit)]
+        if method == _deflated:
+            decompressor = zlib.decompressobj(-15)
+            try:
+                if limit is None:
+                    return decompressor.decompress(data[start:end])
+
+                content = b""
+                while len(content) < limit and start < end:
+                    chunk = data[start:min(start + _chunk_size, end)]
+                    start += len(chunk)
+                    content += decompressor.decompress(chunk,
+                                                       limit - len(content))
+                return content
+            except zlib.error:
+                return None
+
+        return None
+
+
+###----------------------------------------------------------------------------
+
+
+def _file_signature(path):
+    """
+    Return the modification time and size of the given file, or None if it
+    does not exist.
+    """
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime, stat.st_size)
+    except OSError:
+        return None
+
+
+def _package_archive_path(package):
+    """
+    Return the name of the sublime-package file that provides the given
+    package, or None if it's not a packed package. As in Sublime, a package in
+    the Installed Packages folder overrides one that ships with Sublime.
+    """
+    archive = package + ".sublime-package"
+    for folder in (sublime.installed_packages_path(),
+                   os.path.join(os.path.dirname(sublime.executable_path()),
+                                "Packages")):
+        path = os.path.join(folder, archive)
+        if os.path.isfile(path):
+            return path
+
+    return None
+
+
+def _package_archive(package):
+    """
+    Return the PackageArchive for the given package, or None if it's not a
+    packed package. The archive is indexed again when its file has changed.
+    """
+    path = _package_archive_path(package)
+    if path is None:
+        return None
+
+    with _archive_lock:
+        archive = _archives.get(path, None)
+        if archive is None or archive.signature != _file_signature(path):
+            try:
+                archive = _archives[path] = PackageArchive(path)
+            except (OSError, ValueError, struct.error):
+                _archives.pop(path, None)
+                return None
+
+        return archive
+
+
+def _resource_location(res_name):
+    """
+    Find where the resource with the given name is loaded from, following the
+    same rules as Sublime: a loose file in the Packages folder overrides a file
+    in a packed package. Returns the name of the loose file and None, or the
+    name of the sublime-package file and the member in it; returns None if the
+    resource is in neither.
+    """
+    root = os.path.split(sublime.packages_path())[0]
+    file_name = os.path.join(root, res_name)
+    if os.path.isfile(file_name):
+        return (file_name, None)
+
+    parts = res_name.split("/", 2)
+    if len(parts) == 3 and parts[0] == "Packages":
+        archive = _package_archive(parts[1])
+        if archive is not None and parts[2] in archive:
+            return (archive.path, parts[2])
+
+    return None
+
+
+def _read_package_resources(res_names, limit=None):
+    """
+    Read the given resources straight from disk, returning a dictionary of
+    the binary content of each resource that was found, either as a loose
+    file or in a packed package. Members of the same package are read from it
+    in one batch. With a limit, only that many bytes from the start of each
+    resource are read.
+    """
+    result = dict()
+    packed = dict()
+    for res_name in res_names:
+        location = _resource_location(res_name)
+        if location is None:
+            continue
+
+        path, member = location
+        if member is not None:
+            packed.setdefault(path, dict())[member] = res_name
+            continue
+
+        try:
+            with open(path, "rb") as handle:
+                result[res_name] = handle.read(-1 if limit is None else limit)
+        except OSError:
+            pass
+
+    for path, members in packed.items():
+        with _archive_lock:
+            archive = _archives.get(path, None)
+        try:
+            contents = (archive.read_many(members, limit)
+                        if archive is not None else {})
+        except (OSError, ValueError, struct.error):
+            contents = {}
+
+        for member, content in contents.items():
+            result[members[member]] = content
+
+    return result
+
+
+###----------------------------------------------------------------------------
+
+
+# The packed packages that resources were read from, keyed by the name of the
+# sublime-package file.
+_archives = dict()
+_archive_lock = threading.Lock()
+
+
+###----------------------------------------------------------------------------
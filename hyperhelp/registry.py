@@ -0,0 +1,72 @@
+import threading
+
+from .help_index import _add_index_listener
+
+
+###----------------------------------------------------------------------------
+
+
+class TopicRegistry():
+    """
+    A registry of the topic and alias names in every loaded help package, used
+    to find the package that provides a topic when a link can't be resolved in
+    the package it's in.
+
+    Every name maps to the list of packages that define it, in the order that
+    the packages were loaded. Packages are updated one at a time as they're loaded,
+    replaced or removed; only the names that were added or removed are
+    touched.
+    """
+    def __init__(self):
+        self._providers = dict()
+        self._names = dict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, package):
+        return package in self._names
+
+    def update(self, package, help_data):
+        """
+        Record the names in the given help data as being provided by the given
+        package, replacing the names that were previously recorded for it. If
+        help_data is None, the package is removed.
+        """
+        # The lookup table can change in place when the index is reloaded,
+        # so the names that were recorded are kept separately.
+        names = set() if help_data is None else set(help_data.help_lookup)
+
+        with self._lock:
+            old_names = self._names.pop(package, set())
+            providers = self._providers
+
+            for name in old_names - names:
+                packages = providers[name]
+                packages.remove(package)
+                if not packages:
+                    del providers[name]
+
+            for name in names - old_names:
+                providers.setdefault(name, []).append(package)
+
+            if help_data is not None:
+                self._names[package] = names
+
+    def providers(self, name):
+        """
+        Return a list of the packages that provide the given (normalized) topic
+        or alias name, in the order that they were loaded.
+        """
+        with self._lock:
+            return list(self._providers.get(name, ()))
+
+
+###----------------------------------------------------------------------------
+
+
+# The registry of the names provided by every package that has been loaded. This
+# is updated every time a package is loaded, replaced or removed.
+_topic_registry = TopicRegistry()
+_add_index_listener(_topic_registry.update)
+
+
+###----------------------------------------------------------------------------
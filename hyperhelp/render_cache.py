@@ -0,0 +1,165 @@
+from collections import OrderedDict
+import threading
+
+from .common import hh_setting
+from .index_cache import index_fingerprint
+from .help_index import _add_index_listener
+
+
+###----------------------------------------------------------------------------
+
+
+class RenderCache():
+    """
+    A cache of the most recently rendered help files, so that displaying a file
+    again (for example while moving through the history) does not have to
+    post process it again.
+
+    Entries are keyed by package and help file and remember the fingerprint of
+    what they were rendered from (see _render_fingerprint()); an entry is only
+    used when the fingerprint still matches. The least recently used entry is
+    evicted when the cache is full.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, package, help_file, fingerprint):
+        """
+        Return the RenderedHelp for the given help file in the given package,
+        or None if there is no entry or its fingerprint does not match.
+        """
+        key = (package, help_file)
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None or entry[0] != fingerprint:
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def store(self, package, help_file, fingerprint, rendered, size):
+        """
+        Store the RenderedHelp for the given help file in the given package,
+        replacing any existing entry and evicting the least recently used
+        entries to keep at most size entries.
+        """
+        key = (package, help_file)
+        with self._lock:
+            self._entries[key] = (fingerprint, rendered)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > max(size, 0):
+                self._entries.popitem(last=False)
+
+    def invalidate(self, package, help_file=None):
+        """
+        Remove the entry for the given help file in the given package, or the
+        entries for every help file in the package if no file is given.
+        """
+        with self._lock:
+            if help_file is not None:
+                self._entries.pop((package, help_file), None)
+                return
+
+            for key in [key for key in self._entries if key[0] == package]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+###----------------------------------------------------------------------------
+
+
+def _render_cache_size():
+    """
+    Get the number of rendered help files to keep in the render cache; 0 turns
+    the cache off.
+    """
+    return hh_setting("hyperhelp_render_cache_size", 16)
+
+
+def _render_fingerprint(date_format, signature, help_text=None):
+    """
+    Return the fingerprint of the rendered version of a help file, given the
+    signature of the file it comes from, or its text if it has no signature.
+    The date format is part of it since it changes how the header is rendered.
+    """
+    if signature is not None:
+        return "%r\0%s" % (signature, date_format)
+
+    return index_fingerprint("%s\0%s" % (date_format, help_text))
+
+
+def load_rendered_help(package, help_file, fingerprint):
+    """
+    Get the cached RenderedHelp for the given help file in the given package,
+    if there is one for the given fingerprint. Returns None otherwise.
+    """
+    if _render_cache_size() <= 0:
+        return None
+
+    return _render_cache.get(package, help_file, fingerprint)
+
+
+def store_rendered_help(package, help_file, fingerprint, rendered):
+    """
+    Store the RenderedHelp for the given help file in the given package into
+    the render cache.
+    """
+    size = _render_cache_size()
+    if size <= 0:
+        return _render_cache.clear()
+
+    _render_cache.store(package, help_file, fingerprint, rendered, size)
+
+
+def _index_changed(package, help_data):
+    """
+    Help index listener that drops everything rendered from a package when its
+    help is replaced by different help, or removed. Loading the help for a
+    package for the first time, or loading the same help again (for example
+    from the index cache), leaves what was rendered from it alone.
+    """
+    with _render_lock:
+        old = _render_sources.pop(package, None)
+        if help_data is not None:
+            _render_sources[package] = (help_data.index_file,
+                                        help_data.doc_root,
+                                        help_data.help_files)
+
+        new = _render_sources.get(package, None)
+
+    if old is not None and old != new:
+        _render_cache.invalidate(package)
+
+
+def invalidate_rendered_help(package, help_file=None):
+    """
+    Drop the cached render of the given help file in the given package, or of
+    every help file in the package if no file is given.
+    """
+    _render_cache.invalidate(package, help_file)
+
+
+###----------------------------------------------------------------------------
+
+
+# The rendered versions of the most recently displayed help files. Everything
+# rendered from a package is dropped when its help is replaced or removed.
+_render_cache = RenderCache()
+
+# For every package whose help was loaded, the parts of its help data that the
+# help files that were rendered from it depend on.
+_render_sources = dict()
+_render_lock = threading.Lock()
+
+_add_index_listener(_index_changed)
+
+
+###----------------------------------------------------------------------------
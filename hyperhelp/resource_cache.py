@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import threading
+
+from .package_archive import _resource_location, _file_signature
+
+
+###----------------------------------------------------------------------------
+
+
+class ResourceCache():
+    """
+    A cache of the decoded text of recently loaded resources, so that loading
+    the same help file or index again does not have to fetch and decode it
+    again.
+
+    Entries are keyed by resource name and remember the signature of the file
+    that the resource came from; an entry is only used when the signature
+    still matches. A resource without a signature can't be checked, so it is
+    never cached. The cache holds at most a given number of bytes of resource
+    data, evicting the least recently used entries to stay within it.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """
+        The number of bytes of resource data in the cache.
+        """
+        return self._bytes
+
+    def get(self, res_name, signature):
+        """
+        Return the text of the given resource, or None if there is no entry or
+        its signature does not match.
+        """
+        if signature is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(res_name, None)
+            if entry is None or entry[0] != signature:
+                return None
+
+            self._entries.move_to_end(res_name)
+            return entry[2]
+
+    def store(self, res_name, signature, size, text, budget):
+        """
+        Store the text of the given resource, which was size bytes before it
+        was decoded, replacing any existing entry. The least recently used
+        entries are evicted to keep at most budget bytes in the cache; a
+        resource larger than that or without a signature is not stored at all.
+        """
+        with self._lock:
+            self._discard(res_name)
+            if size > budget or signature is None:
+                return
+
+            self._entries[res_name] = (signature, size, text)
+            self._bytes += size
+
+            while self._bytes > budget:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+
+    def invalidate(self, res_name):
+        """
+        Remove the entry for the given resource, if there is one.
+        """
+        with self._lock:
+            self._discard(res_name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _discard(self, res_name):
+        entry = self._entries.pop(res_name, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+###----------------------------------------------------------------------------
+
+
+def _resource_signature(res_name):
+    """
+    Return the signature of the file that the given resource is loaded from,
+    as a tuple of its modification time and size. This is the loose file in
+    the packages folder when there is one (since that overrides a packed
+    version) and the sublime-package file of the package otherwise.
+
+    Returns None when neither can be found.
+    """
+    location = _resource_location(res_name)
+    return _file_signature(location[0]) if location is not None else None
+
+
+###----------------------------------------------------------------------------
+
+
+# The text of the most recently loaded resources.
+_resource_cache = ResourceCache()
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,747 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import hashlib
+import heapq
+import math
+import re
+from string import Formatter
+import threading
+import time
+
+import sublime
+
+from .common import log
+from .help_index import _add_index_listener
+from .help import _load_help_file, _load_help_files, _header_prefix_re
+from .help import _resource_for_help
+from .resource_cache import _resource_signature
+
+
+###----------------------------------------------------------------------------
+
+
+# The sorted topic and alias names for each package that has had completions
+# requested, as a tuple of the help data they were created from and the list of
+# names. Help data is never modified once loaded (a reload creates a new one),
+# so the list is valid for as long as the package still has the same help data.
+_completion_names = dict()
+
+
+###----------------------------------------------------------------------------
+
+
+def _topic_names(pkg_info):
+    """
+    Get the sorted list of the names of all topics and aliases in the given
+    help package that can be looked up, creating it if needed.
+    """
+    entry = _completion_names.get(pkg_info.package, None)
+    if entry is None or entry[0] is not pkg_info:
+        # Aliases are stored as they appear in the index, so any that are not
+        # already case folded can never be the result of a lookup.
+        names = sorted(name for name in pkg_info.help_lookup
+                       if name == name.casefold())
+        entry = (pkg_info, names)
+        _completion_names[pkg_info.package] = entry
+
+    return entry[1]
+
+
+def _topic_completions(pkg_info, prefix, limit):
+    """
+    Return a list of at most limit (name, topic) tuples for the topics and
+    aliases in the given help package whose names start with the provided
+    prefix, in sorted order. The name is the normalized topic or alias name.
+    """
+    names = _topic_names(pkg_info)
+    prefix = prefix.casefold().replace(" ", "\t")
+
+    result = list()
+    index = bisect_left(names, prefix)
+    for name in names[index:index + limit]:
+        if not name.startswith(prefix):
+            break
+
+        result.append((name, pkg_info.help_lookup[name]))
+
+    return result
+
+
+###----------------------------------------------------------------------------
+
+
+def _trigrams(text, tail=True):
+    """
+    Return the set of trigrams in the given (normalized) text. The text is
+    padded with a space at the start so that the start of the text is more
+    significant; it is also padded at the end unless tail is False, which is
+    used for search queries where the last word may not be complete yet.
+    """
+    text = " " + text + (" " if tail else "")
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _split_caption_template(template, package):
+    """
+    Split the given caption template into the text that's the same in every
+    caption formatted from it, with the package name filled in and a space in
+    place of every other field, and the set of the names of those fields.
+    """
+    text = list()
+    fields = set()
+    for literal, field, _, _ in Formatter().parse(template):
+        text.append(literal)
+        if field == "package":
+            text.append(package)
+        elif field:
+            text.append(" ")
+            fields.add(field)
+
+    return "".join(text), fields
+
+
+def _normalize_text(text):
+    """
+    Normalize text that is being indexed or searched for.
+    """
+    return " ".join(text.casefold().split())
+
+
+class TopicSearchIndex():
+    """
+    A trigram index over the topics in any number of help packages, used to do
+    a fuzzy search for topics across all packages at once.
+
+    Every topic is an entry whose searchable text is made up of the topic, its
+    caption and all of its aliases. Each trigram maps to an array of the ids of
+    the entries that contain it, so a search only has to look at the entries
+    that share the rarest trigrams in the query.
+
+    Packages are added and replaced one at a time. Replacing or removing a
+    package leaves its old entries behind as tombstones, which are compacted
+    away once they make up half of the index. Changes can also be queued and
+    applied later; a search only sees the changes that were applied.
+    """
+    def __init__(self):
+        self._entries = list()
+        self._postings = dict()
+        self._packages = dict()
+        self._pending = dict()
+        self._tombstones = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, package):
+        return package in self._packages
+
+    def __len__(self):
+        return len(self._entries) - self._tombstones
+
+    def packages(self):
+        """
+        Return a list of the packages whose topics are in the index.
+        """
+        return list(self._packages)
+
+    def help_data(self, package):
+        """
+        Return the help data that the index entries for the given package were
+        created from, or None if the package is not in the index.
+        """
+        entry = self._packages.get(package, None)
+        return entry[0] if entry is not None else None
+
+    def update(self, pkg_info):
+        """
+        Add the topics from the given help data to the index, replacing any
+        topics that were previously added for the same package.
+        """
+        aliases = dict()
+        for alias, topic in pkg_info.help_aliases.items():
+            aliases.setdefault(topic, []).append(alias)
+
+        # Captions that come from a template are not formatted; the words are
+        # the same as long as the text of the template is there along with
+        # the parts of the caption that are particular to the topic.
+        templates = dict()
+
+        with self._lock:
+            self._remove(pkg_info.package)
+
+            ids = list()
+            for name, topic in pkg_info.help_topics.items():
+                words = [name] + aliases.get(name, [])
+                template = topic.caption_template
+                if template is None:
+                    words.append(topic.raw_caption)
+                else:
+                    if template not in templates:
+                        templates[template] = _split_caption_template(
+                            template, pkg_info.package)
+
+                    fixed, fields = templates[template]
+                    words.append(fixed)
+                    if "topic" in fields:
+                        words.append(topic.raw_caption)
+                    if "source" in fields:
+                        words.append(topic.file)
+
+                text = _normalize_text(" ".join(words))
+
+                entry_id = len(self._entries)
+                self._entries.append((pkg_info.package, name, topic, text))
+                self._add_postings(entry_id, text)
+                ids.append(entry_id)
+
+            self._packages[pkg_info.package] = (pkg_info, ids)
+            self._compact()
+
+    def remove(self, package):
+        """
+        Remove the topics for the given package from the index, if any.
+        """
+        with self._lock:
+            self._remove(package)
+            self._compact()
+
+    def is_pending(self):
+        """
+        Check to see if there are queued changes that were not applied yet.
+        """
+        return bool(self._pending)
+
+    def queue(self, package, help_data):
+        """
+        Queue an update of the given package with the provided help data, or
+        its removal if help_data is None. Only the last change queued for a
+        package is applied.
+        """
+        with self._lock:
+            self._pending[package] = help_data
+
+    def flush(self):
+        """
+        Apply all queued changes to the index.
+        """
+        with self._lock:
+            while self._pending:
+                package = next(iter(self._pending))
+                help_data = self._pending.pop(package)
+                if help_data is None:
+                    self.remove(package)
+                else:
+                    self.update(help_data)
+
+    def search(self, query, limit=50):
+        """
+        Search for topics that match the given query, returning a list of at
+        most limit (package, name, topic) tuples, best match first.
+
+        Matches need to share at least half of the trigrams in the query.
+        They are ranked on the fraction of trigrams they share, favouring
+        topics whose text contains the query and then shorter text.
+        """
+        query = _normalize_text(query)
+        grams = _trigrams(query, tail=False)
+        if not grams:
+            return []
+
+        with self._lock:
+            postings = sorted((self._postings.get(gram, ()) for gram in grams),
+                              key=len)
+
+            # Matches are found a posting list at a time, rarest first. Once
+            # n lists have been looked at, every entry that shares all but
+            # n - 1 of the trigrams has been seen, so the search can stop as
+            # soon as there are enough of those.
+            required = (len(grams) + 1) // 2
+            total = sum(len(ids) for ids in postings)
+            counts = dict()
+            for level, ids in enumerate(postings[:len(grams) - required + 1]):
+                new = set(ids).difference(counts)
+                counts.update(self._count_shared(new, grams, postings, total))
+
+                minimum = len(grams) - level
+                matches = sum(1 for count in counts.values() if count >= minimum)
+                if matches >= limit:
+                    break
+
+            counts = {entry_id: count for entry_id, count in counts.items()
+                      if count >= minimum}
+
+            scored = list()
+            for entry_id, count in counts.items():
+                entry = self._entries[entry_id]
+                if entry is None:
+                    continue
+
+                package, name, topic, text = entry
+                score = count / len(grams)
+                if query in text:
+                    score += 0.5 if text.startswith(query) else 0.25
+
+                scored.append((-score, len(text), package, name, topic))
+
+        return [(package, name, topic) for _, _, package, name, topic
+                in heapq.nsmallest(limit, scored)]
+
+    def _count_shared(self, entry_ids, grams, postings, total):
+        """
+        Return a dictionary that maps each of the given entry ids to the
+        number of the query trigrams that its text contains. The postings are
+        the lists for the query trigrams and total is their combined length.
+        """
+        # Checking a few entries directly is faster than intersecting them
+        # with every posting list, which has to look at every item.
+        if len(entry_ids) * 500 < total:
+            entries = self._entries
+            return {entry_id: len(grams & _trigrams(entries[entry_id][3]))
+                    for entry_id in entry_ids if entries[entry_id] is not None}
+
+        shared = Counter()
+        for ids in postings:
+            shared.update(entry_ids.intersection(ids))
+
+        return shared
+
+    def _add_postings(self, entry_id, text):
+        postings = self._postings
+        get = postings.get
+        for gram in _trigrams(text):
+            ids = get(gram)
+            if ids is None:
+                ids = postings[gram] = array("i")
+            ids.append(entry_id)
+
+    def _remove(self, package):
+        old = self._packages.pop(package, None)
+        if old is not None:
+            for entry_id in old[1]:
+                self._entries[entry_id] = None
+            self._tombstones += len(old[1])
+
+    def _compact(self):
+        """
+        Rebuild the index without the tombstones left by removed entries once
+        they make up at least half of the index.
+        """
+        if not self._tombstones or self._tombstones * 2 < len(self._entries):
+            return
+
+        old_entries = self._entries
+        self._entries = list()
+        self._postings = dict()
+        self._tombstones = 0
+
+        for package, (pkg_info, ids) in self._packages.items():
+            new_ids = list()
+            for entry_id in ids:
+                entry = old_entries[entry_id]
+                new_id = len(self._entries)
+                self._entries.append(entry)
+                self._add_postings(new_id, entry[3])
+                new_ids.append(new_id)
+
+            self._packages[package] = (pkg_info, new_ids)
+
+
+###----------------------------------------------------------------------------
+
+
+_word_re = re.compile(r'\w+')
+
+
+class TextSearchIndex():
+    """
+    An inverted index over the text of help files, used to do a full text
+    search of help ranked with BM25.
+
+    Each help file is a document identified by its package and file name.
+    Every word maps to a dictionary of the documents that contain it, giving
+    the number of times it appears in the document and the first line that
+    it appears on. Documents can be added, replaced and removed one at a time;
+    the id of a removed document is used again for the next one added.
+    """
+    # The BM25 tuning parameters; k1 controls how quickly repeated words stop
+    # adding to the score and b how much longer documents are penalized.
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._docs = list()
+        self._free_ids = list()
+        self._doc_ids = dict()
+        self._stamps = dict()
+        self._postings = dict()
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, doc):
+        return doc in self._doc_ids
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def files(self, package):
+        """
+        Return a set of the help files from the given package that are in the
+        index.
+        """
+        with self._lock:
+            return {file for pkg, file in self._doc_ids if pkg == package}
+
+    def signature(self, package, help_file):
+        """
+        Return the signature that the given help file was last added with, or
+        None if it's not in the index or was added without one.
+        """
+        with self._lock:
+            stamp = self._stamps.get((package, help_file), None)
+            return stamp[0] if stamp is not None else None
+
+    def add(self, package, help_file, text, signature=None):
+        """
+        Add the text of the given help file to the index, replacing the text
+        previously added for the same file. The signature of the file that
+        the text came from is recorded, so that a change to the file can be
+        seen without loading it; if the text is the same as what's already in
+        the index, only the signature is updated.
+        """
+        digest = hashlib.sha1(text.encode("utf-8")).digest()
+        with self._lock:
+            stamp = self._stamps.get((package, help_file), None)
+            if stamp is not None and stamp[1] == digest:
+                self._stamps[(package, help_file)] = (signature, digest)
+                return
+
+        # Lines in the help view are one further down than in the help file
+        # when the file has a header, since the header expands to two lines.
+        header = _header_prefix_re.match(text) is not None
+
+        counts = Counter()
+        first_lines = dict()
+        for line_num, line in enumerate(text.split("\n")):
+            words = _word_re.findall(line.casefold())
+            counts.update(words)
+            for word in words:
+                first_lines.setdefault(word, line_num)
+
+        with self._lock:
+            self.remove(package, help_file)
+
+            length = sum(counts.values())
+            doc = (package, help_file, length, header, list(counts))
+            if self._free_ids:
+                doc_id = self._free_ids.pop()
+                self._docs[doc_id] = doc
+            else:
+                doc_id = len(self._docs)
+                self._docs.append(doc)
+
+            self._doc_ids[(package, help_file)] = doc_id
+            self._stamps[(package, help_file)] = (signature, digest)
+            self._total_length += length
+
+            postings = self._postings
+            for word, count in counts.items():
+                docs = postings.get(word, None)
+                if docs is None:
+                    docs = postings[word] = dict()
+                docs[doc_id] = (count, first_lines[word])
+
+    def remove(self, package, help_file=None):
+        """
+        Remove the given help file from the index, or all of the help files
+        for the package if no file is given.
+        """
+        with self._lock:
+            if help_file is None:
+                for help_file in self.files(package):
+                    self.remove(package, help_file)
+                return
+
+            self._stamps.pop((package, help_file), None)
+            doc_id = self._doc_ids.pop((package, help_file), None)
+            if doc_id is None:
+                return
+
+            package, help_file, length, header, words = self._docs[doc_id]
+            self._docs[doc_id] = None
+            self._free_ids.append(doc_id)
+            self._total_length -= length
+
+            for word in words:
+                docs = self._postings[word]
+                del docs[doc_id]
+                if not docs:
+                    del self._postings[word]
+
+    def search(self, query, limit=50):
+        """
+        Search for help files that contain the words in the given query,
+        returning a list of at most limit (package, file, line) tuples, best
+        match first. The line is the (0 based) line in the help view on which
+        the most significant query word first appears.
+        """
+        words = set(_word_re.findall(query.casefold()))
+
+        with self._lock:
+            if not words or not self._doc_ids:
+                return []
+
+            num_docs = len(self._doc_ids)
+            avg_length = self._total_length / num_docs
+
+            # The score of each document, along with the idf and first line of
+            # the most significant query word found in it.
+            scores = dict()
+            for word in words:
+                docs = self._postings.get(word, None)
+                if docs is None:
+                    continue
+
+                idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, (count, line) in docs.items():
+                    length = self._docs[doc_id][2]
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    score = idf * count * (self.k1 + 1) / (count + norm)
+
+                    entry = scores.get(doc_id, None)
+                    if entry is None:
+                        scores[doc_id] = [score, idf, line]
+                    else:
+                        entry[0] += score
+                        if idf > entry[1]:
+                            entry[1:] = [idf, line]
+
+            results = list()
+            for doc_id, (score, idf, line) in heapq.nlargest(
+                    limit, scores.items(), key=lambda item: item[1][0]):
+                package, help_file, length, header, _ = self._docs[doc_id]
+                results.append((package, help_file,
+                                line + 1 if header and line > 0 else line))
+
+        return results
+
+
+def _queue_topic_index(package, help_data):
+    """
+    Help index listener that queues the change to the given package for the
+    topic search index and arranges for it to be applied in the background.
+    """
+    _topic_index.queue(package, help_data)
+    sublime.set_timeout_async(_topic_index.flush, 0)
+
+
+def _sync_text_package(package, pkg_info):
+    """
+    Bring the help files of the given package in the full text index up to
+    date with the help data provided; when pkg_info is None, all files for the
+    package are removed.
+
+    Files that are already in the index are only loaded again when the file
+    that they come from has a different signature (or has none), and only
+    indexed again when their text changed.
+    """
+    if pkg_info is None:
+        _text_packages.pop(package, None)
+        return _text_index.remove(package)
+
+    old_info = _text_packages.get(package, None)
+    if old_info is pkg_info:
+        return
+
+    # Files from a different document root are different files, even when
+    # they have the same name.
+    indexed = _text_index.files(package)
+    if old_info is not None and old_info.doc_root != pkg_info.doc_root:
+        _text_index.remove(package)
+        indexed = set()
+
+    for help_file in indexed - set(pkg_info.help_files):
+        _text_index.remove(package, help_file)
+
+    signatures = {f: _resource_signature(_resource_for_help(pkg_info, f))
+                  for f in pkg_info.help_files}
+    stale = [f for f in pkg_info.help_files
+             if f not in indexed or signatures[f] is None or
+                signatures[f] != _text_index.signature(package, f)]
+
+    # The files are loaded together, which is quicker for packed packages.
+    texts = _load_help_files(pkg_info, stale)
+    for help_file in stale:
+        if texts[help_file] is None:
+            _text_index.remove(package, help_file)
+        else:
+            _text_index.add(package, help_file, texts[help_file],
+                            signatures[help_file])
+
+    _text_packages[package] = pkg_info
+
+
+def _index_help_file(pkg_info, help_file):
+    """
+    Load the given help file and add it to the full text index.
+    """
+    signature = _resource_signature(_resource_for_help(pkg_info, help_file))
+    text = _load_help_file(pkg_info, help_file)
+
+    if text is None:
+        _text_index.remove(pkg_info.package, help_file)
+    else:
+        _text_index.add(pkg_info.package, help_file, text, signature)
+
+
+def _build_text_index(help_list):
+    """
+    Do the initial build of the full text index for all packages in the help
+    list, then run every callback that was waiting for it. This is run in the
+    background.
+    """
+    global _text_index_ready
+
+    start = time.time()
+    for package in list(_text_packages):
+        if package not in help_list:
+            _sync_text_package(package, None)
+
+    for package, pkg_info in help_list.items():
+        _sync_text_package(package, pkg_info)
+
+    log("Indexed %d help files in %.2f seconds", len(_text_index),
+        time.time() - start)
+
+    with _text_index_lock:
+        _text_index_ready = True
+        waiting = list(_text_index_waiting)
+        del _text_index_waiting[:]
+
+    for callback in waiting:
+        sublime.set_timeout(callback, 0)
+
+
+def _queue_text_index(package, help_data):
+    """
+    Help index listener that updates the full text index in the background
+    for a package that was loaded, replaced or removed. Nothing happens until
+    the full text index has been built.
+    """
+    if _text_index_ready is not None:
+        sublime.set_timeout_async(
+            lambda: _sync_text_package(package, help_data), 0)
+
+
+def _reindex_help_file(pkg_info, help_file):
+    """
+    Update the full text index in the background for a help file that may
+    have changed.
+    """
+    if _text_index_ready is not None:
+        sublime.set_timeout_async(
+            lambda: _index_help_file(pkg_info, help_file), 0)
+
+
+def _search_text(help_list, query, limit, on_done):
+    """
+    Do a full text search for the query in all help files of all packages in
+    the help list. on_done is called with a list of at most limit (package,
+    file, line) tuples, best match first.
+
+    The first search builds the index in the background; on_done is called
+    once that finishes.
+    """
+    global _text_index_ready
+
+    callback = lambda: on_done(_text_index.search(query, limit))
+    with _text_index_lock:
+        ready = _text_index_ready
+        if not ready:
+            _text_index_waiting.append(callback)
+            _text_index_ready = False
+
+    if ready:
+        return callback()
+
+    if ready is None:
+        log("Building the full text index of all help", status=True)
+        sublime.set_timeout_async(lambda: _build_text_index(help_list), 0)
+
+
+def _topic_index_current(help_list):
+    """
+    Check to see if the topic search index has the topics of every package in
+    the given help list and nothing else, without loading any help.
+    """
+    if _topic_index.is_pending():
+        return False
+
+    if any(package not in help_list for package in _topic_index.packages()):
+        return False
+
+    for package in help_list:
+        if not help_list.is_loaded(package):
+            return False
+        if _topic_index.help_data(package) is not help_list[package]:
+            return False
+
+    return True
+
+
+def _search_topics(help_list, query, limit, on_done):
+    """
+    Search for topics matching the query in all packages in the given help
+    list. on_done is called with a list of at most limit (package, name,
+    topic) tuples, with the best match first.
+
+    When there is help that is not loaded or topics that are not indexed yet,
+    that is done in the background first, so on_done may be invoked after
+    this returns.
+    """
+    if _topic_index_current(help_list):
+        return on_done(_topic_index.search(query, limit))
+
+    def search():
+        # A search covers every package, so they all need to be loaded;
+        # packages from a previous help list that are not in this one are
+        # dropped.
+        help_list.load_all()
+        for package in _topic_index.packages():
+            if package not in help_list:
+                _topic_index.queue(package, None)
+
+        for package, pkg_info in help_list.items():
+            if _topic_index.help_data(package) is not pkg_info:
+                _topic_index.queue(package, pkg_info)
+
+        _topic_index.flush()
+        results = _topic_index.search(query, limit)
+        sublime.set_timeout(lambda: on_done(results), 0)
+
+    log("Indexing help topics", status=True)
+    sublime.set_timeout_async(search, 0)
+
+
+# The fuzzy search index over the topics in all packages. This is kept up to
+# date by queueing every package as it's loaded, replaced or removed; queued
+# packages are indexed in the background or when a search needs them.
+_topic_index = TopicSearchIndex()
+_add_index_listener(_queue_topic_index)
+
+# The full text index over all help files, and the help data for each package
+# whose files are in it. This is only built when first used, after which it is
+# kept up to date as packages are loaded, replaced or removed and as help
+# files are reloaded.
+_text_index = TextSearchIndex()
+_text_packages = dict()
+
+# The status of the full text index; None until it's first used, False while
+# the initial build is happening and True once it's built.
+_text_index_ready = None
+
+# Callbacks waiting for the initial build of the full text index to finish.
+_text_index_waiting = list()
+_text_index_lock = threading.Lock()
+_add_index_listener(_queue_text_index)
+
+
+###----------------------------------------------------------------------------
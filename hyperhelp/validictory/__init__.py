@@ -2,9 +2,10 @@
 
 from .validator import (SchemaValidator, FieldValidationError, MultipleValidationError,
                         ValidationError, SchemaError)
+from .compiler import CompiledSchema, compile_schema
 
 __all__ = ['validate', 'SchemaValidator', 'FieldValidationError', 'MultipleValidationError',
-           'ValidationError', 'SchemaError']
+           'ValidationError', 'SchemaError', 'CompiledSchema', 'compile_schema']
 __version__ = '1.1.2'
 
 
@@ -0,0 +1,313 @@
+from .validator import (SchemaValidator, SchemaError, ValidationError,
+                        FieldValidationError, RequiredFieldValidationError,
+                        _str_type)
+
+
+class _Unsupported(Exception):
+    """ raised while compiling when a schema uses something the compiler can't handle """
+
+
+# Schema properties that the compiler knows how to turn into checks. Any other
+# property that the validator has a validate_ method for causes the schema to
+# be interpreted instead.
+_compiled_props = {'type', 'properties', 'items', 'required', 'blank',
+                   'additionalItems', 'additionalProperties'}
+
+# Schema properties that only describe the schema and never fail validation
+# as long as they are strings.
+_descriptive_props = {'title', 'description'}
+
+
+class CompiledSchema(object):
+    '''
+    A schema that has been compiled into a tree of validation closures, so that
+    the schema does not need to be interpreted for every value that is
+    validated.
+
+    Validating with a compiled schema reports the same errors as validating
+    with the interpreting validator. Schemas that use features the compiler
+    does not support (or validators with options it does not support) are
+    transparently validated by the interpreting validator instead.
+
+    :param schema: python dictionary representing the schema
+    :param validator: optional validator instance to compile against (default
+        is a :class:`SchemaValidator` with default options)
+    '''
+
+    def __init__(self, schema, validator=None):
+        self.schema = schema
+        self.validator = validator if validator is not None else SchemaValidator()
+        self._nodes = {}
+
+        try:
+            self._check_options()
+            self._root = self._compile(schema)
+        except _Unsupported:
+            self._root = None
+
+        # The nodes are only needed while compiling.
+        del self._nodes
+
+    @property
+    def compiled(self):
+        ''' True if the schema was compiled, False if it's being interpreted '''
+        return self._root is not None
+
+    def validate(self, data):
+        '''
+        Validates a piece of json data against the compiled schema.
+        '''
+        if self._root is None:
+            return self.validator.validate(data, self.schema)
+
+        self._root("data", {"data": data}, '<obj>')
+
+    def _check_options(self):
+        v = self.validator
+        if (not v.fail_fast or v.disallow_unknown_properties or
+                v.remove_unknown_properties or v.apply_default_to_data):
+            raise _Unsupported()
+
+    def _compile(self, schema):
+        '''
+        Compile a schema into a function that takes the same (fieldname, data,
+        path) arguments as the interpreting validator and performs the same
+        checks.
+        '''
+        if schema is None:
+            return lambda fieldname, data, path: None
+
+        if not isinstance(schema, dict):
+            raise _Unsupported()
+
+        # Schemas can be recursive, so the node for a schema is registered
+        # before the schema properties are compiled. The entry holds on to the
+        # schema so that its id can't be reused while compiling.
+        entry = self._nodes.get(id(schema))
+        if entry is not None:
+            return entry[1]
+
+        checks = []
+
+        def node(fieldname, data, path):
+            for check in checks:
+                check(data, fieldname, path)
+
+        self._nodes[id(schema)] = (schema, node)
+
+        full_schema = list(schema.items())
+        if 'required' not in schema:
+            full_schema.append(('required', self.validator.required_by_default))
+        if 'blank' not in schema:
+            full_schema.append(('blank', self.validator.blank_by_default))
+
+        for prop, value in full_schema:
+            if prop in _compiled_props:
+                checks.append(getattr(self, '_compile_' + prop)(schema, value))
+            elif prop in _descriptive_props:
+                if not isinstance(value, (_str_type, type(None))):
+                    raise _Unsupported()
+            elif hasattr(self.validator, 'validate_' + prop):
+                raise _Unsupported()
+
+        return node
+
+    def _compile_type(self, schema, fieldtype):
+        error = self.validator._error
+
+        if not fieldtype:
+            return lambda x, fieldname, path: None
+
+        if isinstance(fieldtype, (list, tuple)):
+            subtypes = [self._compile_type(schema, eachtype) for eachtype in fieldtype]
+
+            def check(x, fieldname, path):
+                if fieldname not in x:
+                    return
+
+                errorlist = []
+                for subtype in subtypes:
+                    try:
+                        subtype(x, fieldname, path)
+                        return
+                    except (SchemaError, ValidationError) as err:
+                        errorlist.append(err)
+
+                error("doesn't match any of {numsubtypes} subtypes in {fieldtype}; "
+                      "errorlist = {errorlist!r}",
+                      x[fieldname], fieldname, path=path, numsubtypes=len(fieldtype),
+                      fieldtype=fieldtype, errorlist=errorlist)
+
+            return check
+
+        if isinstance(fieldtype, dict):
+            node = self._compile(fieldtype)
+
+            def check(x, fieldname, path):
+                if fieldname in x:
+                    node(fieldname, x, path)
+
+            return check
+
+        type_checker = getattr(self.validator, 'validate_type_' + str(fieldtype), None)
+        if type_checker is None:
+            raise _Unsupported()
+
+        def check(x, fieldname, path):
+            try:
+                value = x[fieldname]
+            except KeyError:
+                return
+
+            if not type_checker(value):
+                error("is not of type {fieldtype}", value, fieldname, path=path,
+                      fieldtype=fieldtype)
+
+        return check
+
+    def _compile_properties(self, schema, properties):
+        if not isinstance(properties, dict):
+            raise _Unsupported()
+
+        nodes = [(prop, self._compile(prop_schema), '.' + prop)
+                 for prop, prop_schema in properties.items()]
+
+        def check(x, fieldname, path):
+            value = x.get(fieldname)
+            if isinstance(value, dict):
+                for prop, node, suffix in nodes:
+                    node(prop, value, path + suffix)
+
+        return check
+
+    def _compile_items(self, schema, items):
+        error = self.validator._error
+
+        if isinstance(items, (list, tuple)):
+            nodes = [self._compile(item) for item in items]
+            check_length = 'additionalItems' not in schema
+
+            def check(x, fieldname, path):
+                value = x.get(fieldname)
+                if not isinstance(value, (list, tuple)):
+                    return
+
+                if check_length and len(nodes) != len(value):
+                    return error("is not of same length as schema list", value, fieldname,
+                                 path=path)
+
+                for index, node in enumerate(nodes):
+                    try:
+                        node("_data", {"_data": value[index]}, '{0}[{1}]'.format(path, index))
+                    except FieldValidationError as e:
+                        raise type(e)("Failed to validate field '%s' list schema: %s" %
+                                      (fieldname, e), fieldname, e.value)
+
+            return check
+
+        if isinstance(items, dict):
+            node = self._compile(items)
+
+            def check(x, fieldname, path):
+                value = x.get(fieldname)
+                if not isinstance(value, (list, tuple)):
+                    return
+
+                for index, item in enumerate(value):
+                    node("[list item]", {"[list item]": item}, '{0}[{1}]'.format(path, index))
+
+            return check
+
+        raise _Unsupported()
+
+    def _compile_required(self, schema, required):
+        error = self.validator._error
+
+        def check(x, fieldname, path):
+            if required and fieldname not in x:
+                error("Required field '{fieldname}' is missing", None, path, path=path,
+                      exctype=RequiredFieldValidationError)
+
+        return check
+
+    def _compile_blank(self, schema, blank):
+        error = self.validator._error
+
+        def check(x, fieldname, path):
+            value = x.get(fieldname)
+            if isinstance(value, _str_type) and not blank and not value:
+                error("cannot be blank'", value, fieldname, path=path)
+
+        return check
+
+    def _compile_additionalItems(self, schema, additionalItems):
+        error = self.validator._error
+
+        if not isinstance(schema.get('items'), (list, tuple)):
+            raise _Unsupported()
+
+        if isinstance(additionalItems, bool) and additionalItems:
+            return lambda x, fieldname, path: None
+
+        count = len(schema['items'])
+
+        # The remaining items are validated as a list against a schema that
+        # only has the additional items as its items. When additional items
+        # are not allowed, the length check always fails first.
+        remaining_node = None
+        if not isinstance(additionalItems, bool):
+            remaining_node = self._compile({"items": additionalItems})
+
+        def check(x, fieldname, path):
+            value = x.get(fieldname)
+            if not isinstance(value, (list, tuple)):
+                return
+
+            if additionalItems is False and len(value) != count:
+                error("is not of same length as schema list", value, fieldname, path=path)
+
+            remaining = value[count:]
+            if remaining_node is not None and len(remaining) > 0:
+                remaining_node("_data", {"_data": remaining}, path)
+
+        return check
+
+    def _compile_additionalProperties(self, schema, additionalProperties):
+        error = self.validator._error
+
+        if isinstance(additionalProperties, bool) and additionalProperties:
+            return lambda x, fieldname, path: None
+
+        if not isinstance(additionalProperties, (dict, bool)) or 'patternProperties' in schema:
+            raise _Unsupported()
+
+        properties = schema.get("properties")
+        if properties is None:
+            properties = {}
+
+        node = None
+        if isinstance(additionalProperties, dict):
+            node = self._compile(additionalProperties)
+
+        def check(x, fieldname, path):
+            value = x.get(fieldname)
+            if not isinstance(value, dict):
+                return
+
+            for eachProperty in value:
+                if eachProperty not in properties:
+                    if node is None:
+                        error("contains additional property '{prop}' not defined by "
+                              "'properties' or 'patternProperties' and additionalProperties "
+                              " is False", value, fieldname, prop=eachProperty, path=path)
+                    node(eachProperty, value, path)
+
+        return check
+
+
+def compile_schema(schema, validator=None):
+    '''
+    Compile the provided schema, returning a :class:`CompiledSchema` whose
+    validate() method can be used to validate data against it repeatedly.
+    '''
+    return CompiledSchema(schema, validator)
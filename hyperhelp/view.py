@@ -1,5 +1,7 @@
 import sublime
 
+import time
+
 
 _get_window = lambda wnd: wnd if wnd is not None else sublime.active_window()
 
@@ -7,6 +9,98 @@ _get_window = lambda wnd: wnd if wnd is not None else sublime.active_window()
 ###----------------------------------------------------------------------------
 
 
+class HelpViewState():
+    """
+    The state of a help view: the package and help file it displays, the
+    RenderedHelp for that file and the fingerprint it was rendered from, the
+    navigation history and, for a view in the help view pool, the time that it
+    was pooled at.
+
+    This is kept in the plugin rather than in the view settings, so that using
+    it doesn't have to go through the API. Only the package and file are also
+    stored in the settings of the view (as _hh_pkg and _hh_file), which is what
+    marks a view as the help view when it comes back in a new session. A view
+    in the pool instead has _hh_pooled, which holds the package, file and
+    pooled time, so that the pool can be put back together after the plugin
+    is reloaded.
+    """
+    def __init__(self, package, help_file):
+        self.package = package
+        self.file = help_file
+        self.rendered = None
+        self.fingerprint = None
+        self.history = None
+        self.pooled = None
+
+
+# The state of every known help view, keyed by view id.
+_view_states = dict()
+
+
+###----------------------------------------------------------------------------
+
+
+def help_view_state(view):
+    """
+    Get the HelpViewState for the provided view, or None if it's not a help
+    view. A help view (or pooled help view) from an earlier session gets a new
+    state that is set up from what's stored in its settings.
+    """
+    state = _view_states.get(view.id(), None)
+    if state is None:
+        s = view.settings()
+        if s.has("_hh_pkg") and s.has("_hh_file"):
+            state = HelpViewState(s.get("_hh_pkg"), s.get("_hh_file"))
+            _view_states[view.id()] = state
+
+        elif s.has("_hh_pooled"):
+            help_pkg, help_file, pooled = s.get("_hh_pooled")
+            state = HelpViewState(help_pkg, help_file)
+            state.pooled = pooled
+            _view_states[view.id()] = state
+
+    return state
+
+
+def _known_view_state(view):
+    """
+    Get the HelpViewState for the provided view if it has one. Views that the
+    plugin doesn't know are only checked if they're named like a help view,
+    since that has to go through the API.
+    """
+    state = _view_states.get(view.id(), None)
+    if state is None and view.name().startswith("HyperHelp"):
+        state = help_view_state(view)
+
+    return state
+
+
+def set_help_view_file(view, help_pkg, help_file):
+    """
+    Set the package and help file that the provided view is displaying, making
+    it a help view if it's not one already. Returns the HelpViewState.
+    """
+    state = _view_states.get(view.id(), None)
+    if state is None:
+        state = _view_states[view.id()] = HelpViewState(help_pkg, help_file)
+
+    state.package = help_pkg
+    state.file = help_file
+
+    view.settings().set("_hh_pkg", help_pkg)
+    view.settings().set("_hh_file", help_file)
+
+    return state
+
+
+def drop_help_view_state(view):
+    """
+    Forget the HelpViewState of the provided view, if it has one; this is for
+    views that are closing.
+    """
+    _view_states.pop(view.id(), None)
+
+
 def find_help_view(window=None):
     """
     Search for and return the help view in the provided window. Defaults to
@@ -14,10 +108,9 @@ def find_help_view(window=None):
     """
     window = window if window is not None else sublime.active_window()
     for view in window.views():
-        if view.name().startswith("HyperHelp"):
-            s = view.settings()
-            if s.has("_hh_pkg") and s.has("_hh_file"):
-                return view
+        state = _known_view_state(view)
+        if state is not None and state.pooled is None:
+            return view
 
 
 def new_help_view(syntax=None, window=None):
@@ -55,8 +148,7 @@ def update_help_view(help_content, help_pkg, help_file,
         if window.active_view() != help_view:
             window.focus_view(help_view)
 
-    help_view.settings().set("_hh_pkg", help_pkg)
-    help_view.settings().set("_hh_file", help_file)
+    set_help_view_file(help_view, help_pkg, help_file).rendered = None
 
     help_view.run_command("append", {"characters": help_content})
     help_view.set_read_only(True)
@@ -64,6 +156,97 @@ def update_help_view(help_content, help_pkg, help_file,
     return help_view
 
 
+def find_pooled_help_view(help_pkg, help_file, window=None):
+    """
+    Search for and return the view in the help view pool of the provided
+    window that holds the given help file, if any. Defaults to the current
+    window if none is provided.
+    """
+    for view in _get_window(window).views():
+        state = _known_view_state(view)
+        if (state is not None and state.pooled is not None and
+                state.package == help_pkg and state.file == help_file):
+            return view
+
+
+def pool_help_view(help_view, pool_size):
+    """
+    Retire the provided help view to the help view pool of its window, so that
+    it's no longer the help view but keeps its contents. When the pool has more
+    than pool_size views, the least recently pooled views are closed.
+    """
+    window = help_view.window()
+    state = help_view_state(help_view)
+
+    # The view keeps its state; its settings mark it as pooled rather than as
+    # the help view, so that it stays in the pool in a new session.
+    state.pooled = time.time()
+    help_view.settings().erase("_hh_pkg")
+    help_view.settings().erase("_hh_file")
+    help_view.settings().set("_hh_pooled",
+                             [state.package, state.file, state.pooled])
+    help_view.set_name("HyperHelp: %s" % state.file)
+
+    pool = []
+    for view in window.views():
+        state = _known_view_state(view)
+        if state is not None and state.pooled is not None:
+            pool.append((state.pooled, view))
+
+    pool.sort(key=lambda entry: entry[0])
+    for pooled, view in pool[:max(len(pool) - pool_size, 0)]:
+        close_help_view(view)
+
+
+def unpool_help_view(pooled_view, help_view=None):
+    """
+    Make a view from the help view pool the help view of its window, taking
+    the place of the provided help view (if any). The help history moves over
+    to the new help view, which is focused.
+    """
+    state = help_view_state(pooled_view)
+    state.pooled = None
+
+    pooled_view.settings().erase("_hh_pooled")
+    set_help_view_file(pooled_view, state.package, state.file)
+    pooled_view.set_name("HyperHelp")
+
+    adopt_help_view(pooled_view, help_view)
+
+
+def adopt_help_view(new_view, help_view):
+    """
+    Carry the help history of the provided help view (if any) over to the new
+    help view that is replacing it, and put the new help view where the help
+    view was. The new help view is focused.
+    """
+    window = new_view.window()
+    if help_view is not None:
+        old_state = help_view_state(help_view)
+        if old_state is not None and old_state.history is not None:
+            help_view_state(new_view).history = old_state.history
+            old_state.history = None
+
+        group, index = window.get_view_index(help_view)
+        window.set_view_index(new_view, group, index)
+
+    window.focus_view(new_view)
+
+
+def close_help_view(help_view):
+    """
+    Close the provided help view, leaving the focus where it was.
+    """
+    window = help_view.window()
+    active = window.active_view()
+
+    window.focus_view(help_view)
+    window.run_command("close_file")
+
+    if active is not None and active.id() != help_view.id():
+        window.focus_view(active)
+
+
 def focus_on(help_view, position, at_center=False):
     """
     Focus this help view on the given position, which can be a single point,
@@ -0,0 +1,35 @@
+"""
+Shared setup for the tests, which drive hyperhelp outside of Sublime through
+the same stand-in for the plugin API that the benchmarks use.
+"""
+import os
+import sys
+
+import pytest
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [_root, os.path.join(_root, "benchmarks")]
+
+import sublime_stub
+sublime_stub.install()
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def resources():
+    """
+    The resources of the stand-in API, which start out empty for each test.
+    The persistent index cache is turned off so that every load goes to the
+    resources.
+    """
+    settings = dict(sublime_stub.settings)
+    sublime_stub.resources.clear()
+    sublime_stub.settings["hyperhelp_index_cache"] = False
+
+    yield sublime_stub.resources
+
+    sublime_stub.resources.clear()
+    sublime_stub.settings.clear()
+    sublime_stub.settings.update(settings)
@@ -0,0 +1,55 @@
+"""
+Check the resolution of links to topics in other help packages.
+"""
+import json
+
+import pytest
+
+from corpus import make_help_index
+from hyperhelp import core
+from hyperhelp.help_index import _discover_help_packages
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def help_list(resources, monkeypatch):
+    """
+    Help for the packages A, B and C in that order, where B and C both have a
+    topic named "shared topic".
+    """
+    for package in ("A", "B", "C"):
+        index = make_help_index(package, 2, 3)
+        if package != "A":
+            index["help_files"]["file0.txt"].append({"topic": "shared topic"})
+        resources["Packages/%s/help/hyperhelp.json" % package] = json.dumps(index).encode("utf-8")
+
+    help_list = _discover_help_packages()
+    monkeypatch.setattr(core.help_index_list, "index", help_list, raising=False)
+    return help_list
+
+
+###----------------------------------------------------------------------------
+
+
+def test_link_resolves_in_package_order(help_list):
+    assert list(help_list) == ["A", "B", "C"]
+
+    # The package that was loaded first doesn't win; B comes first.
+    help_list["C"]
+    pkg_info, topic, kind = core.resolve_help_link("A", "shared topic")
+    assert pkg_info.package == "B"
+    assert topic["file"] == "file0.txt"
+
+    assert core.resolve_help_link("C", "B topic 1.2")[0].package == "B"
+
+
+def test_qualified_link_resolves_in_named_package(help_list):
+    assert core.resolve_help_link("A", "C:shared topic")[0].package == "C"
+    assert core.resolve_help_link("A", "A:shared topic") is None
+
+
+def test_unknown_link_does_not_resolve(help_list):
+    assert core.resolve_help_link("A", "no such topic") is None
+    assert all(help_list.is_loaded(package) for package in help_list)
@@ -0,0 +1,67 @@
+"""
+Check the scan of the headers of help files.
+"""
+import json
+
+import pytest
+
+import sublime_stub
+from corpus import make_help_index
+from hyperhelp.headers import _header_table, _recent_help_files
+from hyperhelp.headers import _header_read_limit
+from hyperhelp.help_index import _discover_help_packages
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def help_dir(resources, tmp_path, monkeypatch):
+    """
+    The folder of the help files of a help package whose index is an API
+    resource; its help files are loose files on disk.
+    """
+    packages = tmp_path / "Packages"
+    monkeypatch.setattr(sublime_stub, "packages_path", lambda: str(packages))
+    help_dir = packages / "Pkg" / "help"
+    help_dir.mkdir(parents=True)
+
+    resources["Packages/Pkg/help/hyperhelp.json"] = json.dumps(
+        make_help_index("Pkg", 3, 2)).encode("utf-8")
+
+    yield help_dir
+    _header_table.remove("Pkg")
+
+
+def _header(title, date):
+    return '%%hyperhelp title="%s" date="%s"\nBody of the file\n' % (title, date)
+
+
+###----------------------------------------------------------------------------
+
+
+def test_long_header_line_is_read_in_full(help_dir):
+    title = "A very long title " * (_header_read_limit // 10)
+    (help_dir / "file0.txt").write_text(_header(title, "2020-01-01"))
+    (help_dir / "file1.txt").write_text(_header("Short", "2021-01-01"))
+    (help_dir / "file2.txt").write_text("No header at all")
+
+    help_list = _discover_help_packages()
+    help_list["Pkg"]
+
+    headers = {header.file: header for package, header in _header_table.headers()}
+    assert headers["file0.txt"].title == title
+    assert headers["file1.txt"].title == "Short"
+    assert "file2.txt" not in headers
+
+
+def test_recent_help_files_are_newest_first(help_dir):
+    (help_dir / "file0.txt").write_text(_header("Zero", "2020-01-01"))
+    (help_dir / "file1.txt").write_text(_header("One", "2022-01-01"))
+    (help_dir / "file2.txt").write_text(_header("Two", "not a date"))
+
+    results = []
+    _recent_help_files(_discover_help_packages(), 10, results.append)
+
+    assert [[header.title for package, header in found] for found in results] == [
+        ["One", "Zero"]]
@@ -0,0 +1,194 @@
+"""
+Check the loading of help indexes.
+"""
+import json
+
+import pytest
+
+import sublime_stub
+from corpus import make_help_index, add_help_package
+from hyperhelp.data import HelpTopic
+from hyperhelp.help_index import _scan_help_packages, _discover_help_packages
+from hyperhelp.help_index import _load_help_index, _reload_help_index
+from hyperhelp.help_index import _index_states, _help_toc_index
+
+
+###----------------------------------------------------------------------------
+
+
+def _add_index(resources, index_res, description, package="Dup"):
+    index = make_help_index(package, 2, 3)
+    index["description"] = description
+    resources[index_res] = json.dumps(index).encode("utf-8")
+
+
+def _add_packages(resources):
+    """
+    Add a set of help packages, some of which have more than one index. For
+    Dup the first index wins; for Bad the first index is broken, so the second
+    one is used.
+    """
+    for num in range(20):
+        add_help_package(resources, "Pkg%02d" % num, 2, 3)
+
+    _add_index(resources, "Packages/Dup/a/hyperhelp.json", "first")
+    _add_index(resources, "Packages/Dup/b/hyperhelp.json", "second")
+    resources["Packages/Bad/a/hyperhelp.json"] = b"{"
+    _add_index(resources, "Packages/Bad/b/hyperhelp.json", "second", "Bad")
+
+
+def _summary(help_list):
+    return [(package, help_data.index_file, help_data.description)
+            for package, help_data in help_list.items()]
+
+
+###----------------------------------------------------------------------------
+
+
+def test_parallel_scan_matches_sequential(resources, monkeypatch):
+    _add_packages(resources)
+
+    # A little latency lets the workers finish out of order.
+    monkeypatch.setattr(sublime_stub, "ipc_latency", 0.001)
+    sequential = _summary(_scan_help_packages(workers=1))
+    parallel = _summary(_scan_help_packages(workers=8))
+
+    assert parallel == sequential
+    assert ("Dup", "Packages/Dup/a/hyperhelp.json", "first") in parallel
+    assert ("Bad", "Packages/Bad/b/hyperhelp.json", "second") in parallel
+
+
+def test_parallel_load_all_matches_sequential(resources, monkeypatch):
+    _add_packages(resources)
+
+    monkeypatch.setattr(sublime_stub, "ipc_latency", 0.001)
+    sequential = _discover_help_packages()
+    sequential.load_all(workers=1)
+    parallel = _discover_help_packages()
+    parallel.load_all(workers=8)
+
+    assert _summary(parallel) == _summary(sequential)
+
+
+###----------------------------------------------------------------------------
+
+
+def _table(table):
+    """
+    Return the entries of a topic, alias or lookup table in order, with every
+    topic turned into a plain dictionary along with its link kind.
+    """
+    return [(name, (dict(entry), entry.kind) if isinstance(entry, HelpTopic)
+             else entry) for name, entry in table.items()]
+
+
+def _snapshot(help_data):
+    return help_data._replace(help_topics=_table(help_data.help_topics),
+                              help_aliases=_table(help_data.help_aliases),
+                              help_lookup=_table(help_data.help_lookup),
+                              help_files=list(help_data.help_files.items()))
+
+
+def _add_topic(index):
+    index["help_files"]["file1.txt"].insert(2, {"topic": "brand new topic",
+                                                 "aliases": ["new alias"]})
+
+def _add_alias(index):
+    index["help_files"]["file0.txt"][1]["aliases"].append("another alias")
+
+def _change_caption(index):
+    index["help_files"]["file2.txt"][3]["caption"] = "A different caption"
+
+def _remove_file(index):
+    del index["help_files"]["file1.txt"]
+
+def _add_file(index):
+    files = list(index["help_files"].items())
+    files.insert(1, ("extra.txt", ["Extra file", {"topic": "extra topic"}]))
+    index["help_files"] = dict(files)
+
+def _change_externals(index):
+    index["externals"]["https://example.com/Pkg/1.html"][1]["aliases"].append(
+        "another external alias")
+
+def _change_toc(index):
+    index["help_contents"].reverse()
+
+def _remove_toc(index):
+    del index["help_contents"]
+
+
+@pytest.mark.parametrize("change", [
+    _add_topic, _add_alias, _change_caption, _remove_file, _add_file,
+    _change_externals, _change_toc, _remove_toc
+])
+def test_incremental_reload_matches_full_reload(resources, change):
+    index_res = "Packages/Pkg/help/hyperhelp.json"
+    index = make_help_index("Pkg", 4, 5, toc_depth=3, externals=2)
+    resources[index_res] = json.dumps(index).encode("utf-8")
+    old = _load_help_index(index_res)
+
+    change(index)
+    resources[index_res] = json.dumps(index).encode("utf-8")
+    incremental = _reload_help_index(old)
+
+    # The topics of a help file that did not change are reused.
+    assert incremental.help_topics["pkg\ttopic\t3.0"] is old.help_topics["pkg\ttopic\t3.0"]
+
+    del _index_states[index_res]
+    full = _load_help_index(index_res)
+
+    assert _snapshot(incremental) == _snapshot(full)
+
+
+def test_cached_index_reloads_incrementally(resources, tmp_path, monkeypatch):
+    monkeypatch.setattr(sublime_stub, "cache_path", lambda: str(tmp_path))
+    sublime_stub.settings["hyperhelp_index_cache"] = True
+
+    index_res = "Packages/Pkg/help/hyperhelp.json"
+    index = make_help_index("Pkg", 4, 5)
+    resources[index_res] = json.dumps(index).encode("utf-8")
+    _load_help_index(index_res)
+
+    # A fresh session loads the index from the cache.
+    _index_states.clear()
+    cached = _load_help_index(index_res)
+    assert index_res in _index_states
+
+    _add_alias(index)
+    resources[index_res] = json.dumps(index).encode("utf-8")
+    reloaded = _reload_help_index(cached)
+
+    assert reloaded.help_topics["pkg\ttopic\t3.0"] is cached.help_topics["pkg\ttopic\t3.0"]
+    assert "another\talias" in reloaded.help_aliases
+
+
+@pytest.mark.parametrize("template", ["{topic} in {nope}", "{0}", "{topic"])
+def test_bad_caption_template_is_rejected(resources, template):
+    index_res = "Packages/Pkg/help/hyperhelp.json"
+    index = make_help_index("Pkg", 2, 3)
+    index["default_caption"] = template
+    resources[index_res] = json.dumps(index).encode("utf-8")
+
+    assert _load_help_index(index_res) is None
+
+
+###----------------------------------------------------------------------------
+
+
+def test_default_toc_lists_every_topic(resources):
+    index_res = "Packages/Pkg/help/hyperhelp.json"
+    index = make_help_index("Pkg", 3, 4, toc_depth=0)
+    resources[index_res] = json.dumps(index).encode("utf-8")
+    help_data = _load_help_index(index_res)
+
+    topics = help_data.help_topics
+    expected = [topics[topic] for topic in sorted(topics)]
+
+    assert len(help_data.help_toc) == len(topics)
+    assert help_data.help_toc == expected
+    assert list(help_data.help_toc) == expected
+    assert help_data.help_toc[0] is expected[0]
+
+    toc_index = _help_toc_index(help_data)
+    assert toc_index.entries[1:] == expected
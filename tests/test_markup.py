@@ -0,0 +1,181 @@
+"""
+Check that the help tokenizer finds the same markup as the help syntax, by
+running the syntax over help text with a small interpreter and comparing the
+regions of every meta scope with the tokens of the matching kind.
+"""
+from collections import defaultdict
+import glob
+import os
+import re
+
+import pytest
+
+from hyperhelp.markup import _tokenize_help, _token_regions, TOKEN_SCOPES
+
+yaml = pytest.importorskip("yaml")
+
+
+###----------------------------------------------------------------------------
+
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_syntax_file = os.path.join(_root, "hyperhelp", "resources", "syntax",
+                            "HyperHelp.sublime-syntax")
+
+_help_files = sorted(glob.glob(os.path.join(_root, "*", "help", "*.txt")))
+
+# Help text that exercises the corners of the markup, code blocks in
+# particular.
+_edge_cases = [
+    "*index.txt* Title of the file  2017-12-01\n\nBody |link| here\n",
+    "`code` <ctrl+x> <tab>\t> *anchor* |link| *|hidden|* ==== +---+ |\t \t|\n",
+    "Before |a|\n  ```\ncode |not_a_link| *nor* `this`\n  ```\nAfter |b|\n",
+    "\t```\n\ttabbed code\n\t```\n",
+    "  ```\n  ```\n|after|\n",
+    "  ```\nnever closed |link|\n",
+    "  ```\nclosed at the end\n  ```",
+    "text\n  ```",
+    "```\nnot indented, so not a block |link|\n```\n",
+    "  ``` not a fence\n|link|\n",
+]
+
+
+###----------------------------------------------------------------------------
+
+
+def _load_syntax():
+    """
+    Load the help syntax, returning a dictionary of context names to lists of
+    rules with their match expanded and compiled, along with the meta_scope of
+    each context that has one.
+    """
+    with open(_syntax_file, encoding="utf-8") as handle:
+        syntax = yaml.safe_load(handle)
+
+    variables = syntax["variables"]
+    def expand(pattern):
+        while "{{" in pattern:
+            pattern = re.sub(r"{{(\w+)}}", lambda m: variables[m.group(1)],
+                             pattern)
+        return pattern
+
+    contexts = dict()
+    meta_scopes = dict()
+    for name, entries in syntax["contexts"].items():
+        rules = contexts[name] = list()
+        for entry in entries:
+            if "meta_scope" in entry:
+                meta_scopes[name] = entry["meta_scope"]
+            else:
+                rules.append(dict(entry, regex=re.compile(expand(entry["match"]))))
+
+    return contexts, meta_scopes
+
+
+def _meta_names(scope):
+    return [name for name in scope.split() if name.startswith("meta.")]
+
+
+def _syntax_regions(syntax, text):
+    """
+    Run the syntax over the given text the way Sublime does, one line at a
+    time with its line break, and return a dictionary of each meta scope to a
+    sorted list of the (start, end) regions that have it.
+    """
+    contexts, meta_scopes = syntax
+    regions = defaultdict(list)
+    stack = [("main", 0)]
+
+    def close(context, start, end):
+        for name in _meta_names(meta_scopes.get(context, "")):
+            regions[name].append((start, end))
+
+    offset = 0
+    for line in text.split("\n"):
+        line = line + "\n" if offset + len(line) < len(text) else line
+        pos = 0
+        while pos <= len(line):
+            # The rule whose match starts first wins; on a tie, the first one.
+            best = None
+            for rule in contexts[stack[-1][0]]:
+                match = rule["regex"].search(line, pos)
+                if match and (best is None or match.start() < best[1].start()):
+                    best = (rule, match)
+            if best is None:
+                break
+
+            rule, match = best
+            for name in _meta_names(rule.get("scope", "")):
+                regions[name].append((offset + match.start(),
+                                      offset + match.end()))
+            for group, scope in rule.get("captures", {}).items():
+                if match.start(group) >= 0:
+                    for name in _meta_names(scope):
+                        regions[name].append((offset + match.start(group),
+                                              offset + match.end(group)))
+
+            if "push" in rule:
+                stack.append((rule["push"], offset + match.start()))
+            elif "set" in rule:
+                context, start = stack.pop()
+                close(context, start, offset + match.start())
+                stack.append((rule["set"], offset + match.start()))
+            elif rule.get("pop"):
+                context, start = stack.pop()
+                close(context, start, offset + match.end())
+            elif match.end() == match.start():
+                # An empty match that changes nothing moves on a character.
+                pos += 1
+                continue
+
+            pos = match.end()
+
+        offset += len(line)
+
+    while stack:
+        context, start = stack.pop()
+        close(context, start, len(text))
+
+    return {name: sorted(r for r in found if r[0] < r[1])
+            for name, found in regions.items()}
+
+
+def _tokenizer_regions(text):
+    tokens = _tokenize_help(text)
+    return {scope: sorted(r for r in _token_regions(tokens, kind) if r[0] < r[1])
+            for kind, scope in enumerate(TOKEN_SCOPES)}
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture(scope="module")
+def syntax():
+    return _load_syntax()
+
+
+def _check(syntax, text):
+    expected = _syntax_regions(syntax, text)
+    found = _tokenizer_regions(text)
+    for scope in TOKEN_SCOPES:
+        assert found[scope] == expected.get(scope, []), scope
+
+
+@pytest.mark.parametrize("help_file", _help_files,
+                         ids=lambda f: os.path.relpath(f, _root))
+def test_help_files_match_syntax(syntax, help_file):
+    with open(help_file, encoding="utf-8") as handle:
+        _check(syntax, handle.read())
+
+
+@pytest.mark.parametrize("text", _edge_cases)
+def test_edge_cases_match_syntax(syntax, text):
+    _check(syntax, text)
+
+
+def test_code_block_includes_fences():
+    text = "Before\n  ```\ncode\n  ```\nAfter\n"
+    tokens = _tokenize_help(text)
+    code = _token_regions(tokens, TOKEN_SCOPES.index("meta.code"))
+
+    assert [text[start:end] for start, end in code] == ["  ```\ncode\n  ```\n"]
@@ -0,0 +1,84 @@
+"""
+Check when rendered help files are reused and when they're thrown away.
+"""
+import json
+
+import pytest
+
+import sublime_stub
+from corpus import make_help_index
+from hyperhelp import help
+from hyperhelp.help_index import _discover_help_packages, _index_states
+from hyperhelp.render_cache import _render_cache, load_rendered_help
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def help_package(resources, tmp_path, monkeypatch):
+    """
+    A help package whose index is an API resource and whose help files are
+    loose files on disk, so that they have a signature. Returns the path to
+    the help files along with the list that the package is in.
+    """
+    packages = tmp_path / "Packages"
+    monkeypatch.setattr(sublime_stub, "packages_path", lambda: str(packages))
+    help_dir = packages / "Pkg" / "help"
+    help_dir.mkdir(parents=True)
+    for num in range(2):
+        (help_dir / ("file%d.txt" % num)).write_text(
+            '%%hyperhelp title="File %d" date="2020-01-01"\n*anchor* |link|\n' % num)
+
+    resources["Packages/Pkg/help/hyperhelp.json"] = json.dumps(
+        make_help_index("Pkg", 2, 3)).encode("utf-8")
+
+    _render_cache.clear()
+    yield help_dir, _discover_help_packages()
+    _render_cache.clear()
+
+
+def _render(pkg_info, help_file):
+    return help._rendered_help_file(pkg_info, help_file, "%x")
+
+
+###----------------------------------------------------------------------------
+
+
+def test_render_is_reused_without_loading(help_package, monkeypatch):
+    help_dir, help_list = help_package
+    pkg_info = help_list["Pkg"]
+    fingerprint, rendered = _render(pkg_info, "file0.txt")
+
+    loaded = []
+    load_help_file = help._load_help_file
+    def record(pkg_info, help_file, cached=True):
+        loaded.append(help_file)
+        return load_help_file(pkg_info, help_file, cached)
+    monkeypatch.setattr(help, "_load_help_file", record)
+
+    assert _render(pkg_info, "file0.txt") == (fingerprint, rendered)
+    assert loaded == []
+
+    (help_dir / "file0.txt").write_text("*other* text that is longer\n")
+    new_fingerprint, new_rendered = _render(pkg_info, "file0.txt")
+    assert new_fingerprint != fingerprint
+    assert new_rendered.anchors[0][0] == "other"
+    assert loaded == ["file0.txt"]
+
+
+def test_render_is_kept_until_help_is_replaced(help_package):
+    help_dir, help_list = help_package
+    fingerprint, rendered = _render(help_list["Pkg"], "file0.txt")
+
+    # Loading the same help again leaves the render alone.
+    _index_states.clear()
+    help_list["Pkg"] = help_list._load(["Packages/Pkg/help/hyperhelp.json"])
+    assert load_rendered_help("Pkg", "file0.txt", fingerprint) is rendered
+
+    help_list["Pkg"] = help_list["Pkg"]._replace(doc_root="Pkg/other")
+    assert load_rendered_help("Pkg", "file0.txt", fingerprint) is None
+
+    _render(help_list["Pkg"]._replace(doc_root="Pkg/help"), "file0.txt")
+    del help_list["Pkg"]
+    assert len(_render_cache) == 0
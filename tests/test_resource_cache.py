@@ -0,0 +1,48 @@
+"""
+Check that cached resources are never handed back once the resource they
+were loaded from has changed.
+"""
+import pytest
+
+import sublime_stub
+from hyperhelp.common import load_resource
+from hyperhelp.resource_cache import _resource_cache
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    _resource_cache.clear()
+    yield
+    _resource_cache.clear()
+    sublime_stub.resources.pop("Packages/Test/help/file.txt", None)
+
+
+def test_api_resource_is_not_cached():
+    res_name = "Packages/Test/help/file.txt"
+
+    # There is no file behind this resource, so it has no signature.
+    sublime_stub.resources[res_name] = b"old"
+    assert load_resource(res_name) == "old"
+
+    sublime_stub.resources[res_name] = b"new"
+    assert load_resource(res_name) == "new"
+    assert len(_resource_cache) == 0
+
+
+def test_file_resource_is_cached_until_changed(tmp_path, monkeypatch):
+    packages = tmp_path / "Packages"
+    monkeypatch.setattr(sublime_stub, "packages_path", lambda: str(packages))
+
+    help_file = packages / "Test" / "help" / "file.txt"
+    help_file.parent.mkdir(parents=True)
+    help_file.write_bytes(b"old")
+
+    res_name = "Packages/Test/help/file.txt"
+    assert load_resource(res_name) == "old"
+    assert len(_resource_cache) == 1
+
+    help_file.write_bytes(b"newer")
+    assert load_resource(res_name) == "newer"
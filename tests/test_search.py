@@ -0,0 +1,113 @@
+"""
+Check the topic search index and that the full text index follows the help
+files of a package when its help data is replaced.
+"""
+import json
+import re
+
+import pytest
+
+import sublime_stub
+from corpus import make_help_index
+from hyperhelp import search
+from hyperhelp.help_index import _load_help_index, _index_states
+
+
+###----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def text_index(monkeypatch):
+    monkeypatch.setattr(search, "_text_index", search.TextSearchIndex())
+    monkeypatch.setattr(search, "_text_packages", dict())
+    return search._text_index
+
+
+@pytest.fixture
+def help_files(resources, tmp_path, monkeypatch):
+    """
+    A help package whose index is an API resource and whose help files are
+    loose files on disk, so that they have a signature. Returns a function
+    that writes a help file and gives back freshly loaded help data.
+    """
+    packages = tmp_path / "Packages"
+    monkeypatch.setattr(sublime_stub, "packages_path", lambda: str(packages))
+    (packages / "Pkg" / "help").mkdir(parents=True)
+
+    index_res = "Packages/Pkg/help/hyperhelp.json"
+    resources[index_res] = json.dumps(make_help_index("Pkg", 3, 2)).encode("utf-8")
+
+    def write(help_file, text):
+        (packages / "Pkg" / "help" / help_file).write_text(text)
+        _index_states.pop(index_res, None)
+        return _load_help_index(index_res)
+
+    return write
+
+
+def test_templated_captions_are_searchable(resources):
+    index_res = "Packages/Pkg/help/hyperhelp.json"
+    index = make_help_index("Pkg", 3, 4)
+    index["default_caption"] = "Entry {topic} of {package} ({source}) {{x}}"
+    for entries in index["help_files"].values():
+        for entry in entries[1:]:
+            del entry["caption"]
+    resources[index_res] = json.dumps(index).encode("utf-8")
+    help_data = _load_help_index(index_res)
+
+    topic_index = search.TopicSearchIndex()
+    topic_index.update(help_data)
+
+    # The words of every topic are those of its formatted caption.
+    assert any(topic.caption_template for topic in help_data.help_topics.values())
+    for package, name, topic, text in topic_index._entries:
+        aliases = [alias for alias, target in help_data.help_aliases.items()
+                   if target == name]
+        words = search._normalize_text(" ".join([name, topic["caption"]] + aliases))
+        assert set(re.findall(r"\w+", text)) == set(re.findall(r"\w+", words))
+
+    results = topic_index.search("entry of pkg file2.txt")
+    assert results and results[0][2]["file"] == "file2.txt"
+
+
+def _found(text_index, word):
+    return sorted(help_file for _, help_file, _ in text_index.search(word))
+
+
+###----------------------------------------------------------------------------
+
+
+def test_changed_file_is_reindexed(text_index, help_files, monkeypatch):
+    help_files("file0.txt", "first file about apples\n")
+    help_files("file1.txt", "second file about pears\n")
+    pkg_info = help_files("file2.txt", "third file about plums\n")
+    search._sync_text_package("Pkg", pkg_info)
+    assert _found(text_index, "pears") == ["file1.txt"]
+
+    loaded = []
+    load_help_files = search._load_help_files
+    def record(pkg_info, files):
+        loaded.extend(files)
+        return load_help_files(pkg_info, files)
+    monkeypatch.setattr(search, "_load_help_files", record)
+
+    pkg_info = help_files("file1.txt", "second file about cherries now\n")
+    search._sync_text_package("Pkg", pkg_info)
+
+    # Only the file that changed on disk is loaded again.
+    assert loaded == ["file1.txt"]
+    assert _found(text_index, "cherries") == ["file1.txt"]
+    assert _found(text_index, "pears") == []
+    assert _found(text_index, "apples") == ["file0.txt"]
+
+
+def test_unchanged_text_is_not_reindexed(text_index):
+    text_index.add("Pkg", "file0.txt", "some help text\n", (1, 15))
+    doc = text_index._docs[text_index._doc_ids[("Pkg", "file0.txt")]]
+
+    text_index.add("Pkg", "file0.txt", "some help text\n", (2, 15))
+    assert text_index._docs[text_index._doc_ids[("Pkg", "file0.txt")]] is doc
+    assert text_index.signature("Pkg", "file0.txt") == (2, 15)
+
+    text_index.remove("Pkg", "file0.txt")
+    assert text_index.signature("Pkg", "file0.txt") is None